@@ -17,22 +17,24 @@ from typing import Callable
 from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableSerializable
-from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from langchain_core.messages import BaseMessage, SystemMessage
 from graphs.nodes.cross_reference_reflection import crossReferenceGeneratorOutput, crossReferenceReflectorOutput
 
 
 def create_cross_reference_generator_chain(model: BaseChatModel) -> Callable[[list[BaseMessage]], RunnableSerializable]:
-    def cross_reference_generator_chain(user_messages: list[HumanMessage]) -> RunnableSerializable[
+    def cross_reference_generator_chain(user_messages: list[BaseMessage]) -> RunnableSerializable[
         dict, dict | crossReferenceGeneratorOutput]:
-        structured_output_model = model.with_structured_output(crossReferenceGeneratorOutput)
+        # The raw response is kept for its token usage
+        structured_output_model = model.with_structured_output(crossReferenceGeneratorOutput, include_raw=True)
         system_message = SystemMessage(
             "You are a Terraform Agent. "
             "Given a terraform codebase and a task, "
             "analyze and take necessary steps to complete it, "
             "following best practices."
         )
-        user_message = HumanMessage(f"{user_messages}")
-        messages = [system_message, user_message]
+        # The conversation is sent as it is: the system message and the codebase prompt are the same prefix in
+        # every iteration, the later messages only add the answers and validations of the previous iterations
+        messages = [system_message, *user_messages]
         template = ChatPromptTemplate.from_messages(messages)
         return template | structured_output_model
 
@@ -40,9 +42,10 @@ def create_cross_reference_generator_chain(model: BaseChatModel) -> Callable[[li
 
 
 def create_cross_reference_reflector_chain(model: BaseChatModel) -> Callable[[list[BaseMessage]], RunnableSerializable]:
-    def cross_reference_reflector_chain(user_messages: list[HumanMessage]) -> RunnableSerializable[
+    def cross_reference_reflector_chain(user_messages: list[BaseMessage]) -> RunnableSerializable[
         dict, dict | crossReferenceReflectorOutput]:
-        structured_output_model = model.with_structured_output(crossReferenceReflectorOutput)
+        # The raw response is kept for its token usage
+        structured_output_model = model.with_structured_output(crossReferenceReflectorOutput, include_raw=True)
         system_message = SystemMessage(
             "You are a Terraform verification agent. Validate cross-reference analysis by:\n\n"
             "1. Verifying reported issues via:\n"
@@ -65,8 +68,9 @@ def create_cross_reference_reflector_chain(model: BaseChatModel) -> Callable[[li
             "- Additional Concerns: [... if critical]\n\n"
             "Be accurate and thorough.",
         )
-        user_message = HumanMessage(f"{user_messages}")
-        messages = [system_message, user_message]
+        # The conversation is sent as it is: the system message and the codebase prompt are the same prefix in
+        # every iteration, the later messages only add the answers and validations of the previous iterations
+        messages = [system_message, *user_messages]
         template = ChatPromptTemplate.from_messages(messages)
         return template | structured_output_model
 
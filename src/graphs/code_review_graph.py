@@ -15,6 +15,9 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import os
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage
 from langgraph.graph import StateGraph
 
 from config import ConfigManager
@@ -39,22 +42,26 @@ from graphs.nodes import (
     CrossReferenceInitializer,
     CrossReferenceCommenter,
 )
+from graphs.nodes.cross_reference_reflection import DEFAULT_MAX_ITERATIONS, cross_reference_issues, reflection_converged
 from graphs.nodes.remote_graphs.acp.static_analyzer import stateless_remote_static_analyzer_request
 from graphs.nodes.remote_graphs.acp.code_reviewer import stateless_remote_code_review_request
 from graphs.nodes.remote_graphs.agp.static_analyzer import node_remote_agp as static_analyzer_agp
 from graphs.nodes.remote_graphs.agp.code_reviewer import node_remote_agp as code_reviewer_agp
 from graphs.states import GitHubPRState, create_default_github_pr_state
-from utils.constants import AGENT_MODE_ENV
+from utils.cancellation import CancellationToken
+from utils.constants import AGENT_MODE_ENV, CROSS_REFERENCE_MAX_ITERATIONS_ENV
 from utils.github_operations import GitHubOperations
 from utils.logging_config import logger as log
 from utils.modelfactory import models
 from utils.models import IssueComment
 
 class CodeReviewerWorkflow:
-    def __init__(self, installation_id: str, repo_name: str, pr_number: int):
+    def __init__(self, installation_id: str, repo_name: str, pr_number: int, github_ops: Optional[GitHubOperations] = None):
         log.info(
             f"Initializing CodeReviewerWorkflow with installation_id: {installation_id}, repo_name: {repo_name}, pr_number: {pr_number}")
-        github_ops = GitHubOperations(installation_id, repo_name, pr_number)
+        # Reusing the caller's GitHubOperations shares its read cache with the graph run
+        if github_ops is None:
+            github_ops = GitHubOperations(installation_id, repo_name, pr_number)
         config_manager = ConfigManager(github_ops)
         user_config = config_manager.load_config()
         if user_config is None:
@@ -89,7 +96,7 @@ class CodeReviewerWorkflow:
         )
         self.comment_filterer_context = DefaultContext(chain=create_comment_filter_chain(self.model))
 
-    async def run(self):
+    async def run(self, cancel_token: Optional[CancellationToken] = None):
         agent_mode = os.getenv(AGENT_MODE_ENV, "local").lower()
         log.info(f"Running in {agent_mode} mode")
         workflow = StateGraph(GitHubPRState)
@@ -121,24 +128,54 @@ class CodeReviewerWorkflow:
         workflow.add_node("cross_reference_commenter", CrossReferenceCommenter())
         workflow.add_node("commenter", Commenter(self.github_context))
 
+        # The symbol index of the initializer found no problems, nothing to explain
+        def should_explain(state: GitHubPRState):
+            if state["cross_reference_problems"] is not None and not state["messages"]:
+                return "cross_reference_commenter"
+            return "cross_reference_generator"
+
+        max_iterations = max(1, int(os.getenv(CROSS_REFERENCE_MAX_ITERATIONS_ENV) or DEFAULT_MAX_ITERATIONS))
+
         # This is used to loop the cross-reference-generator -> cross-reference-reflector
         def should_continue(state: GitHubPRState):
-            if len(state["messages"]) > 4:
-                # End after 3 iterations
+            if state["cross_reference_problems"] is not None:
+                # The problems found by the symbol index are certain, their explanation needs no reflection
+                return "cross_reference_commenter"
+            answers = [str(msg.content) for msg in state["messages"] if isinstance(msg, AIMessage)]
+            if len(answers) >= max_iterations:
+                log.info(f"Cross-reference analysis stopped after {len(answers)} iterations")
+                return "cross_reference_commenter"
+            if len(answers) > 1 and cross_reference_issues(answers[-1]) == cross_reference_issues(answers[-2]):
+                log.info(f"Cross-reference analysis converged after {len(answers)} iterations, the issues didn't change")
                 return "cross_reference_commenter"
             return "cross_reference_reflector"
 
+        # The reflector has nothing to correct, another generator call would give the same answer
+        def should_revise(state: GitHubPRState):
+            if reflection_converged(str(state["messages"][-1].content)):
+                log.info("Cross-reference analysis converged, the reflector confirmed the issues")
+                return "cross_reference_commenter"
+            return "cross_reference_generator"
+
         workflow.add_edge("fetch_pr", "static_analyzer")
         workflow.add_edge("fetch_pr", "title_description_reviewer")
         workflow.add_edge("static_analyzer", "cross_reference_initializer")
         workflow.add_edge("static_analyzer", "code_reviewer")
-        workflow.add_edge("cross_reference_initializer", "cross_reference_generator")
+        workflow.add_conditional_edges("cross_reference_initializer", should_explain)
         workflow.add_conditional_edges("cross_reference_generator", should_continue)
-        workflow.add_edge("cross_reference_reflector", "cross_reference_generator")
+        workflow.add_conditional_edges("cross_reference_reflector", should_revise)
         workflow.add_edge(["cross_reference_commenter", "code_reviewer"], "comment_filterer")
         workflow.add_edge(["comment_filterer", "title_description_reviewer"], "commenter")
         workflow.set_entry_point("fetch_pr")
         init_state = create_default_github_pr_state()
         graph = workflow.compile()
-        result = await graph.ainvoke(init_state)
+        result: dict[str, Any] = dict(init_state)
+        try:
+            # Stream the steps instead of a single ainvoke, so a superseded review stops at the next node boundary
+            async for result in graph.astream(init_state, stream_mode="values"):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+        finally:
+            if self.github_context.github is not None:
+                self.github_context.github.read_cache.report()
         return result
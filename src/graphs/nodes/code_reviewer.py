@@ -16,10 +16,13 @@
 
 import concurrent.futures
 import json
+import os
 
 import concurrent
 from typing import List, Callable, Optional
 from graphs.states import GitHubPRState, FileChange
+from utils.constants import CODE_REVIEWER_CONTEXT_TOKEN_BUDGET_ENV
+from utils.context_selector import DEFAULT_TOKEN_BUDGET, select_context_files
 from utils.logging_config import logger as log
 from .contexts import DefaultContext
 from pydantic import BaseModel, Field
@@ -45,6 +48,7 @@ class codeReviewInput(BaseModel):
     static_analyzer_output: list[str] = Field(
         description="""
         - A list of multiple static code analyzers (tflint, tfsec, etc.) on the new code.
+        - Each item of the static_analyzer_output is "file_name:line_number [rule]: description", the line and the rule are left out when they are unknown.
         - The static_analyzer_output could be useful for understanding the potential issues introduced by the user, like missing references, undefined or unused variables etc.
         - The static_analyzer_output could have issues which are not related to the current code changes, you MUST ignore these issues as they weren't introduced by this PR.
         """)
@@ -69,14 +73,19 @@ class CodeReviewer:
     def __init__(self, context: DefaultContext, name: str = "code_reviewer"):
         self.context = context
         self.name = name
+        # Estimated tokens of the context files sent to the model, the files closest to the changes are kept
+        self._token_budget = int(os.getenv(CODE_REVIEWER_CONTEXT_TOKEN_BUDGET_ENV) or DEFAULT_TOKEN_BUDGET)
 
     def __call__(self, state: GitHubPRState) -> dict:
         log.info(f"{self.name} called")
 
         try:
+            # Selected once, every review call gets the same context
+            context_files = select_context_files(state['context_files'], state['changes'], self._token_budget).files
             comments: List[ReviewComment] = []
             with concurrent.futures.ThreadPoolExecutor() as executor:
-                results: List[List[ReviewComment]] = list(executor.map(lambda _: self.__code_review(state), range(5)))
+                results: List[List[ReviewComment]] = list(
+                    executor.map(lambda _: self.__code_review(state, context_files), range(5)))
 
             for res in results:
                 comments.extend(res)
@@ -92,9 +101,10 @@ class CodeReviewer:
 
         return {"new_review_comments": comments}
 
-    def __code_review(self, state: GitHubPRState) -> List[ReviewComment]:
+    def __code_review(self, state: GitHubPRState, context_files: List[ContextFile]) -> List[ReviewComment]:
         """
         :param state:
+        :param context_files: the context files selected for the token budget
         :return:
         """
         if self.context.chain is None:
@@ -105,11 +115,11 @@ class CodeReviewer:
             raise ValueError(f"{self.name}: Chain is not a RunnableSerializable or Callable")
 
 
-        static_analyzer_response = []
+        static_analyzer_response: list[str] = []
         if isinstance(state['static_analyzer_output'], StaticAnalyzerOutputList):
-            static_analyzer_response = [f"{res.file_name}: {res.full_issue_description}" for res in
-                                        state['static_analyzer_output'].issues]
-        codereview = codeReviewInput(files=state['context_files'], changes=state['changes'],
+            # file:line [rule]: description, so the location and the rule of each issue reach the LLM
+            static_analyzer_response = [str(res) for res in state['static_analyzer_output'].issues]
+        codereview = codeReviewInput(files=context_files, changes=state['changes'],
                                      static_analyzer_output=static_analyzer_response)
         response: ReviewComments = self.context.chain(get_model_dump_with_metadata(codereview)).invoke({})
         return [comment for comment in response.issues if comment.line_number != 0]
@@ -15,11 +15,14 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import json
+import os
 from typing import Any, List
 
-from sentence_transformers import SentenceTransformer
 from graphs.states import GitHubPRState
 from utils.models import GitHubIssueCommentUpdate, IssueComment, ReviewComments, ReviewComment
+from utils.comment_dedup import AUTO_BACKEND, BACKENDS, DEFAULT_EXACT_MAX_PAIRS, remove_duplicate_comments
+from utils.constants import COMMENT_DEDUP_BACKEND_ENV, COMMENT_DEDUP_EXACT_MAX_PAIRS_ENV
+from utils.embeddings import embedding_service
 from utils.logging_config import logger as log
 from utils.wrap_prompt import wrap_prompt
 from .contexts import DefaultContext
@@ -35,6 +38,12 @@ class CommentFilterer:
     def __init__(self, context: DefaultContext, name: str = "comment_filterer"):
         self._context = context
         self._name = name
+        # exact compares all the comments with similarity matrices, ann compares the comments of each file through an
+        # LSH index, auto switches from the first to the second above COMMENT_DEDUP_EXACT_MAX_PAIRS compared pairs
+        self._dedup_backend = os.getenv(COMMENT_DEDUP_BACKEND_ENV, AUTO_BACKEND).lower()
+        if self._dedup_backend not in BACKENDS:
+            raise ValueError(f"{self._name}: {COMMENT_DEDUP_BACKEND_ENV} must be one of {', '.join(BACKENDS)}")
+        self._dedup_exact_max_pairs = int(os.getenv(COMMENT_DEDUP_EXACT_MAX_PAIRS_ENV) or DEFAULT_EXACT_MAX_PAIRS)
 
     def __call__(self, state: GitHubPRState) -> dict[str, Any]:
         log.info(f"{self._name}: called")
@@ -74,7 +83,7 @@ class CommentFilterer:
             "issue_comments_to_update": state["issue_comments_to_update"],
         }
 
-    def __filter_review_comments(self, state: GitHubPRState) -> ReviewComments:
+    def __filter_review_comments(self, state: GitHubPRState) -> List[ReviewComment]:
         try:
             # Use existing comments from state
             review_comments = state["review_comments"]
@@ -153,84 +162,19 @@ class CommentFilterer:
 
         return filtered_issue_comments
 
-    def _remove_duplicate_comments(self, review_comments: ReviewComments, new_review_comments: ReviewComments) -> ReviewComments:
-        if not new_review_comments:
-            return []
+    def _remove_duplicate_comments(self, review_comments: list[ReviewComment], new_review_comments: list[ReviewComment]) -> list[ReviewComment]:
         # We use a simple embeding model to create vector embedings
         # We calculate the embedings first and then the similarities
         # The similarities are the cosine of the angle between the vectors, [-1, 1], the closer to 1 the more similar two sentences are
-        model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-        # First we remove the duplications from the new_review_comments:
-        new_messages = [c.comment for c in new_review_comments]
-        new_message_embeddings = model.encode(new_messages)
-        new_message_similarity = model.similarity(new_message_embeddings, new_message_embeddings)
-
-        # We have the following similarity matrix
-        # We only need to iterate over either the top or the bottom triangle, this code uses the top
-        # In each line if we find that there's a comment with a similar meaning, close line number and same file, we exlude that comment
-
-        #   0  1   2   3   4
-        # 0 1 0.1 0.3 0.8 0.1 -- The comment with index 3 is similar to index 0, so it's removed
-        # 1 -  1  0.2 0.3 0.9 -- The comment with index 4 is similar to index 1, so it's removed
-        # 2 -  -   1  0.2 0.3
-        # 3 -  -   -   1  0.1
-        # 4 -  -   -   -   1
-
-        new_comment_count = new_message_similarity.shape[0]
-        to_exclude: set[int] = set()
-        new_review_comments_filtered: ReviewComments = []
-
-        for i, similarities in enumerate(new_message_similarity):
-            if i in to_exclude:
-                continue
-
-            # This comment wasn't flagged for exlusion, so it's not similar to any existing comment before it
-            new_review_comments_filtered.append(new_review_comments[i])
-
-            # If there's another comment with a similar message, a close line number and the same file, add that one to the exlusion list
-            for j in range(i + 1, new_comment_count):
-                if self.__comments_similar(new_review_comments[i], new_review_comments[j], similarities[j].item()):
-                    to_exclude.add(j)
-
-        if not review_comments:
-            return new_review_comments_filtered
-
-        # Now filter new comments against the existing ones
-        # This time the matrix will be a bit different, the rows are the filtered new comments and the columns are the existing ones.
-        # We go through the rows and if it has even one similarity with an existing comment, we remove it from the final list:
-
-        #    0   1   2
-        # 0 0.2 0.1 0.3
-        # 1 0.8 0.2 0.5 --> This new comment is similar to the first existing comment (0.8)
-        # 2 0.1 0.2 0.1
-        # 3 0.2 0.1 0.3
-        # 4 0.1 0.4 0.2
-
-        new_messages = [c.comment for c in new_review_comments_filtered]
-        existing_messages = [c.comment for c in review_comments]
-
-        new_message_embeddings = model.encode(new_messages)
-        existing_message_embeddings = model.encode(existing_messages)
-
-        # nxm matrix where n is the number of new messages
-        new_and_existing_similarity = model.similarity(new_message_embeddings, existing_message_embeddings)
-
-        # We go through each line (new comment) in the matrix and if there's a similarity in the line greater then a treshold it means the new comment is similar to an existing one.
-        merged_review_comments_filtered = []
-        for i, similarities in enumerate(new_and_existing_similarity):
-            comment_exists = False
-            for j in range(len(similarities)):
-                if self.__comments_similar(new_review_comments_filtered[i], review_comments[j], similarities[j].item()):
-                    comment_exists = True
-                    break
-
-            if not comment_exists:
-                merged_review_comments_filtered.append(new_review_comments_filtered[i])
-
-        return merged_review_comments_filtered
-
-    def __comments_similar(self, comment1: ReviewComment, comment2: ReviewComment, similarity: float) -> bool:
-        return (similarity > self.__total_similarity_limit and comment1.filename == comment2.filename) or (
-            similarity > self.__similarity_limit and abs(comment1.line_number - comment2.line_number) < 5 and comment1.filename == comment2.filename
+        # The model is loaded once per process by the embedding service
+        # Large reviews are compared file by file through an ANN index instead of one similarity matrix
+        return remove_duplicate_comments(
+            review_comments,
+            new_review_comments,
+            embedding_service.encode,
+            embedding_service.similarity,
+            self.__similarity_limit,
+            self.__total_similarity_limit,
+            backend=self._dedup_backend,
+            exact_max_pairs=self._dedup_exact_max_pairs,
         )
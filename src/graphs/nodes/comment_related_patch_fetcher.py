@@ -31,7 +31,7 @@ class CommentRelatedPatchFetcher:
             raise ValueError("GitHub operations not found")
 
         try:
-            files = self.context.github.pr.get_files()
+            files = self.context.github.get_pr_files()
         except Exception as e:
             raise ValueError(f"Error getting patch from GitHub: {e}") from e
 
@@ -16,7 +16,6 @@
 
 from typing import Sequence
 
-from github.PaginatedList import PaginatedList
 from github.PullRequestComment import PullRequestComment
 
 from graphs.states import ReviewChatAssistantState
@@ -36,8 +35,7 @@ class CommentsFetcher:
             raise ValueError("GitHub operations not found")
 
         try:
-            comments_paginated: PaginatedList[PullRequestComment] = self.context.github.pr.get_comments()
-            review_comments: Sequence[PullRequestComment] = list(comments_paginated)
+            review_comments: Sequence[PullRequestComment] = self.context.github.get_review_comments()
         except Exception as e:
             raise ValueError(f"Error getting comments from GitHub: {e}") from e
 
@@ -14,19 +14,37 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-from graphs.states import GitHubPRState
+from graphs.states import GitHubPRState, TokenUsage
 from utils.logging_config import logger as log
 from .contexts import DefaultContext
 
 import base64
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from github.Commit import Commit
+from github.ContentFile import ContentFile
 from github.GitTree import GitTree
 from github.GitBlob import GitBlob
 from github.GitTreeElement import GitTreeElement
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from utils.models import IssueComment, StaticAnalyzerOutputList
 from pydantic import BaseModel, Field
 from typing import List
+from utils.blob_cache import blob_cache
+from utils.constants import CROSS_REFERENCE_MODE_ENV
+from utils.github_operations import GitHubOperations
+from utils.hcl_index import HclIndex, format_summary, hcl_index_cache, hcl_index_key, new_findings
+from utils.metrics import metrics
+
+# Upper limit of the parallel blob requests sent to GitHub for the blobs missing from the cache
+BLOB_FETCH_CONCURRENCY = 8
+
+# Upper limit of the generator calls of the generator -> reflector loop
+DEFAULT_MAX_ITERATIONS = 3
+
+_REFLECTION_SECTIONS = ("Confirmed Issues", "Incorrect Issues", "Additional Concerns")
 
 
 class File:
@@ -56,6 +74,9 @@ class CrossReferenceInitializer:
         self.name = name
         self.file_type = "blob"
         self.file_extension = (".tf", ".tfvars")
+        # index: the problems are found by diffing the symbol indexes of base and head, the LLM only explains them
+        # llm: the generator and reflector look for the problems in the whole codebase
+        self._mode = os.getenv(CROSS_REFERENCE_MODE_ENV, "index").lower()
 
     def __call__(self, state: GitHubPRState) -> dict:
         log.info(f"{self.name} called")
@@ -66,51 +87,160 @@ class CrossReferenceInitializer:
         # modified_files = self.context.github.pr.get_files()  # modified files
         head_sha = self.context.github.pr.head.sha
         base_sha = self.context.github.pr.base.sha
+        git_diff = self.context.github.get_git_diff()
+
+        if self._mode == "index":
+            return self._index(self.context.github, base_sha, head_sha, git_diff)
 
-        # Get all files from the head commit
-        head_files: list[File] = self._get_files_from_sha(head_sha)
+        try:
+            # Both commits are read from the local snapshots, shared with the other nodes and reviews
+            head_files: list[File] = self._get_files_from_snapshot(self.context.github, head_sha)
+            base_files: list[File] = self._get_files_from_snapshot(self.context.github, base_sha)
+        except Exception as e:
+            log.error(f"{self.name}: Error reading the snapshots, falling back to the GitHub API: {e}")
+            # Walk both trees first, so the blobs shared by the head and base commits are only read once
+            head_tree = self._get_tree_elements(head_sha)
+            base_tree = self._get_tree_elements(base_sha)
+            blobs = self._read_blobs(self.context.github, {element.sha for element in head_tree + base_tree})
 
-        # Get all files from the base commit
-        base_files: list[File] = self._get_files_from_sha(base_sha)
+            head_files = self._to_files(head_tree, blobs)
+            base_files = self._to_files(base_tree, blobs)
 
         codebase = self._codebase(base_files)
         head_codebase = self._codebase(head_files)
-        git_diff = self.context.github.get_git_diff()
 
-        static_analyzer_response = []
+        static_analyzer_response: list[str] = []
         if isinstance(state['static_analyzer_output'], StaticAnalyzerOutputList):
-            static_analyzer_response = [f"{res.file_name}: {res.full_issue_description}" for res in
-                                        state['static_analyzer_output'].issues]
+            # file:line [rule]: description, so the location and the rule of each issue reach the LLM
+            static_analyzer_response = [str(res) for res in state['static_analyzer_output'].issues]
         user_prompt = _create_user_prompt(git_diff, codebase, head_codebase, static_analyzer_response)
         return {"messages": [HumanMessage(content=user_prompt)]}
 
-    def _get_files_from_sha(self, sha: str) -> list[File]:
+    def _index(self, github: GitHubOperations, base_sha: str, head_sha: str, git_diff: str) -> dict:
+        start = time.perf_counter()
+        base_index = self._base_index(github, base_sha)
+        head_index = self._head_index(github, base_index, head_sha)
+        findings = new_findings(base_index, head_index)
+        metrics.observe("cross_reference.index", time.perf_counter() - start)
+        log.info(f"{self.name}: {len(findings)} cross-reference problems found by the symbol index")
+
+        summary = format_summary(findings)
+        if not findings:
+            # Nothing to explain, the summary is posted as it is
+            return {"cross_reference_problems": IssueComment(body=summary)}
+        return {
+            "cross_reference_problems": IssueComment(body=summary),
+            "messages": [HumanMessage(content=_create_explanation_prompt(git_diff, summary))],
+        }
+
+    def _base_index(self, github: GitHubOperations, sha: str) -> HclIndex:
+        """The index of the base commit is built once, every later review of a PR against it reuses it"""
+        key = hcl_index_key(github.repo.full_name, sha)
+        cached = hcl_index_cache.get(key)
+        if cached is not None:
+            metrics.increment("cross_reference.index_cache.hits")
+            return HclIndex.from_dict(cached)
+
+        metrics.increment("cross_reference.index_cache.misses")
+        try:
+            files = self._get_files_from_snapshot(github, sha)
+        except Exception as e:
+            log.error(f"{self.name}: Error reading the snapshot of {sha}, falling back to the GitHub API: {e}")
+            files = self._get_files_from_sha(github, sha)
+        index = HclIndex.build((file.path, file.content) for file in files)
+        hcl_index_cache.put(key, index.to_dict())
+        return index
+
+    def _head_index(self, github: GitHubOperations, base_index: HclIndex, sha: str) -> HclIndex:
+        """The index of the head commit is the base index patched with the files of the PR"""
+        removed: set[str] = set()
+        changed: list[str] = []
+        for file in github.get_pr_files():
+            if file.status == "renamed" and file.previous_filename:
+                removed.add(file.previous_filename)
+            if not file.filename.endswith(self.file_extension):
+                continue
+            if file.status == "removed":
+                removed.add(file.filename)
+            else:
+                changed.append(file.filename)
+
+        metrics.increment("cross_reference.index_files_parsed", len(changed))
+        log.info(f"{self.name}: patching the base index with {len(changed)} changed and {len(removed)} removed files")
+        return base_index.patch(removed, self._read_files(github, sha, changed))
+
+    def _read_files(self, github: GitHubOperations, sha: str, paths: list[str]) -> dict[str, str]:
+        if not paths:
+            return {}
+        try:
+            with github.snapshot(sha) as snapshot:
+                return {path: snapshot.read_file(path) for path in paths}
+        except Exception as e:
+            log.error(f"{self.name}: Error reading the snapshot of {sha}, falling back to the GitHub API: {e}")
+            return {path: self._get_content(github, sha, path) for path in paths}
+
+    @staticmethod
+    def _get_content(github: GitHubOperations, sha: str, path: str) -> str:
+        content = github.get_contents(path, ref=sha)
+        # A list is returned for folders only, the paths come from the files of the PR
+        assert isinstance(content, ContentFile), f"{path} is not a file"
+        return content.decoded_content.decode("utf-8")
+
+    def _get_files_from_snapshot(self, github: GitHubOperations, sha: str) -> list[File]:
+        with github.snapshot(sha) as snapshot:
+            return [File(path, snapshot.read_file(path)) for path in snapshot.list_files(extensions=self.file_extension)]
+
+    def _get_files_from_sha(self, github: GitHubOperations, sha: str) -> list[File]:
+        tree = self._get_tree_elements(sha)
+        return self._to_files(tree, self._read_blobs(github, {element.sha for element in tree}))
+
+    def _get_tree_elements(self, sha: str) -> list[GitTreeElement]:
         if self.context.github is None:
             raise ValueError(f"{self.name}: GitHub is not set in the context")
 
         # Get the commit object
-        commit: Commit = self.context.github.repo.get_commit(sha)
+        commit: Commit = self.context.github.get_commit(sha)
 
         # Get the tree associated with the commit
         tree: GitTree = commit.commit.tree
 
         # Get all files in the tree
-        files: list[GitTreeElement] = self.context.github.repo.get_git_tree(tree.sha, recursive=True).tree
-
-        # Create a list of File objects
-        file_objects = []
-        for file in files:
-            if file.type == self.file_type:
-                # need only ".tf" and ".tfvars" files
-                if not file.path.endswith(self.file_extension):
-                    continue
-                # Read the file content
-                blob: GitBlob = self.context.github.repo.get_git_blob(file.sha)
-                # Decode the base64 content
-                content = base64.b64decode(blob.content).decode("utf-8")
-                file_objects.append(File(file.path, content))
-
-        return file_objects
+        files: list[GitTreeElement] = self.context.github.get_git_tree(tree.sha, recursive=True).tree
+
+        # need only ".tf" and ".tfvars" files
+        return [file for file in files if file.type == self.file_type and file.path.endswith(self.file_extension)]
+
+    def _read_blobs(self, github: GitHubOperations, shas: set[str]) -> dict[str, bytes]:
+        """Reads the blobs from the blob cache, only the ones never seen before are fetched from GitHub"""
+        blobs: dict[str, bytes] = {}
+        missing: list[str] = []
+        for sha in shas:
+            content = blob_cache.get(sha)
+            if content is None:
+                missing.append(sha)
+            else:
+                blobs[sha] = content
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(BLOB_FETCH_CONCURRENCY, len(missing))) as executor:
+                for sha, content in zip(missing, executor.map(lambda sha: self._fetch_blob(github, sha), missing)):
+                    blobs[sha] = content
+
+        log.info(f"{self.name}: {len(shas) - len(missing)} blobs read from the cache, {len(missing)} fetched from GitHub")
+        return blobs
+
+    def _fetch_blob(self, github: GitHubOperations, sha: str) -> bytes:
+        blob: GitBlob = github.get_git_blob(sha)
+        # Decode the base64 content
+        content = base64.b64decode(blob.content)
+        try:
+            blob_cache.put(sha, content)
+        except ValueError as e:
+            log.warning(f"{self.name}: blob {sha} is not cached: {e}")
+        return content
+
+    def _to_files(self, elements: list[GitTreeElement], blobs: dict[str, bytes]) -> list[File]:
+        return [File(element.path, blobs[element.sha].decode("utf-8")) for element in elements]
 
     def _codebase(self, files: list[File]) -> str:
         codebase = ""
@@ -129,8 +259,14 @@ class CrossReferenceGenerator:
         log.info(f"{self.name} called")
         if self.context.chain is None:
             raise ValueError(f"{self.name}: Chain is not set in the context")
-        response = self.context.chain(state['messages']).invoke({})
-        return {"messages": response.cross_reference_generator_output}
+        messages = list(state["messages"])
+        result = self.context.chain(messages).invoke({})
+        response: crossReferenceGeneratorOutput = _parsed(self.name, result)
+        iteration = sum(isinstance(msg, AIMessage) for msg in messages) + 1
+        return {
+            "messages": [AIMessage(content=response.cross_reference_generator_output)],
+            "cross_reference_token_usage": [_token_usage(self.name, iteration, messages, result["raw"])],
+        }
 
 
 class CrossReferenceReflector:
@@ -148,8 +284,51 @@ class CrossReferenceReflector:
         cls_map = {"ai": HumanMessage, "human": AIMessage}
         # First message is the original user request. We hold it the same for all nodes
         translated = [state["messages"][0]] + [cls_map[msg.type](content=msg.content) for msg in state["messages"][1:]]
-        res = self.context.chain(translated).invoke({})
-        return {"messages": [HumanMessage(content=res.cross_reference_reflector_output)]}
+        result = self.context.chain(translated).invoke({})
+        res: crossReferenceReflectorOutput = _parsed(self.name, result)
+        # The reflector validates the latest answer of the generator
+        iteration = sum(isinstance(msg, AIMessage) for msg in state["messages"])
+        return {
+            "messages": [HumanMessage(content=res.cross_reference_reflector_output)],
+            "cross_reference_token_usage": [_token_usage(self.name, iteration, translated, result["raw"])],
+        }
+
+
+def _parsed(name: str, result: dict):
+    if result.get("parsing_error") is not None:
+        raise ValueError(f"{name}: Error parsing the structured output: {result['parsing_error']}") from result["parsing_error"]
+    return result["parsed"]
+
+
+def _token_usage(name: str, iteration: int, messages: list[BaseMessage], raw: BaseMessage) -> TokenUsage:
+    usage = getattr(raw, "usage_metadata", None) or {}
+    input_details = usage.get("input_token_details") or {}
+    token_usage = TokenUsage(
+        node=name,
+        iteration=iteration,
+        messages=len(messages),
+        input_tokens=usage.get("input_tokens", 0),
+        cached_input_tokens=input_details.get("cache_read", 0) or 0,
+        output_tokens=usage.get("output_tokens", 0),
+    )
+    metrics.increment("cross_reference.input_tokens", token_usage["input_tokens"])
+    metrics.increment("cross_reference.cached_input_tokens", token_usage["cached_input_tokens"])
+    metrics.increment("cross_reference.output_tokens", token_usage["output_tokens"])
+    log.info(f"{name}: iteration {iteration} sent {len(messages)} messages, {token_usage['input_tokens']} input tokens "
+             f"({token_usage['cached_input_tokens']} cached), received {token_usage['output_tokens']} output tokens")
+    return token_usage
+
+
+def token_usage_report(usages: list[TokenUsage]) -> str:
+    """Tabulates the token usage of the cross-reference LLM calls, one row per call"""
+    lines = [f"{'iteration':>9} {'node':<28} {'messages':>8} {'input':>8} {'cached':>8} {'output':>8}"]
+    for usage in usages:
+        lines.append(f"{usage['iteration']:>9} {usage['node']:<28} {usage['messages']:>8} {usage['input_tokens']:>8} "
+                     f"{usage['cached_input_tokens']:>8} {usage['output_tokens']:>8}")
+    lines.append(f"{'total':>9} {'':<28} {sum(u['messages'] for u in usages):>8} "
+                 f"{sum(u['input_tokens'] for u in usages):>8} {sum(u['cached_input_tokens'] for u in usages):>8} "
+                 f"{sum(u['output_tokens'] for u in usages):>8}")
+    return "\n".join(lines)
 
 # Currently we are only using static analyzer output for producing cross reference issues and not utilizing other inputs like git_diff, base_codebase, head_codebase 
 # as they seem to not produce accurate results.
@@ -180,7 +359,8 @@ def _create_user_prompt(git_diff: str, base_codebase: str, head_codebase: str, s
         ```
 
         Analyze the Terraform code for cross-reference issues by using the static_analyzer_response which is a List of strings. \
-        Each string in the static_analyzer_response List is of the format: "file_name: full_issue_description" where file_name consists of the file name that has issues \
+        Each string in the static_analyzer_response List is of the format: "file_name:line_number [rule]: full_issue_description" where file_name consists of the file name \
+        that has issues, line_number and rule are the line and the linter rule of the issue when they are known, \
         and full_issue_description has the full description of the issue in that specific filename. \
         Return ONLY a list of issues in this exact format:
 
@@ -216,6 +396,64 @@ def _create_user_prompt(git_diff: str, base_codebase: str, head_codebase: str, s
     return filled_prompt
 
 
+def cross_reference_issues(answer: str) -> frozenset[str]:
+    """Returns the issues listed by an answer of the generator, ignoring the whitespace differences"""
+    return frozenset(
+        " ".join(line.split()) for line in answer.splitlines() if line.lstrip().startswith(("-", "*"))
+    )
+
+
+def _reflection_section(reflection: str, label: str) -> str | None:
+    labels = "|".join(_REFLECTION_SECTIONS)
+    match = re.search(rf"{label}\**\s*:(.*?)(?=(?:{labels})\**\s*:|\Z)", reflection, re.DOTALL | re.IGNORECASE)
+    return None if match is None else match.group(1)
+
+
+def reflection_converged(reflection: str) -> bool:
+    """The reflector found neither incorrect issues nor additional concerns in the generator's answer"""
+    for label in ("Incorrect Issues", "Additional Concerns"):
+        section = _reflection_section(reflection, label)
+        if section is None:
+            # Not in the expected format, let the generator have another look
+            return False
+        value = section.strip().strip("[]()*-`'\". \n").strip().lower()
+        if value and not value.startswith(("none", "n/a", "no ", "nothing")):
+            return False
+    return True
+
+
+def _create_explanation_prompt(git_diff: str, summary: str) -> str:
+    user_prompt = """
+
+        # git diff
+        ```
+        {git_diff}
+        ```
+
+        # cross-reference problems:
+        ```
+        {summary}
+        ```
+
+        The cross-reference problems above were found by parsing the Terraform code of the base and head commits, \
+        they are all introduced by the git diff and they are all real problems. \
+        Rewrite the explanation after the last colon of each problem, so the author understands why it is a problem \
+        and how to fix it, using the git diff. \
+        Return ONLY the list of problems in this exact format:
+
+        ### Summary of Cross-Reference Problems
+
+        - **`<resource_or_variable>`**: <problem>: `<explanation>`
+
+        Rules:
+        1. Do not add, remove or merge problems
+        2. Keep the `<resource_or_variable>` and `<problem>` parts of each problem unchanged
+        3. Each issue must be a single line starting with a hyphen
+        """
+
+    return user_prompt.format(git_diff=git_diff, summary=summary)
+
+
 class CrossReferenceCommenter:
     """
     This class is used to post issue comments for the cross reference comments
@@ -226,8 +464,15 @@ class CrossReferenceCommenter:
 
     def __call__(self, state: GitHubPRState) -> dict:
         log.info(f"{self.name} called")
+        if state["cross_reference_token_usage"]:
+            log.info(f"{self.name}: token usage of the cross-reference analysis\n"
+                     f"{token_usage_report(state['cross_reference_token_usage'])}")
+        # The answers of the generator, the reflector's validations are not posted
         messages = []
         for res in state["messages"][1:]:
-            if isinstance(res, HumanMessage):
+            if isinstance(res, AIMessage):
                 messages.append(res)
+        if not messages:
+            # The symbol index found no problems, there was nothing for the generator to explain
+            return {"new_issue_comments": [state["cross_reference_problems"]]}
         return {"new_issue_comments": [IssueComment(body=messages[-1].content)]}
@@ -9,6 +9,7 @@ from github.File import File
 from pydantic import BaseModel
 
 from graphs.states import FileChange, GitHubPRState
+from utils.constants import GITHUB_FETCH_MODE_ENV
 from utils.logging_config import logger as log
 from utils.models import ReviewComment, IssueComment, ContextFile
 from .contexts import DefaultContext
@@ -31,8 +32,15 @@ class FetchPR:
         if self.context.github is None:
             raise ValueError(f"{self.name}: GitHubOperations is not set in the context")
 
+        if os.getenv(GITHUB_FETCH_MODE_ENV, "rest").lower() == "graphql":
+            try:
+                self.context.github.prefetch_pr_with_graphql()
+            except Exception as e:
+                # The REST readers still work, they just need more requests
+                log.error(f"{self.name}: Error fetching the PR with GraphQL, falling back to REST: {e}")
+
         try:
-            total_files = self.context.github.pr.get_files()
+            total_files = self.context.github.get_pr_files()
             self.pr_files = total_files
         except Exception as e:
             raise Exception(f"Error fetching PR files: {e}") from e
@@ -66,7 +74,7 @@ class FetchPR:
 
         # Fetch existing review comments from PR
         try:
-            review_comments = self.context.github.pr.get_review_comments()
+            review_comments = self.context.github.get_review_comments()
             for comment in review_comments:
                 # original_line is not yet implemented in the PullRequestComment class but it's in the backing data object
                 line_number = comment.raw_data.get("original_line")
@@ -135,7 +143,7 @@ class FetchPR:
                         start_line_added += 1
 
         try:
-            existing_issue_comments = self.context.github.pr.get_issue_comments()
+            existing_issue_comments = self.context.github.get_issue_comments()
 
         except Exception as e:
             log.error(f"Error fetching existing comments: {e}")
@@ -218,7 +226,7 @@ class FetchPR:
         # If the file is not found on the base branch it means it is new, so all lines in it are new.
         # Return the whole file without the annotation
         try:
-            contents = self.context.github.repo.get_contents(pr_file.filename, ref=self.context.github.pr.base.sha)
+            contents = self.context.github.get_contents(pr_file.filename, ref=self.context.github.pr.base.sha)
             if isinstance(contents, list):
                 o_file = contents[0].decoded_content.decode("utf-8").splitlines()
             else:
@@ -277,13 +285,25 @@ class FetchPR:
             pr_filenames.append(file.filename)
             directory = os.path.dirname(file.filename)
             unique_dirs.add(directory)
+
+        try:
+            # The directories are read from the head commit's snapshot, shared with the other nodes and reviews
+            with self.context.github.snapshot() as snapshot:
+                return [
+                    ContextFile(path=path, content=snapshot.read_file(path))
+                    for directory in sorted(unique_dirs)
+                    for path in snapshot.list_files(directory, extensions=self.terraform_file_types_review_allowed, recursive=False)
+                ]
+        except Exception as e:
+            log.error(f"{self.name}: Error reading the head snapshot, falling back to the GitHub API: {e}")
+
         all_files: List[ContentFile] = []
         for directory in unique_dirs:
             try:
                 branch_name = self.context.github.pr.head.ref
                 validate_branch_name(branch_name)
 
-                contents = self.context.github.repo.get_contents(directory, ref=self.context.github.pr.head.ref)
+                contents = self.context.github.get_contents(directory, ref=self.context.github.pr.head.ref)
                 if isinstance(contents, list):
                     all_files.extend(contents)
                 else:
@@ -14,17 +14,38 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-from subprocess import CalledProcessError, PIPE, run
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass, field
+from subprocess import CalledProcessError, CompletedProcess, PIPE
+from typing import Any, Callable, Optional
+import hashlib
 import os
+import re
 import shutil
+import threading
+import time
 from .contexts import DefaultContext
-from graphs.states import GitHubPRState
+from graphs.states import GitHubPRState, ToolRun
 from langchain_core.runnables import RunnableSerializable
-from utils.constants import TMP_DIR_ENV
+from utils.analysis_cache import analysis_cache
+from utils.constants import STATIC_ANALYZER_MAX_PARALLEL_ENV, STATIC_ANALYZER_OUTPUT_MODE_ENV
 from utils.logging_config import logger as log
+from utils.metrics import metrics
+from utils.repo_snapshot import analyzer_path_filter
+from utils.terraform_cache import terraform_cache
+from utils.terraform_diagnostics import DiagnosticsParseError, parse_tflint_json, parse_validate_json, rename_files
+from utils.terraform_modules import content_hash, find_modules, find_root_modules, module_closure
+from utils.tool_runner import ToolResult, run, tool_name, tool_timeout, tool_version
+from utils.workspace_pool import workspace_pool
 from utils.wrap_prompt import wrap_prompt
-from utils.models import StaticAnalyzerOutputList, StaticAnalyzerInput
+from utils.models import StaticAnalyzerOutputIssues, StaticAnalyzerOutputList, StaticAnalyzerInput
+
+
+# Bump it whenever the commands or the processing of their outputs change, so the cached results are not reused
+ANALYSIS_CACHE_VERSION = 2
+# Their outputs are part of the cache key too, an upgraded tool may find other issues in the same module
+TOOL_VERSION_COMMANDS = (["terraform", "version"], ["tflint", "--version"])
 
 
 def checkTofuFiles(output_folder) -> list[str]:
@@ -70,6 +91,11 @@ class StaticAnalyzer:
     def __init__(self, context: DefaultContext, name: str = "static_analyzer"):
         self._context = context
         self._name = name
+        self._max_parallel = int(os.getenv(STATIC_ANALYZER_MAX_PARALLEL_ENV) or os.cpu_count() or 2)
+        # Bounds the number of terraform and tflint processes of the run
+        self._process_slots = threading.BoundedSemaphore(self._max_parallel)
+        # structured: the JSON outputs of the tools are mapped to issues, the LLM only summarizes what can't be parsed
+        self._output_mode = os.getenv(STATIC_ANALYZER_OUTPUT_MODE_ENV, "structured").lower()
 
     def __call__(self, state: GitHubPRState) -> dict[str, Any]:
         log.info(f"{self._name} called")
@@ -84,76 +110,77 @@ class StaticAnalyzer:
         if not isinstance(self._context.chain, RunnableSerializable):
             raise ValueError(f"{self._name}: Chain is not a RunnableSerializable")
 
-        tmp_dir = os.getenv(TMP_DIR_ENV, ".")
-        # First clone the repo into a local folder
-        local_folder = os.path.join(tmp_dir, "repo_copy")
-        try:
-            # The output folder will look like this: "./repo_copy/repo-name-<commit-hash>"
-            output_folder = self._context.github.clone_repo(local_folder)
-        except Exception as e:
-            log.error(f"Error while cloning the repo: {e}")
-            raise
+        # Providers are installed from the shared cache instead of being downloaded for every PR
+        terraform_cache.configure_environment()
 
-        try:
-            file_rename_map = {}
-            # Check for the tofu files in the repo
-            tofu_files = checkTofuFiles(output_folder)
-            if tofu_files:
-                file_rename_map = convertFileExtension(output_folder, tofu_files)
-
-            tf_init_out = run(
-                ["terraform", "init", "-backend=false"],
-                cwd=output_folder,
-                stdout=PIPE,
-                stderr=PIPE,
-                text=True,
-            )
-            tf_validate_stdout = ""
-            tf_validate_stderr = ""
-            tf_lint_stdout = ""
-            tf_lint_stderr = ""
-            if tf_init_out.returncode == 0:
-                # The tf_init established the providers and modules folder successfully
-                tf_validate_out = run(
-                    ["terraform", "validate", "-no-color"],
-                    cwd=output_folder,
-                    stdout=PIPE,
-                    stderr=PIPE,
-                    text=True,
-                )
-                tflint_out = run(
-                    ["tflint", "--format=compact", "--recursive"],
-                    cwd=output_folder,
-                    stdout=PIPE,
-                    stderr=PIPE,
-                    text=True,
-                )
-                tf_validate_stdout = tf_validate_out.stdout
-                tf_validate_stderr = tf_validate_out.stderr
-                tf_lint_stdout = tflint_out.stdout
-                tf_lint_stderr = tflint_out.stderr
-        except CalledProcessError as e:
-            log.error(f"Error while running static checks: {e.stderr}")
-            return {}
-        try:
-            shutil.rmtree(output_folder)
-            log.debug("Repo deleted successfully")
-        except Exception as e:
-            log.error(f"An error occured while removing the local copy of the repo: {e}")
-            return {}
+        with workspace_pool.acquire() as workspace:
+            # First clone the repo into the private workspace of this run
+            try:
+                # The output folder will look like this: "<workspace>/<commit-hash>"
+                output_folder = self._context.github.clone_repo(workspace, path_filter=analyzer_path_filter())
+            except Exception as e:
+                log.error(f"Error while cloning the repo: {e}")
+                raise
+
+            try:
+                try:
+                    changed_files = [file.filename for file in self._context.github.get_pr_files()]
+                except Exception as e:
+                    log.error(f"{self._name}: Error fetching the PR files, analyzing the repo root only: {e}")
+                    changed_files = []
+
+                modules = find_modules(output_folder)
+                directories = find_root_modules(output_folder, changed_files, modules)
+                if directories:
+                    log.info(f"{self._name}: analyzing the root modules {directories}")
+                    analyses = self._analyze_modules(output_folder, directories, modules)
+                else:
+                    # Nothing to attribute the changes to, lint the whole repo from its root
+                    analyses = [self._analyze_module(output_folder, "", content_hash(output_folder), recursive=True)]
+
+                tool_runs = [tool_run for analysis in analyses for tool_run in analysis.tool_runs]
+                cache_hits = sum(1 for analysis in analyses if analysis.cached)
+                log.info(f"{self._name}: {cache_hits} of {len(analyses)} modules served from the analysis cache")
+
+                file_rename_map = {}
+                for analysis in analyses:
+                    file_rename_map.update(analysis.file_rename_map)
+                tf_init_stdout = _merge(analyses, lambda a: a.init.stdout)
+                tf_init_stderr = _merge(analyses, lambda a: a.init.stderr)
+                tf_validate_stdout = _merge(analyses, lambda a: a.validate.stdout if a.validate else "")
+                tf_validate_stderr = _merge(analyses, lambda a: a.validate.stderr if a.validate else "")
+                tf_lint_stdout = _merge(analyses, lambda a: a.tflint.stdout if a.tflint else "")
+                tf_lint_stderr = _merge(analyses, lambda a: a.tflint.stderr if a.tflint else "")
+            except CalledProcessError as e:
+                log.error(f"Error while running static checks: {e.stderr}")
+                return {}
+            finally:
+                # The workspace is emptied anyway when it's released, this frees the space as early as possible
+                try:
+                    shutil.rmtree(output_folder)
+                    log.debug("Repo deleted successfully")
+                except Exception as e:
+                    log.error(f"An error occured while removing the local copy of the repo: {e}")
+
+        if self._output_mode == "structured":
+            issues = self._structured_issues(analyses)
+            if issues is not None:
+                log.info(f"{self._name}: {len(issues)} issues parsed from the tool outputs")
+                return {"static_analyzer_output": StaticAnalyzerOutputList(issues=issues), "tool_runs": tool_runs}
+            log.info(f"{self._name}: the tool outputs couldn't be parsed, summarizing them with the LLM")
 
         try:
             if file_rename_map:
                 # Replace all the modified file names in  tf_validate output, error, lint output
-                tf_init_output = modifyresponse(file_rename_map, tf_init_out.stdout)
-                tf_init_error = modifyresponse(file_rename_map, tf_init_out.stderr)
+                tf_init_output = modifyresponse(file_rename_map, tf_init_stdout)
+                tf_init_error = modifyresponse(file_rename_map, tf_init_stderr)
                 tf_validate_output = modifyresponse(file_rename_map, tf_validate_stdout)
                 tf_validate_error = modifyresponse(file_rename_map, tf_validate_stderr)
                 tf_lint_output = modifyresponse(file_rename_map, tf_lint_stdout)
                 tf_lint_error = modifyresponse(file_rename_map, tf_lint_stderr)
             else:
-                tf_init_output = tf_init_out.stdout
-                tf_init_error = tf_init_out.stderr
+                tf_init_output = tf_init_stdout
+                tf_init_error = tf_init_stderr
                 tf_validate_output = tf_validate_stdout
                 tf_validate_error = tf_validate_stderr
                 tf_lint_output = tf_lint_stdout
@@ -192,4 +219,199 @@ class StaticAnalyzer:
         static_analyzer finished.
         output: {response}
         """)
-        return {"static_analyzer_output": response}
+        return {"static_analyzer_output": response, "tool_runs": tool_runs}
+
+    def _analyze_modules(self, repo_folder: str, directories: list[str], modules: dict[str, set[str]]) -> list["ModuleAnalysis"]:
+        # The results of a root module only change with its own files and the files of the modules it calls
+        hashes = {directory: content_hash(repo_folder, module_closure(modules, directory)) for directory in directories}
+        with ThreadPoolExecutor(max_workers=min(self._max_parallel, len(directories))) as executor:
+            return list(executor.map(lambda directory: self._analyze_module(repo_folder, directory, hashes[directory]), directories))
+
+    def _analyze_module(self, repo_folder: str, directory: str, module_hash: Optional[str], recursive: bool = False) -> "ModuleAnalysis":
+        cache_key = None
+        if module_hash:
+            versions = "\0".join(tool_version(args) for args in TOOL_VERSION_COMMANDS)
+            cache_key = hashlib.sha256(
+                f"{ANALYSIS_CACHE_VERSION}\0{versions}\0{self._output_mode}\0{directory}\0{recursive}\0{module_hash}".encode("utf-8")
+            ).hexdigest()
+            cached = analysis_cache.get(cache_key)
+            if cached is not None:
+                metrics.increment("static_analyzer.cache.hits")
+                return ModuleAnalysis.from_dict(cached)
+            metrics.increment("static_analyzer.cache.misses")
+
+        analysis = self._run_checks(repo_folder, directory, recursive)
+        # A failed init is usually a download problem, it's worth retrying next time
+        if cache_key and analysis.init.returncode == 0:
+            analysis_cache.put(cache_key, analysis.to_dict())
+        return analysis
+
+    def _run_checks(self, repo_folder: str, directory: str, recursive: bool) -> "ModuleAnalysis":
+        module_folder = os.path.join(repo_folder, directory) if directory else repo_folder
+
+        file_rename_map = {}
+        # Check for the tofu files in the module
+        tofu_files = checkTofuFiles(module_folder)
+        if tofu_files:
+            file_rename_map = convertFileExtension(module_folder, tofu_files)
+
+        tool_runs: list[ToolRun] = []
+        init_args = ["terraform", "init", "-backend=false"]
+        init_timeout = tool_timeout(init_args)
+        # The plugin cache is not safe for concurrent installs, by any review of any process sharing it. Only the inits
+        # which may install providers into it wait for each other, the wait counts toward the timeout of the init
+        install_lock: AbstractContextManager = (
+            terraform_cache.install_lock(init_timeout) if terraform_cache.needs_install_lock(module_folder) else nullcontext()
+        )
+        start = time.perf_counter()
+        try:
+            with install_lock:
+                remaining = init_timeout - (time.perf_counter() - start)
+                init = self._run(init_args, module_folder, directory, tool_runs, timeout=remaining)
+        except TimeoutError as e:
+            log.error(f"{self._name}: {e} to init {directory or '.'}")
+            init = ToolResult(init_args, 1, "", str(e), timed_out=True)
+            self._record(init_args, directory, init, time.perf_counter() - start, tool_runs)
+        analysis = ModuleAnalysis(directory=directory, init=init, file_rename_map=file_rename_map, tool_runs=tool_runs)
+        if init.returncode != 0:
+            return analysis
+
+        # The tf_init established the providers and modules folder successfully
+        terraform_cache.record(module_folder)
+
+        structured = self._output_mode == "structured"
+        tflint_args = ["tflint", "--format=json" if structured else "--format=compact"]
+        if recursive:
+            tflint_args.append("--recursive")
+        elif not os.path.exists(os.path.join(module_folder, ".tflint.hcl")) and os.path.exists(os.path.join(repo_folder, ".tflint.hcl")):
+            # Nested modules are linted with the repo's config unless they have their own
+            tflint_args.append(f"--config={os.path.abspath(os.path.join(repo_folder, '.tflint.hcl'))}")
+
+        # validate and tflint only read the initialized module, they can run side by side
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            validate_args = ["terraform", "validate", "-json" if structured else "-no-color"]
+            validate = executor.submit(self._run, validate_args, module_folder, directory, tool_runs)
+            analysis.tflint = self._run(tflint_args, module_folder, directory, tool_runs)
+            analysis.validate = validate.result()
+        return analysis
+
+    def _structured_issues(self, analyses: list["ModuleAnalysis"]) -> Optional[list[StaticAnalyzerOutputIssues]]:
+        """Maps the tool outputs to issues, returns None if any of them needs the LLM"""
+        issues: list[StaticAnalyzerOutputIssues] = []
+        for analysis in analyses:
+            if analysis.init.returncode != 0 or analysis.validate is None or analysis.tflint is None:
+                # The init errors are free text
+                return None
+            try:
+                module_issues = parse_validate_json(analysis.validate.stdout, analysis.directory)
+                module_issues += parse_tflint_json(analysis.tflint.stdout, analysis.directory)
+            except DiagnosticsParseError as e:
+                log.warning(f"{self._name}: {e.message}")
+                return None
+            issues.extend(rename_files(module_issues, analysis.file_rename_map))
+        return issues
+
+    def _run(self, args: list[str], cwd: str, directory: str, tool_runs: list[ToolRun],
+             timeout: Optional[float] = None) -> CompletedProcess:
+        with self._process_slots:
+            start = time.perf_counter()
+            result = run(
+                args,
+                cwd=cwd,
+                stdout=PIPE,
+                stderr=PIPE,
+                text=True,
+                timeout=timeout,
+            )
+            duration = time.perf_counter() - start
+        self._record(args, directory, result, duration, tool_runs)
+        return result
+
+    @staticmethod
+    def _record(args: list[str], directory: str, result: CompletedProcess, duration: float, tool_runs: list[ToolRun]) -> None:
+        tool_runs.append(
+            ToolRun(
+                tool=tool_name(args),
+                directory=directory,
+                returncode=result.returncode,
+                duration_seconds=round(duration, 3),
+                timed_out=getattr(result, "timed_out", False),
+                cached=False,
+            )
+        )
+
+
+@dataclass
+class ModuleAnalysis:
+    """The outputs of the static checks of one root module, directory is relative to the repo root"""
+
+    directory: str
+    init: CompletedProcess
+    validate: Optional[CompletedProcess] = None
+    tflint: Optional[CompletedProcess] = None
+    file_rename_map: dict = field(default_factory=dict)
+    tool_runs: list[ToolRun] = field(default_factory=list)
+    cached: bool = False
+
+    def to_dict(self) -> dict[str, Any]:
+        def process(result: Optional[CompletedProcess]) -> Optional[dict]:
+            if result is None:
+                return None
+            return {"args": result.args, "returncode": result.returncode, "stdout": result.stdout, "stderr": result.stderr}
+
+        return {
+            "directory": self.directory,
+            "init": process(self.init),
+            "validate": process(self.validate),
+            "tflint": process(self.tflint),
+            "file_rename_map": self.file_rename_map,
+            "tool_runs": self.tool_runs,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ModuleAnalysis":
+        def process(result: Optional[dict]) -> Optional[CompletedProcess]:
+            return CompletedProcess(**result) if result is not None else None
+
+        return cls(
+            directory=data["directory"],
+            # Only the analyses with an init are cached
+            init=CompletedProcess(**data["init"]),
+            validate=process(data["validate"]),
+            tflint=process(data["tflint"]),
+            file_rename_map=data["file_rename_map"],
+            tool_runs=[
+                ToolRun(
+                    tool=tool_run["tool"],
+                    directory=tool_run["directory"],
+                    returncode=tool_run["returncode"],
+                    duration_seconds=tool_run["duration_seconds"],
+                    timed_out=tool_run["timed_out"],
+                    cached=True,
+                )
+                for tool_run in data.get("tool_runs", [])
+            ],
+            cached=True,
+        )
+
+
+# Matches the file references of the terraform and tflint outputs, e.g. "main.tf:12:3:" or "on main.tf line 12"
+_FILE_REFERENCE_PATTERN = re.compile(r"(?<![\w./\-])((?:\.{1,2}/)*[\w\-][\w.\-/]*\.(?:tf\.json|tfvars|tofuvars|tofu|tf)\b)")
+
+
+def _attribute(output: str, directory: str) -> str:
+    """Makes the file references of a module's output relative to the repo root"""
+    if not directory or not output:
+        return output
+    return _FILE_REFERENCE_PATTERN.sub(lambda m: os.path.normpath(os.path.join(directory, m.group(1))), output)
+
+
+def _merge(analyses: list[ModuleAnalysis], output: Callable[[ModuleAnalysis], str]) -> str:
+    if len(analyses) == 1 and not analyses[0].directory:
+        return output(analyses[0])
+    blocks = []
+    for analysis in analyses:
+        text = _attribute(output(analysis), analysis.directory)
+        if text:
+            blocks.append(f"module {analysis.directory or '.'}:\n{text}")
+    return "\n".join(blocks)
@@ -66,7 +66,11 @@ class ReviewChatWorkflow:
             reviewed_patch=None,
             is_skipped=False,
         )
-        return self.__graph.invoke(state)
+        try:
+            return self.__graph.invoke(state)
+        finally:
+            if self.__context.github is not None:
+                self.__context.github.read_cache.report()
 
     def __create_graph(self):
         workflow = StateGraph(ReviewChatAssistantState)
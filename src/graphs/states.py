@@ -32,6 +32,24 @@ class FileChange(TypedDict):
     status: str
 
 
+class ToolRun(TypedDict):
+    tool: str
+    directory: str
+    returncode: int
+    duration_seconds: float
+    timed_out: bool
+    cached: bool
+
+
+class TokenUsage(TypedDict):
+    node: str
+    iteration: int
+    messages: int
+    input_tokens: int
+    cached_input_tokens: int
+    output_tokens: int
+
+
 class GithubRequest(TypedDict):
     repo_url: str
     branch: str
@@ -53,6 +71,8 @@ class GitHubPRState(TypedDict):
     static_analyzer_output: str
     title: str
     cross_reference_problems: Optional[IssueComment]
+    tool_runs: list[ToolRun]
+    cross_reference_token_usage: Annotated[List[TokenUsage], add]
 
 
 def create_default_github_pr_state() -> GitHubPRState:
@@ -71,6 +91,8 @@ def create_default_github_pr_state() -> GitHubPRState:
         static_analyzer_output="",
         title="",  # Default to an empty string
         cross_reference_problems=None,
+        tool_runs=[],  # Default to an empty list of static analyzer tool runs
+        cross_reference_token_usage=[],  # Default to an empty list of cross-reference LLM calls
     )
 
 
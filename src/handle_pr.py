@@ -14,80 +14,126 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import asyncio
 import os
 from http import HTTPStatus
-from typing import Any
+from typing import Any, Optional
 
 from fastapi.responses import JSONResponse
 from openai import APIConnectionError, BadRequestError
 from config import ConfigManager
 from graphs import CodeReviewerWorkflow, ReviewChatWorkflow
+from jobs import CodeReviewJob, QueueFullError, ReviewChatJob, ReviewJob, delivery_cache, review_queue
+from utils.cancellation import ReviewCancelledError
 from utils.constants import ALFRED_CONFIG_BRANCH
 from utils.github_operations import CheckRunConclusion, GitHubOperations
 from utils.logging_config import logger as log
 
 
-async def handle_github_event(payload: dict[str, Any], github_event: str):
+async def handle_github_event(payload: dict[str, Any], github_event: str, delivery_id: Optional[str] = None):
+    """Validates the event and enqueues the matching review job, the review itself runs in the queue workers"""
     try:
         log.debug(f"Header: {github_event}")
-        if github_event == "pull_request" and payload["pull_request"]["head"]["ref"] != ALFRED_CONFIG_BRANCH:
-            action = payload.get("action")
-            if action in ["opened", "synchronize"]:
-                pr_number = payload["pull_request"]["number"]
-                repo_name = payload["repository"]["full_name"]
-                installation_id = payload["installation"]["id"]
-                # handle_pull_request(pr_number, repo_name, installation_id)
-        elif github_event == "issue_comment" and payload.get("action") == "created":
-            # Get the comment body and convert to lowercase for case-insensitive comparison
-            comment_body = payload["comment"]["body"].lower()
-            # Check if both "@alfred" and "review" appear in the comment in that order
-            if "alfred" in comment_body and "review" in comment_body[comment_body.index("alfred"):]:
-                pr_number = payload["issue"]["number"]
-                repo_name = payload["repository"]["full_name"]
-                installation_id = payload["installation"]["id"]
-                await handle_pull_request(pr_number, repo_name, installation_id)
-        # TODO: handle installation correctly
-        # elif github_event == "installation" and payload.get("action") == "created":
-        #     handle_installation(payload, "repositories")
-        # elif github_event == "installation_repositories" and payload.get("action") == "added":
-        #     handle_installation(payload, "repositories_added")
-        elif github_event == "pull_request_review_comment" and payload.get("action") in [
-            "created"] and __is_commented_by_human(payload):
-            # TODO: handle edited comments
-            handle_pull_request_comment(payload)
-        return JSONResponse(content={"status": "ok"})
+        job = create_review_job(payload, github_event)
     except Exception as e:
-        if type(e) == APIConnectionError:
-            log.error("Error handling pull request because of open AI timeout")
-            return JSONResponse(content={"status": "Open API Connection Error"}, status_code=HTTPStatus.OK)
-        elif type(e) == BadRequestError:
-            log.error("Error handling pull request because of context window exceed")
-            return JSONResponse(content={"status": "Context Window Exceed Error"}, status_code=HTTPStatus.OK)
         log.error(f"Error processing webhook: {e}")
-        log.error(f"Error processing webhook:  repo_name: {payload['repository']['full_name']}, pr_number: {payload['issue']['number']}, installation_id: {payload['installation']['id']}")
         return JSONResponse(content={"status": "server error"}, status_code=HTTPStatus.INTERNAL_SERVER_ERROR)
 
+    if job is None:
+        return JSONResponse(content={"status": "ok"})
 
-async def handle_pull_request(pr_number: int, repo_name: str, installation_id: int):
-    github_ops = GitHubOperations(str(installation_id), repo_name, pr_number)
-    check_run = github_ops.create_pull_request_check_run()
+    # GitHub redelivers the same event with the same delivery id when we were slow to answer
+    if delivery_cache.is_duplicate(delivery_id):
+        log.info(f"Skipping duplicate webhook delivery: {delivery_id}")
+        return JSONResponse(content={"status": "duplicate"})
+
+    job.delivery_id = delivery_id
+    try:
+        queue_depth = review_queue.enqueue(job)
+    except QueueFullError as e:
+        log.error(e.message)
+        if delivery_id:
+            delivery_cache.discard(delivery_id)
+        return JSONResponse(content={"status": "queue full"}, status_code=HTTPStatus.SERVICE_UNAVAILABLE)
+
+    return JSONResponse(content={"status": "queued", "queue_depth": queue_depth}, status_code=HTTPStatus.ACCEPTED)
+
+
+def create_review_job(payload: dict[str, Any], github_event: str) -> Optional[ReviewJob]:
+    """Returns the job for the event or None if the event doesn't need any processing"""
+    if github_event == "pull_request" and payload["pull_request"]["head"]["ref"] != ALFRED_CONFIG_BRANCH:
+        action = payload.get("action")
+        if action in ["opened", "synchronize"]:
+            pr_number = payload["pull_request"]["number"]
+            repo_name = payload["repository"]["full_name"]
+            installation_id = payload["installation"]["id"]
+    elif github_event == "issue_comment" and payload.get("action") == "created":
+        # Get the comment body and convert to lowercase for case-insensitive comparison
+        comment_body = payload["comment"]["body"].lower()
+        # Check if both "@alfred" and "review" appear in the comment in that order
+        if "alfred" in comment_body and "review" in comment_body[comment_body.index("alfred"):]:
+            pr_number = payload["issue"]["number"]
+            repo_name = payload["repository"]["full_name"]
+            installation_id = payload["installation"]["id"]
+            return CodeReviewJob(repo_name=repo_name, pr_number=pr_number, installation_id=installation_id)
+    # TODO: handle installation correctly
+    # elif github_event == "installation" and payload.get("action") == "created":
+    #     handle_installation(payload, "repositories")
+    # elif github_event == "installation_repositories" and payload.get("action") == "added":
+    #     handle_installation(payload, "repositories_added")
+    elif github_event == "pull_request_review_comment" and payload.get("action") in [
+        "created"] and __is_commented_by_human(payload):
+        # TODO: handle edited comments
+        return create_review_chat_job(payload)
+    return None
+
+
+async def run_review_job(job: ReviewJob):
+    """Job handler of the review queue workers"""
+    try:
+        if isinstance(job, CodeReviewJob):
+            await handle_pull_request(job)
+        elif isinstance(job, ReviewChatJob):
+            await asyncio.to_thread(handle_pull_request_comment, job)
+        else:
+            raise ValueError(f"Unknown job type: {type(job).__name__}")
+    except APIConnectionError:
+        log.error(f"Error handling {job.describe()} because of open AI timeout")
+        raise
+    except BadRequestError:
+        log.error(f"Error handling {job.describe()} because of context window exceed")
+        raise
+
+
+async def handle_pull_request(job: CodeReviewJob):
+    pr_number, repo_name, installation_id = job.pr_number, job.repo_name, job.installation_id
+    # GitHub calls are blocking, keep them off the event loop so the webhook stays responsive while reviews run
+    github_ops = await asyncio.to_thread(GitHubOperations, str(installation_id), repo_name, pr_number)
+    if not review_queue.claim_head_sha(job, github_ops.pr.head.sha):
+        return
+
+    check_run = await asyncio.to_thread(github_ops.create_pull_request_check_run)
 
     try:
         log.debug(f"repo: {repo_name}, pr number:{pr_number}, installation id:{installation_id}")
         agency_provider = os.environ.get("agency_provider")
         if agency_provider is None or agency_provider == "graph":
-            graph = CodeReviewerWorkflow(str(installation_id), repo_name, pr_number)
-            result = await graph.run()
+            graph = await asyncio.to_thread(CodeReviewerWorkflow, str(installation_id), repo_name, pr_number, github_ops)
+            result = await graph.run(cancel_token=job.cancel_token)
             print(result)
+    except ReviewCancelledError as e:
+        log.info(f"Review cancelled: repo_name: {repo_name}, pr_number:{pr_number}, reason: {e.message}")
+        await asyncio.to_thread(github_ops.complete_pull_request_check_run, check_run, CheckRunConclusion.cancelled, e.message)
+        return
     except Exception as e:
         log.error(f"Error handling pull request: {str(e)}")
         log.error(
             f"Error handling pull request: repo_name: {repo_name}, pr_number:{pr_number}, installation_id:{installation_id}")
-        github_ops.complete_pull_request_check_run(check_run, CheckRunConclusion.failure, str(e))
+        await asyncio.to_thread(github_ops.complete_pull_request_check_run, check_run, CheckRunConclusion.failure, str(e))
 
         raise
 
-    github_ops.complete_pull_request_check_run(check_run, CheckRunConclusion.success, "")
+    await asyncio.to_thread(github_ops.complete_pull_request_check_run, check_run, CheckRunConclusion.success, "")
 
 
 def handle_installation(payload, repositories_key):
@@ -110,7 +156,7 @@ def handle_installation(payload, repositories_key):
         raise
 
 
-def handle_pull_request_comment(payload):
+def create_review_chat_job(payload: dict[str, Any]) -> ReviewChatJob:
     comment = payload.get("comment")
     if comment is None:
         raise ValueError("Comment is missing in the payload")
@@ -123,10 +169,15 @@ def handle_pull_request_comment(payload):
     installation_id = payload.get("installation", {}).get("id")
     if installation_id is None:
         raise ValueError("Installation ID is missing in the payload")
+
+    return ReviewChatJob(repo_name=repo_name, pr_number=pr_number, installation_id=installation_id, comment=comment)
+
+
+def handle_pull_request_comment(job: ReviewChatJob):
     log.info(
-        f"Handling pull request comment: repo_name={repo_name}, pr_number={pr_number}, installation_id={installation_id}")
+        f"Handling pull request comment: repo_name={job.repo_name}, pr_number={job.pr_number}, installation_id={job.installation_id}")
 
-    graph = ReviewChatWorkflow(installation_id, pr_number, repo_name, comment)
+    graph = ReviewChatWorkflow(job.installation_id, job.pr_number, job.repo_name, job.comment)
     print(graph.run())
     #     todo - better exception handling for ReviewChatWorkflow
 
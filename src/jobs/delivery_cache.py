@@ -0,0 +1,166 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from utils.constants import (
+    WEBHOOK_DELIVERY_CACHE_MAX_ENTRIES_ENV,
+    WEBHOOK_DELIVERY_CACHE_PATH_ENV,
+    WEBHOOK_DELIVERY_CACHE_TTL_SECONDS_ENV,
+)
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class DeliveryCache(ABC):
+    """
+    DeliveryCache remembers the X-GitHub-Delivery ids of the webhooks already accepted.
+    GitHub reuses the id when it redelivers an event, so a known id means the event is a duplicate.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        if ttl_seconds <= 0 or max_entries <= 0:
+            raise ValueError("Delivery cache TTL and max entries must be positive")
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+
+    def is_duplicate(self, delivery_id: Optional[str]) -> bool:
+        """Records the delivery id and returns True if it was already seen within the TTL"""
+        if not delivery_id:
+            # Without an id there's nothing to de-duplicate on, let the event through
+            return False
+
+        duplicate = self._add_if_absent(delivery_id, time.time())
+        if duplicate:
+            metrics.increment("webhook.duplicate_deliveries")
+        return duplicate
+
+    @abstractmethod
+    def discard(self, delivery_id: str) -> None:
+        """Forgets the delivery id, so a redelivery of an event we couldn't accept is processed"""
+        pass
+
+    @abstractmethod
+    def _add_if_absent(self, delivery_id: str, now: float) -> bool:
+        """
+        Adds the delivery id with an expiry unless it's present and not expired yet.
+
+        :param delivery_id: Value of the X-GitHub-Delivery header
+        :param now: Current unix time
+        :return: True if the id was already present
+        """
+        pass
+
+
+class InMemoryDeliveryCache(DeliveryCache):
+    """TTL cache kept in the process memory, evicts the oldest ids when it's full"""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__(ttl_seconds, max_entries)
+        self.__lock = threading.Lock()
+        self.__expiry_by_id: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__expiry_by_id)
+
+    def discard(self, delivery_id: str) -> None:
+        with self.__lock:
+            self.__expiry_by_id.pop(delivery_id, None)
+
+    def _add_if_absent(self, delivery_id: str, now: float) -> bool:
+        with self.__lock:
+            self.__evict_expired(now)
+
+            if delivery_id in self.__expiry_by_id:
+                return True
+
+            self.__expiry_by_id[delivery_id] = now + self._ttl_seconds
+            while len(self.__expiry_by_id) > self._max_entries:
+                self.__expiry_by_id.popitem(last=False)
+            return False
+
+    def __evict_expired(self, now: float) -> None:
+        # Entries are inserted in expiry order, so the expired ones are always at the front
+        while self.__expiry_by_id:
+            oldest_id, expires_at = next(iter(self.__expiry_by_id.items()))
+            if expires_at > now:
+                break
+            del self.__expiry_by_id[oldest_id]
+
+
+class SQLiteDeliveryCache(DeliveryCache):
+    """TTL cache stored in a SQLite file, so the seen deliveries survive restarts"""
+
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__(ttl_seconds, max_entries)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS deliveries (id TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS deliveries_expires_at ON deliveries (expires_at)")
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__connection.execute("SELECT COUNT(*) FROM deliveries").fetchone()[0]
+
+    def discard(self, delivery_id: str) -> None:
+        with self.__lock:
+            self.__connection.execute("DELETE FROM deliveries WHERE id = ?", (delivery_id,))
+
+    def _add_if_absent(self, delivery_id: str, now: float) -> bool:
+        with self.__lock:
+            self.__connection.execute("DELETE FROM deliveries WHERE expires_at <= ?", (now,))
+            cursor = self.__connection.execute(
+                "INSERT OR IGNORE INTO deliveries (id, expires_at) VALUES (?, ?)", (delivery_id, now + self._ttl_seconds)
+            )
+            if cursor.rowcount == 0:
+                return True
+
+            self.__connection.execute(
+                "DELETE FROM deliveries WHERE id IN (SELECT id FROM deliveries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+            return False
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+
+def create_delivery_cache() -> DeliveryCache:
+    """Creates the delivery cache from the environment, it's stored on disk only if a path is given"""
+    ttl_seconds = float(os.getenv(WEBHOOK_DELIVERY_CACHE_TTL_SECONDS_ENV) or DEFAULT_TTL_SECONDS)
+    max_entries = int(os.getenv(WEBHOOK_DELIVERY_CACHE_MAX_ENTRIES_ENV) or DEFAULT_MAX_ENTRIES)
+    path = os.getenv(WEBHOOK_DELIVERY_CACHE_PATH_ENV)
+
+    if path:
+        log.info(f"Using SQLite webhook delivery cache: {path}")
+        return SQLiteDeliveryCache(path, ttl_seconds, max_entries)
+    return InMemoryDeliveryCache(ttl_seconds, max_entries)
+
+
+# Initialize the cache so the webhook handler can use it
+delivery_cache = create_delivery_cache()
@@ -0,0 +1,214 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from utils.constants import REVIEW_QUEUE_MAX_SIZE_ENV, REVIEW_WORKER_CONCURRENCY_ENV
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+from .models import ReviewJob
+
+DEFAULT_QUEUE_MAX_SIZE = 100
+DEFAULT_WORKER_CONCURRENCY = 2
+
+JobHandler = Callable[[ReviewJob], Awaitable[Any]]
+
+
+class QueueFullError(Exception):
+    """Exception raised when a job is enqueued into a full queue"""
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class _Slot:
+    """A place in the queue, the job in it can be swapped while it's waiting"""
+
+    def __init__(self, job: ReviewJob):
+        self.job = job
+
+
+class JobQueue:
+    """
+    JobQueue is a bounded in-process queue of review jobs drained by a fixed number of async workers.
+    The webhook only enqueues, the long-running review happens in the workers, so GitHub gets its response in time.
+
+    Jobs with the same coalesce key (the same PR) are coalesced: a new trigger replaces the queued one in place.
+    A running job is cancelled when a newer job of the same PR turns out to review a different head commit.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, concurrency: Optional[int] = None, name: str = "review_queue"):
+        self._name = name
+        self._max_size = max_size if max_size is not None else _int_from_env(REVIEW_QUEUE_MAX_SIZE_ENV, DEFAULT_QUEUE_MAX_SIZE)
+        self._concurrency = concurrency if concurrency is not None else _int_from_env(REVIEW_WORKER_CONCURRENCY_ENV, DEFAULT_WORKER_CONCURRENCY)
+        if self._concurrency < 1:
+            raise ValueError(f"{self._name}: concurrency must be at least 1, got {self._concurrency}")
+
+        self._queue: asyncio.Queue[_Slot] = asyncio.Queue(maxsize=self._max_size)
+        self._workers: List[asyncio.Task] = []
+        self._in_flight = 0
+        # Queued slots by coalesce key
+        self._pending: Dict[Hashable, _Slot] = {}
+        # Running jobs by coalesce key and the head commit they review, once the job resolved it
+        self._running: Dict[Hashable, Dict[int, tuple[ReviewJob, Optional[str]]]] = {}
+
+        metrics.register_gauge(f"{self._name}.depth", lambda: self.depth)
+        metrics.register_gauge(f"{self._name}.in_flight", lambda: self.in_flight)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    @property
+    def running(self) -> bool:
+        return any(not w.done() for w in self._workers)
+
+    async def start(self, handler: JobHandler) -> None:
+        if self.running:
+            raise RuntimeError(f"{self._name}: workers are already running")
+
+        self._workers = [asyncio.create_task(self.__worker(i, handler), name=f"{self._name}-worker-{i}") for i in range(self._concurrency)]
+        log.info(f"{self._name}: started {self._concurrency} workers, max queue size: {self._max_size}")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        log.info(f"{self._name}: workers stopped, {self.depth} jobs left in the queue")
+
+    async def join(self) -> None:
+        """Waits until every enqueued job is processed"""
+        await self._queue.join()
+
+    def enqueue(self, job: ReviewJob) -> int:
+        """Puts the job into the queue without waiting, returns the queue depth after the insert"""
+        key = job.coalesce_key
+        head_sha = getattr(job, "head_sha", None)
+        if key is not None and head_sha:
+            self.__cancel_running(key, head_sha)
+
+        pending_slot = self._pending.get(key) if key is not None else None
+        if pending_slot is not None:
+            log.info(f"{self._name}: {job.describe()} replaced the queued job of the same PR")
+            pending_slot.job = job
+            metrics.increment(f"{self._name}.coalesced")
+            return self.depth
+
+        slot = _Slot(job)
+        try:
+            self._queue.put_nowait(slot)
+        except asyncio.QueueFull as e:
+            metrics.increment(f"{self._name}.rejected")
+            raise QueueFullError(f"{self._name}: queue is full ({self._max_size} jobs), rejected {job.describe()}") from e
+
+        if key is not None:
+            self._pending[key] = slot
+        metrics.increment(f"{self._name}.enqueued")
+        log.info(f"{self._name}: enqueued {job.describe()}, queue depth: {self.depth}")
+        return self.depth
+
+    def claim_head_sha(self, job: ReviewJob, head_sha: str) -> bool:
+        """
+        Records the head commit a running job reviews. Running jobs of the same PR on another head are cancelled.
+        Returns False if another running job already reviews the same head, the caller should skip its job then.
+        """
+        key = job.coalesce_key
+        if key is None:
+            return True
+
+        running = self._running.get(key, {})
+        for other_job, other_head_sha in running.values():
+            if other_job is not job and other_head_sha == head_sha and not other_job.cancel_token.cancelled:
+                log.info(f"{self._name}: {job.describe()} skipped, head {head_sha} is already under review")
+                metrics.increment(f"{self._name}.skipped")
+                return False
+
+        self.__cancel_running(key, head_sha)
+        if id(job) in running:
+            running[id(job)] = (job, head_sha)
+        return True
+
+    def __cancel_running(self, key: Hashable, head_sha: str) -> None:
+        for other_job, other_head_sha in self._running.get(key, {}).values():
+            if other_head_sha is not None and other_head_sha != head_sha and not other_job.cancel_token.cancelled:
+                other_job.cancel_token.cancel(f"Review of {other_head_sha} was superseded by a review of {head_sha}")
+                metrics.increment(f"{self._name}.cancelled")
+                log.info(f"{self._name}: cancelled {other_job.describe()}, head {other_head_sha} was superseded by {head_sha}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "in_flight": self.in_flight,
+            "concurrency": self._concurrency,
+            "max_size": self._max_size,
+        }
+
+    async def __worker(self, worker_id: int, handler: JobHandler) -> None:
+        while True:
+            slot = await self._queue.get()
+            job = slot.job
+            key = job.coalesce_key
+            if key is not None:
+                if self._pending.get(key) is slot:
+                    del self._pending[key]
+                self._running.setdefault(key, {})[id(job)] = (job, getattr(job, "head_sha", None))
+            self._in_flight += 1
+            try:
+                log.info(f"{self._name}: worker {worker_id} picked up {job.describe()}")
+                with metrics.timer(f"{self._name}.job_duration"):
+                    await handler(job)
+                metrics.increment(f"{self._name}.completed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The worker must survive a failing job, otherwise the pool shrinks with every error
+                metrics.increment(f"{self._name}.failed")
+                log.error(f"{self._name}: worker {worker_id} failed to process {job.describe()}: {e}")
+            finally:
+                if key is not None:
+                    running = self._running.get(key, {})
+                    running.pop(id(job), None)
+                    if not running:
+                        self._running.pop(key, None)
+                self._in_flight -= 1
+                self._queue.task_done()
+
+
+def _int_from_env(env_var: str, default: int) -> int:
+    value = os.getenv(env_var)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError as e:
+        raise ValueError(f"Environment variable {env_var} must be an integer, got: {value}") from e
+
+
+# Initialize the queue so the webhook and the app lifecycle share the same instance
+review_queue = JobQueue()
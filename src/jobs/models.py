@@ -0,0 +1,69 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from utils.cancellation import CancellationToken
+
+
+@dataclass
+class ReviewJob:
+    """Base class of the jobs processed by the review workers"""
+
+    repo_name: str
+    pr_number: int
+    installation_id: int
+    delivery_id: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    cancel_token: CancellationToken = field(default_factory=CancellationToken, repr=False, compare=False)
+
+    @property
+    def pr_key(self) -> Tuple[str, int]:
+        return self.repo_name, self.pr_number
+
+    @property
+    def coalesce_key(self) -> Optional[Tuple[str, int]]:
+        """Jobs with the same key replace each other while queued, None means the job is never coalesced"""
+        return None
+
+    def describe(self) -> str:
+        return (
+            f"{type(self).__name__}(repo_name: {self.repo_name}, pr_number: {self.pr_number}, "
+            f"installation_id: {self.installation_id}, delivery_id: {self.delivery_id})"
+        )
+
+
+@dataclass
+class CodeReviewJob(ReviewJob):
+    """Full code review of a pull request, triggered by a PR event or an "@alfred review" comment"""
+
+    # Known only for PR events, comment triggered reviews resolve the head when the job starts
+    head_sha: Optional[str] = None
+
+    @property
+    def coalesce_key(self) -> Optional[Tuple[str, int]]:
+        # Only the latest review of a PR is worth running, older queued triggers are superseded by it
+        return self.pr_key
+
+
+@dataclass
+class ReviewChatJob(ReviewJob):
+    """Reply to a human review comment in a thread started by Alfred, every comment gets its own reply so these are never coalesced"""
+
+    comment: Dict[str, Any] = field(default_factory=dict)
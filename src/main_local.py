@@ -18,15 +18,34 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import asyncio
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
 from fastapi import FastAPI, HTTPException, Request
 
 import handle_pr
 from auth import fastapi_validate_github_signature
-from utils.constants import GITHUB_EVENT_HEADER
+from jobs import review_queue
+from utils.constants import GITHUB_DELIVERY_HEADER, GITHUB_EVENT_HEADER
+from utils.embeddings import embedding_service
+from utils.metrics import metrics
+from utils.tool_runner import tool_runner
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # The tool workers are forked before the first review, while the process is still small
+    await asyncio.to_thread(tool_runner.start)
+    # The embedding model is loaded and warmed up before the first review needs it
+    await asyncio.to_thread(embedding_service.start)
+    await review_queue.start(handle_pr.run_review_job)
+    yield
+    await review_queue.stop()
+    await asyncio.to_thread(tool_runner.stop)
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.post("/api/webhook")
@@ -37,10 +56,20 @@ async def webhook(request: Request):
         raise HTTPException(HTTPStatus.BAD_REQUEST, "missing x-github-event header")
 
     payload = await request.json()
-    result = await handle_pr.handle_github_event(payload, x_github_event)
+    result = await handle_pr.handle_github_event(payload, x_github_event, request.headers.get(GITHUB_DELIVERY_HEADER))
     return result
 
 
+@app.get("/api/queue")
+async def queue_stats():
+    return review_queue.stats()
+
+
+@app.get("/api/metrics")
+async def metrics_snapshot():
+    return metrics.snapshot()
+
+
 if __name__ == "__main__":
     import uvicorn
 
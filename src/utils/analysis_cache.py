@@ -0,0 +1,64 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import json
+import os
+from typing import Any, Optional
+
+from utils.constants import STATIC_ANALYZER_CACHE_DIR_ENV, STATIC_ANALYZER_CACHE_MAX_ENTRIES_ENV
+from utils.disk_lru_store import DiskLruStore
+from utils.logging_config import logger as log
+from utils.tmp_dir import tmp_dir
+
+DEFAULT_MAX_ENTRIES = 2048
+
+
+class AnalysisCache:
+    """
+    AnalysisCache stores the static analysis results of the modules on the local disk, keyed by the hash of their
+    content. The least recently used results are evicted when the number of entries exceeds the limit.
+    """
+
+    def __init__(self, directory: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.__store = DiskLruStore("analysis_cache", directory, max_entries, suffix=".json", weigh_bytes=False)
+
+    def __len__(self) -> int:
+        return len(self.__store)
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        content = self.__store.read(key)
+        if content is None:
+            return None
+        try:
+            return json.loads(content)
+        except ValueError as e:
+            log.error(f"Error reading the cached analysis {key}: {e}")
+            self.__store.forget(key)
+            return None
+
+    def put(self, key: str, value: dict[str, Any]) -> None:
+        self.__store.write(key, json.dumps(value).encode("utf-8"))
+
+
+def create_analysis_cache() -> AnalysisCache:
+    directory = os.getenv(STATIC_ANALYZER_CACHE_DIR_ENV) or os.path.join(tmp_dir(), "static_analysis_cache")
+    max_entries = int(os.getenv(STATIC_ANALYZER_CACHE_MAX_ENTRIES_ENV) or DEFAULT_MAX_ENTRIES)
+    return AnalysisCache(directory, max_entries)
+
+
+# Initialize the cache so every static analyzer run of the process shares it
+analysis_cache = create_analysis_cache()
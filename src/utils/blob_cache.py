@@ -0,0 +1,75 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import hashlib
+import os
+from typing import Optional
+
+from utils.constants import BLOB_CACHE_DIR_ENV, BLOB_CACHE_MAX_BYTES_ENV
+from utils.disk_lru_store import DiskLruStore
+from utils.metrics import metrics
+from utils.tmp_dir import tmp_dir
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def git_blob_sha(content: bytes) -> str:
+    """Computes the SHA git assigns to a blob with the given content"""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class BlobCache:
+    """
+    BlobCache is a content-addressed, size-bounded LRU cache of git blobs on the local disk.
+    Blobs are immutable, so an entry never goes stale: the same SHA always has the same content,
+    regardless of the commit, branch or PR it was read from.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.__store = DiskLruStore("blob_cache", directory, max_bytes)
+
+    @property
+    def total_bytes(self) -> int:
+        return self.__store.total_weight
+
+    def __len__(self) -> int:
+        return len(self.__store)
+
+    def __contains__(self, sha: str) -> bool:
+        return sha in self.__store
+
+    def get(self, sha: str) -> Optional[bytes]:
+        content = self.__store.read(sha)
+        metrics.increment("blob_cache.misses" if content is None else "blob_cache.hits")
+        return content
+
+    def put(self, sha: str, content: bytes) -> None:
+        if git_blob_sha(content) != sha:
+            raise ValueError(f"Content doesn't match blob SHA {sha}")
+        # A blob never changes, a cached one is only marked as used
+        if not self.__store.touch(sha):
+            self.__store.write(sha, content)
+
+
+def create_blob_cache() -> BlobCache:
+    directory = os.getenv(BLOB_CACHE_DIR_ENV) or os.path.join(tmp_dir(), "blob_cache")
+    max_bytes = int(os.getenv(BLOB_CACHE_MAX_BYTES_ENV) or DEFAULT_MAX_BYTES)
+    return BlobCache(directory, max_bytes)
+
+
+# Initialize the cache so every review of the process shares it
+blob_cache = create_blob_cache()
@@ -0,0 +1,56 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import threading
+from typing import Optional
+
+
+class ReviewCancelledError(Exception):
+    """Exception raised when a running review is cancelled because a newer review superseded it"""
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class CancellationToken:
+    """
+    CancellationToken is a thread-safe flag shared between the job queue and a running graph.
+    Graph nodes run in worker threads, so cancellation is cooperative: the graph checks the token between nodes.
+    """
+
+    def __init__(self) -> None:
+        self.__event = threading.Event()
+        self.__reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__event.is_set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        return self.__reason
+
+    def cancel(self, reason: str) -> None:
+        if self.__event.is_set():
+            return
+        self.__reason = reason
+        self.__event.set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.__event.is_set():
+            raise ReviewCancelledError(self.__reason or "Review was cancelled")
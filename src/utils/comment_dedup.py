@@ -0,0 +1,277 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+from collections import defaultdict
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+from utils.metrics import metrics
+from utils.models import ReviewComment
+
+# Comments closer than this many lines are about the same code
+LINE_DISTANCE_LIMIT = 5
+
+EXACT_BACKEND = "exact"
+ANN_BACKEND = "ann"
+AUTO_BACKEND = "auto"
+BACKENDS = (EXACT_BACKEND, ANN_BACKEND, AUTO_BACKEND)
+
+# The auto backend compares the comments with a similarity matrix up to this many pairs, about 8 MB of float64,
+# and goes through the file buckets and their ANN indexes above it
+DEFAULT_EXACT_MAX_PAIRS = 1_000_000
+
+# A pair with a cosine similarity of 0.9 has the same sign on a random hyperplane 86% of the time,
+# so it shares a bucket of 8 hyperplanes in at least one of 24 tables 99.97% of the time,
+# while unrelated comments share one about 9% of the time
+LSH_TABLES = 24
+LSH_BITS = 8
+
+Encoder = Callable[[list[str]], np.ndarray]
+Similarity = Callable[[np.ndarray, np.ndarray], Any]
+
+
+def similar_mask(similarity: Any, comments1: Sequence[ReviewComment], comments2: Sequence[ReviewComment],
+                 similarity_limit: float, total_similarity_limit: float) -> np.ndarray:
+    """
+    Returns the n x m matrix telling which comments of the two lists are similar: they are in the same file and their
+    messages are equal regardless of the lines, or their messages are similar and their lines are close.
+    """
+    # The limits are compared with the similarities as Python floats, like the per pair checks did
+    similarity = np.asarray(similarity, dtype=np.float64).reshape(len(comments1), len(comments2))
+
+    # Equal filenames get equal codes, so the filenames are compared as integers
+    _, codes = np.unique([c.filename for c in comments1] + [c.filename for c in comments2], return_inverse=True)
+    same_file = codes[:len(comments1), None] == codes[None, len(comments1):]
+
+    lines1 = np.array([c.line_number for c in comments1], dtype=np.int64)
+    lines2 = np.array([c.line_number for c in comments2], dtype=np.int64)
+    close_lines = np.abs(lines1[:, None] - lines2[None, :]) < LINE_DISTANCE_LIMIT
+
+    return same_file & ((similarity > total_similarity_limit) | ((similarity > similarity_limit) & close_lines))
+
+
+def first_unique(duplicates: np.ndarray) -> list[int]:
+    """
+    Resolves the duplicates of a list greedily: a comment is kept if no kept comment before it is similar to it.
+    Only the upper triangle of the n x n matrix is used.
+    """
+    duplicates = np.triu(duplicates, k=1)
+    excluded = np.zeros(duplicates.shape[0], dtype=bool)
+    kept = []
+    for i in range(duplicates.shape[0]):
+        if excluded[i]:
+            continue
+        kept.append(i)
+        excluded |= duplicates[i]
+    return kept
+
+
+class LshIndex:
+    """
+    Random hyperplane LSH index of normalised vectors: a table hashes a vector to the signs of its projections on a few
+    random hyperplanes, so vectors with a small angle between them share a bucket in at least one table.
+    The buckets are kept as sorted codes, the memory is linear in the number of vectors.
+    """
+
+    def __init__(self, vectors: np.ndarray, tables: int = LSH_TABLES, bits: int = LSH_BITS, seed: int = 0):
+        self.__tables = tables
+        self.__bits = bits
+        # The same seed gives the same hyperplanes, so the codes of two indexes can be compared
+        self.__planes = np.random.default_rng(seed).standard_normal((vectors.shape[1], tables * bits)).astype(np.float32)
+        self.__weights = (1 << np.arange(bits)).astype(np.int32)
+        self.codes = self.hash(vectors)
+        # One sorted row of codes per table, with the indexes of the vectors in the same order
+        self.__order = np.argsort(self.codes.T, axis=1, kind="stable").astype(np.int32)
+        self.__sorted_codes = np.take_along_axis(self.codes.T, self.__order, axis=1)
+
+    def hash(self, vectors: np.ndarray) -> np.ndarray:
+        """Returns the n x tables bucket codes of the vectors"""
+        signs = (vectors @ self.__planes > 0).reshape(len(vectors), self.__tables, self.__bits)
+        return (signs.astype(np.int32) * self.__weights).sum(axis=2, dtype=np.int32)
+
+    def buckets(self, codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the n x tables start and end positions of the buckets of the codes in the sorted tables"""
+        starts = np.empty(codes.shape, dtype=np.int64)
+        ends = np.empty(codes.shape, dtype=np.int64)
+        for table in range(self.__tables):
+            starts[:, table] = np.searchsorted(self.__sorted_codes[table], codes[:, table], side="left")
+            ends[:, table] = np.searchsorted(self.__sorted_codes[table], codes[:, table], side="right")
+        return starts, ends
+
+    def members(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Returns the indexes of the vectors in the buckets of one vector, given by buckets(), with repetitions"""
+        return np.concatenate([order[start:end] for order, start, end in zip(self.__order, starts, ends)])
+
+
+class _LineWindow:
+    """Finds the comments closer than LINE_DISTANCE_LIMIT lines to a line, through the sorted line numbers"""
+
+    def __init__(self, lines: np.ndarray):
+        self.__order = np.argsort(lines, kind="stable")
+        self.__sorted_lines = lines[self.__order]
+
+    def around(self, line: int) -> np.ndarray:
+        start = np.searchsorted(self.__sorted_lines, line - LINE_DISTANCE_LIMIT, side="right")
+        end = np.searchsorted(self.__sorted_lines, line + LINE_DISTANCE_LIMIT, side="left")
+        return self.__order[start:end]
+
+
+def _normalized(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), np.float32(1e-12))
+
+
+def _lines(comments: Sequence[ReviewComment]) -> np.ndarray:
+    return np.array([c.line_number for c in comments], dtype=np.int64)
+
+
+def _similar(vectors: np.ndarray, lines: np.ndarray, candidates: np.ndarray, vector: np.ndarray, line: int,
+             similarity_limit: float, total_similarity_limit: float) -> np.ndarray:
+    """Returns the candidates similar to the comment of the given vector and line, the comments are in the same file"""
+    similarity = (vectors[candidates] @ vector).astype(np.float64)
+    close_lines = np.abs(lines[candidates] - line) < LINE_DISTANCE_LIMIT
+    return candidates[(similarity > total_similarity_limit) | ((similarity > similarity_limit) & close_lines)]
+
+
+def _unique_with_index(new_embeddings: np.ndarray, new_lines: np.ndarray, existing_embeddings: np.ndarray,
+                       existing_lines: np.ndarray, similarity_limit: float, total_similarity_limit: float) -> list[int]:
+    """
+    Deduplicates the comments of one file without a similarity matrix. Only two kinds of pairs can be similar:
+    the ones with close lines, all found through the line windows, and the nearly equal ones, found through the LSH
+    index. The similarity of the candidates is computed exactly, a nearly equal pair the index misses is kept.
+    """
+    new_vectors = _normalized(new_embeddings)
+    new_index = LshIndex(new_vectors)
+    new_starts, new_ends = new_index.buckets(new_index.codes)
+    new_window = _LineWindow(new_lines)
+
+    excluded = np.zeros(len(new_vectors), dtype=bool)
+    kept = []
+    for i in range(len(new_vectors)):
+        if excluded[i]:
+            continue
+        kept.append(i)
+        candidates = np.unique(np.concatenate([new_index.members(new_starts[i], new_ends[i]),
+                                                new_window.around(new_lines[i])]))
+        candidates = candidates[candidates > i]
+        excluded[_similar(new_vectors, new_lines, candidates, new_vectors[i], new_lines[i], similarity_limit,
+                          total_similarity_limit)] = True
+
+    if not len(existing_embeddings):
+        return kept
+
+    existing_vectors = _normalized(existing_embeddings)
+    existing_index = LshIndex(existing_vectors)
+    existing_window = _LineWindow(existing_lines)
+    starts, ends = existing_index.buckets(existing_index.hash(new_vectors[kept]))
+    unique = []
+    for i, kept_starts, kept_ends in zip(kept, starts, ends):
+        candidates = np.unique(np.concatenate([existing_index.members(kept_starts, kept_ends),
+                                               existing_window.around(new_lines[i])]))
+        if not len(_similar(existing_vectors, existing_lines, candidates, new_vectors[i], new_lines[i],
+                            similarity_limit, total_similarity_limit)):
+            unique.append(i)
+    return unique
+
+
+def _unique_with_matrix(new_review_comments: Sequence[ReviewComment], new_embeddings: np.ndarray,
+                        review_comments: Sequence[ReviewComment], existing_embeddings: np.ndarray,
+                        similarity: Similarity, similarity_limit: float, total_similarity_limit: float) -> list[int]:
+    # First we remove the duplications from the new comments with the n x n similarity matrix of their messages.
+    # In each row, the comments after the row's comment with a similar message, a close line number and the same file
+    # are excluded, unless the row's comment was excluded itself:
+
+    #   0  1   2   3   4
+    # 0 1 0.1 0.3 0.8 0.1 -- The comment with index 3 is similar to index 0, so it's removed
+    # 1 -  1  0.2 0.3 0.9 -- The comment with index 4 is similar to index 1, so it's removed
+    # 2 -  -   1  0.2 0.3
+    # 3 -  -   -   1  0.1
+    # 4 -  -   -   -   1
+
+    new_similarity = similarity(new_embeddings, new_embeddings)
+    kept = first_unique(similar_mask(new_similarity, new_review_comments, new_review_comments, similarity_limit,
+                                     total_similarity_limit))
+
+    if not review_comments:
+        return kept
+
+    # Now the rows are the kept new comments and the columns are the existing ones,
+    # a new comment similar to even one existing comment is removed:
+
+    #    0   1   2
+    # 0 0.2 0.1 0.3
+    # 1 0.8 0.2 0.5 --> This new comment is similar to the first existing comment (0.8)
+    # 2 0.1 0.2 0.1
+
+    new_and_existing_similarity = similarity(new_embeddings[kept], existing_embeddings)
+    exists = similar_mask(new_and_existing_similarity, [new_review_comments[i] for i in kept], review_comments,
+                          similarity_limit, total_similarity_limit).any(axis=1)
+    return [i for i, comment_exists in zip(kept, exists) if not comment_exists]
+
+
+def remove_duplicate_comments(review_comments: Sequence[ReviewComment], new_review_comments: Sequence[ReviewComment],
+                              encode: Encoder, similarity: Similarity, similarity_limit: float,
+                              total_similarity_limit: float, backend: str = AUTO_BACKEND,
+                              exact_max_pairs: int = DEFAULT_EXACT_MAX_PAIRS) -> list[ReviewComment]:
+    """
+    Removes the new comments similar to an earlier new comment, then the ones similar to an existing comment.
+    Every message is encoded once.
+
+    The exact backend compares all the comments with similarity matrices. The ANN backend compares only the comments
+    of the same file, as comments of different files are never similar, and looks the candidates of each file up in
+    LSH indexes instead of matrices, so the memory stays linear in the number of comments. The auto backend uses the
+    matrices while they have at most exact_max_pairs pairs, for the whole review or for a file.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown comment dedup backend: {backend}, expected one of {', '.join(BACKENDS)}")
+    if not new_review_comments:
+        return []
+
+    new_embeddings = encode([c.comment for c in new_review_comments])
+    existing_embeddings = encode([c.comment for c in review_comments]) if review_comments else new_embeddings[:0]
+
+    pairs = len(new_review_comments) * (len(new_review_comments) + len(review_comments))
+    if backend == EXACT_BACKEND or (backend == AUTO_BACKEND and pairs <= exact_max_pairs):
+        metrics.increment("comment_dedup.exact")
+        kept = _unique_with_matrix(new_review_comments, new_embeddings, review_comments, existing_embeddings,
+                                   similarity, similarity_limit, total_similarity_limit)
+        return [new_review_comments[i] for i in kept]
+
+    buckets: dict[str, tuple[list[int], list[int]]] = defaultdict(lambda: ([], []))
+    for i, comment in enumerate(new_review_comments):
+        buckets[comment.filename][0].append(i)
+    for j, comment in enumerate(review_comments):
+        if comment.filename in buckets:
+            buckets[comment.filename][1].append(j)
+
+    unique = np.zeros(len(new_review_comments), dtype=bool)
+    for new_indexes, existing_indexes in buckets.values():
+        new_bucket = [new_review_comments[i] for i in new_indexes]
+        existing_bucket = [review_comments[j] for j in existing_indexes]
+        if backend == AUTO_BACKEND and len(new_indexes) * (len(new_indexes) + len(existing_indexes)) <= exact_max_pairs:
+            metrics.increment("comment_dedup.exact_buckets")
+            kept = _unique_with_matrix(new_bucket, new_embeddings[new_indexes], existing_bucket,
+                                       existing_embeddings[existing_indexes], similarity, similarity_limit,
+                                       total_similarity_limit)
+        else:
+            metrics.increment("comment_dedup.ann_buckets")
+            kept = _unique_with_index(new_embeddings[new_indexes], _lines(new_bucket),
+                                      existing_embeddings[existing_indexes], _lines(existing_bucket), similarity_limit,
+                                      total_similarity_limit)
+        unique[np.asarray(new_indexes)[kept]] = True
+    return [comment for comment, comment_unique in zip(new_review_comments, unique) if comment_unique]
@@ -29,4 +29,43 @@ GITHUB_SIGNATURE_HEADER = "x-hub-signature-256"
 GITHUB_WEBHOOK_SECRET_ENV = "GITHUB_WEBHOOK_SECRET"
 LANGCHAIN_API_KEY_ENV = "LANGCHAIN_API_KEY"
 TMP_DIR_ENV = "TMP_DIR"
-AGENT_MODE_ENV = "AGENT_MODE"
\ No newline at end of file
+AGENT_MODE_ENV = "AGENT_MODE"
+REVIEW_QUEUE_MAX_SIZE_ENV = "REVIEW_QUEUE_MAX_SIZE"
+REVIEW_WORKER_CONCURRENCY_ENV = "REVIEW_WORKER_CONCURRENCY"
+GITHUB_DELIVERY_HEADER = "x-github-delivery"
+WEBHOOK_DELIVERY_CACHE_MAX_ENTRIES_ENV = "WEBHOOK_DELIVERY_CACHE_MAX_ENTRIES"
+WEBHOOK_DELIVERY_CACHE_PATH_ENV = "WEBHOOK_DELIVERY_CACHE_PATH"
+WEBHOOK_DELIVERY_CACHE_TTL_SECONDS_ENV = "WEBHOOK_DELIVERY_CACHE_TTL_SECONDS"
+GITHUB_FETCH_MODE_ENV = "GITHUB_FETCH_MODE"
+BLOB_CACHE_DIR_ENV = "BLOB_CACHE_DIR"
+BLOB_CACHE_MAX_BYTES_ENV = "BLOB_CACHE_MAX_BYTES"
+REPO_SNAPSHOT_MODE_ENV = "REPO_SNAPSHOT_MODE"
+REPO_SNAPSHOT_DIR_ENV = "REPO_SNAPSHOT_DIR"
+REPO_SNAPSHOT_MAX_BYTES_ENV = "REPO_SNAPSHOT_MAX_BYTES"
+REPO_SNAPSHOT_MAX_ENTRIES_ENV = "REPO_SNAPSHOT_MAX_ENTRIES"
+STATIC_ANALYZER_WORKSPACES_ENV = "STATIC_ANALYZER_WORKSPACES"
+STATIC_ANALYZER_WORKSPACE_DIR_ENV = "STATIC_ANALYZER_WORKSPACE_DIR"
+STATIC_ANALYZER_WORKSPACE_TMPFS_ENV = "STATIC_ANALYZER_WORKSPACE_TMPFS"
+TERRAFORM_PLUGIN_CACHE_DIR_ENV = "TERRAFORM_PLUGIN_CACHE_DIR"
+TERRAFORM_PROVIDER_MIRROR_DIR_ENV = "TERRAFORM_PROVIDER_MIRROR_DIR"
+TERRAFORM_OFFLINE_ENV = "TERRAFORM_OFFLINE"
+STATIC_ANALYZER_MAX_PARALLEL_ENV = "STATIC_ANALYZER_MAX_PARALLEL"
+STATIC_ANALYZER_CACHE_DIR_ENV = "STATIC_ANALYZER_CACHE_DIR"
+STATIC_ANALYZER_CACHE_MAX_ENTRIES_ENV = "STATIC_ANALYZER_CACHE_MAX_ENTRIES"
+STATIC_ANALYZER_OUTPUT_MODE_ENV = "STATIC_ANALYZER_OUTPUT_MODE"
+TOOL_RUNNER_WORKERS_ENV = "TOOL_RUNNER_WORKERS"
+TOOL_RUNNER_TIMEOUT_SECONDS_ENV = "TOOL_RUNNER_TIMEOUT_SECONDS"
+TOOL_RUNNER_MEMORY_LIMIT_BYTES_ENV = "TOOL_RUNNER_MEMORY_LIMIT_BYTES"
+CROSS_REFERENCE_MODE_ENV = "CROSS_REFERENCE_MODE"
+HCL_INDEX_CACHE_DIR_ENV = "HCL_INDEX_CACHE_DIR"
+HCL_INDEX_CACHE_MAX_ENTRIES_ENV = "HCL_INDEX_CACHE_MAX_ENTRIES"
+CROSS_REFERENCE_MAX_ITERATIONS_ENV = "CROSS_REFERENCE_MAX_ITERATIONS"
+CODE_REVIEWER_CONTEXT_TOKEN_BUDGET_ENV = "CODE_REVIEWER_CONTEXT_TOKEN_BUDGET"
+EMBEDDING_MODEL_ENV = "EMBEDDING_MODEL"
+EMBEDDING_CACHE_PATH_ENV = "EMBEDDING_CACHE_PATH"
+EMBEDDING_CACHE_MAX_ENTRIES_ENV = "EMBEDDING_CACHE_MAX_ENTRIES"
+COMMENT_DEDUP_BACKEND_ENV = "COMMENT_DEDUP_BACKEND"
+COMMENT_DEDUP_EXACT_MAX_PAIRS_ENV = "COMMENT_DEDUP_EXACT_MAX_PAIRS"
+EMBEDDING_BACKEND_ENV = "EMBEDDING_BACKEND"
+EMBEDDING_ONNX_MODEL_DIR_ENV = "EMBEDDING_ONNX_MODEL_DIR"
+EMBEDDING_ONNX_MODEL_FILE_ENV = "EMBEDDING_ONNX_MODEL_FILE"
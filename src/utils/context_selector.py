@@ -0,0 +1,186 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import math
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from utils.hcl_index import FileIndex, find_references, index_file, resolve_source
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+from utils.models import ContextFile
+
+if TYPE_CHECKING:
+    # graphs imports the nodes, which import this module
+    from graphs.states import FileChange
+
+DEFAULT_TOKEN_BUDGET = 48_000
+# Rough size of a token in the Terraform code, no tokenizer is needed to compare the files with the budget
+CHARS_PER_TOKEN = 4
+TRUNCATED_NOTE = "# Only the symbol signatures of this file are shown, the file doesn't fit into the review context"
+
+
+@dataclass(frozen=True)
+class ContextSelection:
+    files: list[ContextFile]
+    full: int
+    summarized: int
+    dropped: int
+    tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _changed_lines(changed_code: str) -> str:
+    """Removes the +/- markers of the changed lines"""
+    return "\n".join(line[1:] if line[:1] in ("+", "-", " ") else line for line in changed_code.splitlines())
+
+
+def _seeds(indexes: dict[str, FileIndex], changes: Iterable["FileChange"]) -> set[tuple[str, str]]:
+    """Returns the symbols touched by the changes: the ones declared by the changed blocks or referenced by the changed lines"""
+    seeds: set[tuple[str, str]] = set()
+    for change in changes:
+        filename = change["filename"]
+        directory = os.path.dirname(filename)
+        code = _changed_lines(change["changed_code"])
+        seeds.update((directory, ref.address) for ref in find_references(filename, code))
+        seeds.update((directory, address) for address in index_file(filename, code).declarations())
+
+        index = indexes.get(filename)
+        # The lines of a removed hunk are in the base file, they don't locate the blocks of the head file
+        if index is None or change["status"] == "removed":
+            continue
+        first = change["start_line"]
+        last = first + max(len(change["changed_code"].splitlines()) - 1, 0)
+        for address, symbol in index.declarations().items():
+            if symbol.line <= last and first <= max(symbol.end_line, symbol.line):
+                seeds.add((directory, address))
+    return seeds
+
+
+def _symbols(index: FileIndex) -> tuple[set[tuple[str, str]], set[tuple[str, str]]]:
+    """Returns the declared and the referenced symbols of a file, scoped by the folder of the module"""
+    directory = index.directory
+    declared = {(directory, address) for address in index.declarations()}
+    # Every file of a module folder is related to the module blocks calling it
+    declared.add((directory, "module-folder"))
+    referenced = {(directory, ref.address) for ref in index.references}
+    for call in index.modules.values():
+        child = resolve_source(directory, call.source)
+        if child is not None:
+            referenced.add((child, "module-folder"))
+    return declared, referenced
+
+
+def rank_context_files(files: list[ContextFile], changes: Iterable["FileChange"]) -> list[tuple[ContextFile, Optional[int]]]:
+    """
+    Ranks the context files by their reference distance from the changes: 0 for the changed files, 1 for the files
+    declaring or referencing a symbol of the changed blocks, 2 for the files related to those, and so on.
+    Files unrelated to the changes have no distance and come last.
+    """
+    changes = list(changes)
+    indexes = {file.path: index_file(file.path, file.content) for file in files}
+    symbols = {path: _symbols(index) for path, index in indexes.items()}
+
+    # A file is related to the files declaring what it references and to the files referencing what it declares
+    declarers: dict[tuple[str, str], set[str]] = {}
+    referencers: dict[tuple[str, str], set[str]] = {}
+    for path, (declared, referenced) in symbols.items():
+        for symbol in declared:
+            declarers.setdefault(symbol, set()).add(path)
+        for symbol in referenced:
+            referencers.setdefault(symbol, set()).add(path)
+
+    changed = {change["filename"] for change in changes}
+    distances: dict[str, int] = {path: 0 for path in indexes if path in changed}
+    for symbol in _seeds(indexes, changes):
+        for path in declarers.get(symbol, set()) | referencers.get(symbol, set()):
+            distances.setdefault(path, 1)
+
+    queue = deque(sorted(distances, key=lambda path: distances[path]))
+    while queue:
+        path = queue.popleft()
+        declared, referenced = symbols[path]
+        neighbours = set()
+        for symbol in referenced:
+            neighbours |= declarers.get(symbol, set())
+        for symbol in declared:
+            neighbours |= referencers.get(symbol, set())
+        for neighbour in sorted(neighbours):
+            if neighbour not in distances:
+                distances[neighbour] = distances[path] + 1
+                queue.append(neighbour)
+
+    def key(file: ContextFile) -> tuple[float, int, str]:
+        return distances.get(file.path, math.inf), len(file.content), file.path
+
+    return [(file, distances.get(file.path)) for file in sorted(files, key=key)]
+
+
+def _labels(address: str) -> str:
+    return " ".join(f'"{label}"' for label in address.split(".", 1))
+
+
+def summarize_file(file: ContextFile) -> ContextFile:
+    """Replaces the content of a file with the signatures of its blocks"""
+    index = index_file(file.path, file.content)
+    signatures: list[tuple[int, str]] = []
+    signatures.extend((v.line, f'variable "{name}" {{}}' + ("" if v.has_default else "  # required")) for name, v in index.variables.items())
+    signatures.extend((s.line, f"local.{name} = ...") for name, s in index.locals.items())
+    signatures.extend((s.line, f"resource {_labels(name)} {{}}") for name, s in index.resources.items())
+    signatures.extend((s.line, f"data {_labels(name)} {{}}") for name, s in index.data_sources.items())
+    signatures.extend(
+        (m.line, f'module "{name}" {{ source = "{m.source}", inputs = [{", ".join(sorted(m.inputs))}] }}')
+        for name, m in index.modules.items()
+    )
+    signatures.extend((s.line, f'output "{name}" {{}}') for name, s in index.outputs.items())
+    signatures.extend((s.line, f"{name} = ...") for name, s in index.tfvars.items())
+    lines = [TRUNCATED_NOTE] + [f"{line}: {signature}" for line, signature in sorted(signatures)]
+    return ContextFile(path=file.path, content="\n".join(lines))
+
+
+def select_context_files(files: list[ContextFile], changes: Iterable["FileChange"], token_budget: int) -> ContextSelection:
+    """
+    Packs the most relevant context files into the token budget. A file that doesn't fit is replaced by the
+    signatures of its blocks, it is dropped if even those don't fit.
+    """
+    selected: list[ContextFile] = []
+    full = summarized = tokens = 0
+    for file, _ in rank_context_files(files, changes):
+        size = estimate_tokens(str(file))
+        if tokens + size <= token_budget:
+            selected.append(file)
+            full += 1
+            tokens += size
+            continue
+        summary = summarize_file(file)
+        size = estimate_tokens(str(summary))
+        if tokens + size <= token_budget:
+            selected.append(summary)
+            summarized += 1
+            tokens += size
+
+    selection = ContextSelection(selected, full, summarized, len(files) - full - summarized, tokens)
+    metrics.increment("code_reviewer.context_files_summarized", summarized)
+    metrics.increment("code_reviewer.context_files_dropped", selection.dropped)
+    log.info(f"Context selection: {full} of {len(files)} files in full, {summarized} summarized, {selection.dropped} dropped, "
+             f"~{tokens} of {token_budget} tokens")
+    return selection
@@ -0,0 +1,155 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+
+# Prefix of the files being written, they are skipped when the entries of a previous process are picked up
+_TMP_PREFIX = ".tmp"
+
+
+class DiskLruStore:
+    """
+    DiskLruStore keeps the entries of a cache as files on the local disk, one folder per first two characters of the
+    key, and evicts the least recently used ones when their total weight exceeds the capacity. The weight of an entry
+    is its size in bytes, or 1 when the capacity is a number of entries.
+    """
+
+    def __init__(self, name: str, directory: str, capacity: int, suffix: str = "", weigh_bytes: bool = True):
+        """
+        :param name: Name of the cache, the prefix of its metrics and log messages
+        :param directory: Folder of the entries
+        :param capacity: Maximum total weight of the entries
+        :param suffix: Extension of the entry files
+        :param weigh_bytes: Whether the weight of an entry is its size in bytes rather than 1
+        """
+        if capacity <= 0:
+            raise ValueError(f"{name}: The capacity must be positive")
+        self.__name = name
+        self.__directory = directory
+        self.__capacity = capacity
+        self.__suffix = suffix
+        self.__weigh_bytes = weigh_bytes
+        self.__lock = threading.Lock()
+        # Key -> weight, the least recently used entries are at the front
+        self.__entries: OrderedDict[str, int] = OrderedDict()
+        self.__total_weight = 0
+        self.__load_index()
+
+    @property
+    def total_weight(self) -> int:
+        return self.__total_weight
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self.__lock:
+            return key in self.__entries
+
+    def touch(self, key: str) -> bool:
+        """Marks the entry as the most recently used one, returns whether it exists"""
+        with self.__lock:
+            if key not in self.__entries:
+                return False
+            self.__entries.move_to_end(key)
+            return True
+
+    def read(self, key: str) -> Optional[bytes]:
+        if not self.touch(key):
+            return None
+        try:
+            with open(self.__path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            # Removed behind our back, forget it and let the caller compute it again
+            self.forget(key)
+            return None
+
+    def write(self, key: str, content: bytes) -> None:
+        weight = self.__weight(len(content))
+        if weight > self.__capacity:
+            return
+
+        path = self.__path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so a concurrent reader never sees a partial entry
+        fd, tmp_path = tempfile.mkstemp(prefix=_TMP_PREFIX, dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.error(f"{self.__name}: Error writing {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self.__lock:
+            self.__total_weight += weight - self.__entries.pop(key, 0)
+            self.__entries[key] = weight
+            self.__evict()
+
+    def forget(self, key: str) -> None:
+        with self.__lock:
+            weight = self.__entries.pop(key, None)
+            if weight is not None:
+                self.__total_weight -= weight
+
+    def __weight(self, size: int) -> int:
+        return size if self.__weigh_bytes else 1
+
+    def __evict(self) -> None:
+        while self.__total_weight > self.__capacity and self.__entries:
+            key, weight = self.__entries.popitem(last=False)
+            self.__total_weight -= weight
+            metrics.increment(f"{self.__name}.evictions")
+            try:
+                os.remove(self.__path(key))
+            except OSError:
+                pass
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.__directory, key[:2], f"{key}{self.__suffix}")
+
+    def __load_index(self) -> None:
+        """Picks up the entries stored by a previous process, the oldest modified ones are evicted first"""
+        if not os.path.isdir(self.__directory):
+            return
+
+        found = []
+        for prefix in os.listdir(self.__directory):
+            prefix_dir = os.path.join(self.__directory, prefix)
+            if len(prefix) != 2 or not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name.startswith(_TMP_PREFIX) or not name.startswith(prefix) or not name.endswith(self.__suffix):
+                    continue
+                stat = os.stat(os.path.join(prefix_dir, name))
+                found.append((stat.st_mtime, name.removesuffix(self.__suffix), stat.st_size))
+
+        with self.__lock:
+            for _, key, size in sorted(found):
+                self.__entries[key] = self.__weight(size)
+                self.__total_weight += self.__weight(size)
+            self.__evict()
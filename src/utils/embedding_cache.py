@@ -0,0 +1,148 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+import numpy as np
+
+from utils.constants import EMBEDDING_CACHE_MAX_ENTRIES_ENV, EMBEDDING_CACHE_PATH_ENV
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+from utils.tmp_dir import tmp_dir
+
+DEFAULT_MAX_ENTRIES = 100_000
+# SQLite versions before 3.32 allow at most 999 parameters in a statement
+_BATCH_SIZE = 500
+
+
+def embedding_key(model_id: str, text: str) -> str:
+    return hashlib.sha256(f"{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+
+def to_float16(embeddings: np.ndarray) -> np.ndarray:
+    """Rounds the embeddings to the stored precision, a fresh embedding is then the same as a cached one"""
+    return embeddings.astype(np.float16).astype(np.float32)
+
+
+class EmbeddingCache:
+    """
+    EmbeddingCache stores the embeddings of the texts in a SQLite file as float16 blobs, keyed by the hash of the
+    text and the id of the model. The least recently used embeddings are evicted when the number of entries
+    exceeds the limit. The file is only opened by the first lookup.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if max_entries <= 0:
+            raise ValueError("Embedding cache size must be positive")
+        self.__path = path
+        self.__max_entries = max_entries
+        self.__lock = threading.Lock()
+        self.__connection: Optional[sqlite3.Connection] = None
+        # Recency of the entries, a larger value is a more recent use
+        self.__clock = 0
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model_id: str, texts: Iterable[str]) -> dict[str, np.ndarray]:
+        """Returns the cached embeddings of the texts, the texts never seen before are left out"""
+        keys = {embedding_key(model_id, text): text for text in texts}
+        found: dict[str, np.ndarray] = {}
+        with self.__lock:
+            connection = self.__connect()
+            batch_keys = list(keys)
+            for start in range(0, len(batch_keys), _BATCH_SIZE):
+                batch = batch_keys[start:start + _BATCH_SIZE]
+                rows = connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, vector in rows:
+                    found[keys[key]] = np.frombuffer(vector, dtype=np.float16).astype(np.float32)
+                self.__clock += 1
+                connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", [(self.__clock, key) for key, _ in rows]
+                )
+
+        metrics.increment("embeddings.cache.hits", len(found))
+        metrics.increment("embeddings.cache.misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, model_id: str, embeddings: dict[str, np.ndarray]) -> None:
+        if not embeddings:
+            return
+        with self.__lock:
+            connection = self.__connect()
+            self.__clock += 1
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    [
+                        (embedding_key(model_id, text), embedding.astype(np.float16).tobytes(), self.__clock)
+                        for text, embedding in embeddings.items()
+                    ],
+                )
+                connection.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.__max_entries,),
+                )
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+
+    def __connect(self) -> sqlite3.Connection:
+        if self.__connection is None:
+            directory = os.path.dirname(self.__path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.__path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used INTEGER NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            # Continue the recency of the entries stored by a previous process
+            self.__clock = connection.execute("SELECT COALESCE(MAX(last_used), 0) FROM embeddings").fetchone()[0]
+            self.__connection = connection
+        return self.__connection
+
+
+def create_embedding_cache() -> Optional[EmbeddingCache]:
+    """Creates the embedding cache from the environment, EMBEDDING_CACHE_MAX_ENTRIES=0 disables it"""
+    max_entries = int(os.getenv(EMBEDDING_CACHE_MAX_ENTRIES_ENV) or DEFAULT_MAX_ENTRIES)
+    if max_entries <= 0:
+        log.info("Embedding cache is disabled")
+        return None
+    path = os.getenv(EMBEDDING_CACHE_PATH_ENV) or os.path.join(tmp_dir(), "embedding_cache.sqlite3")
+    return EmbeddingCache(path, max_entries)
+
+
+# Initialize the cache so every review of the process shares it
+embedding_cache = create_embedding_cache()
@@ -0,0 +1,158 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Literal, Optional, Protocol
+
+import numpy as np
+
+from utils.constants import (
+    EMBEDDING_BACKEND_ENV,
+    EMBEDDING_MODEL_ENV,
+    EMBEDDING_ONNX_MODEL_DIR_ENV,
+    EMBEDDING_ONNX_MODEL_FILE_ENV,
+)
+from utils.embedding_cache import EmbeddingCache, embedding_cache, to_float16
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+from utils.onnx_embeddings import DEFAULT_ONNX_MODEL_FILE, OnnxEmbeddingModel
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+WARM_UP_BATCH = ["Warm up the embedding model.", "The first batch allocates the buffers of the model."]
+
+TORCH_BACKEND = "torch"
+ONNX_BACKEND = "onnx"
+
+
+class EmbeddingModel(Protocol):
+    """The part of SentenceTransformer the service uses, implemented by the models of every backend"""
+
+    # Positional texts and a literal convert_to_numpy, so the overloads of SentenceTransformer.encode match
+    def encode(self, texts: list[str], /, *, convert_to_numpy: Literal[True] = True) -> np.ndarray: ...
+
+    def similarity(self, embeddings1: np.ndarray, embeddings2: np.ndarray) -> Any: ...
+
+
+def load_sentence_transformer(model_name: str) -> EmbeddingModel:
+    # Imported on load, so the processes of the onnx backend never import torch
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+class EmbeddingService:
+    """
+    EmbeddingService loads the sentence embedding model once per process and shares it between the reviews.
+    The model is loaded and warmed up by start(), or by the first encode() if the service wasn't started.
+    With a cache, only the texts never encoded before are passed to the model.
+    The model is a SentenceTransformer, unless load returns the model of another backend.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, cache: Optional[EmbeddingCache] = None,
+                 load: Optional[Callable[[], EmbeddingModel]] = None):
+        self.__model_name = model_name
+        self.__cache = cache
+        self.__load = load or (lambda: load_sentence_transformer(model_name))
+        self.__model: Optional[EmbeddingModel] = None
+        self.__load_lock = threading.Lock()
+        # The tokenizer of the model is not safe to call from several threads at once
+        self.__encode_lock = threading.Lock()
+
+    @property
+    def model_name(self) -> str:
+        return self.__model_name
+
+    @property
+    def loaded(self) -> bool:
+        return self.__model is not None
+
+    def start(self) -> None:
+        """Loads and warms up the model up front, so the first review doesn't pay for it"""
+        self.__get_model()
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        if self.__cache is None or not texts:
+            return self.__encode(texts)
+
+        try:
+            embeddings = self.__cache.get_many(self.__model_name, texts)
+        except sqlite3.Error as e:
+            log.error(f"Error reading the embedding cache: {e}")
+            return to_float16(self.__encode(texts))
+
+        missing = list(dict.fromkeys(text for text in texts if text not in embeddings))
+        if missing:
+            encoded = dict(zip(missing, to_float16(self.__encode(missing))))
+            try:
+                self.__cache.put_many(self.__model_name, encoded)
+            except sqlite3.Error as e:
+                log.error(f"Error writing the embedding cache: {e}")
+            embeddings.update(encoded)
+        return np.stack([embeddings[text] for text in texts])
+
+    def __encode(self, texts: list[str]) -> np.ndarray:
+        model = self.__get_model()
+        with metrics.timer("embeddings.encode"), self.__encode_lock:
+            embeddings = model.encode(texts, convert_to_numpy=True)
+        metrics.increment("embeddings.encoded_texts", len(texts))
+        return embeddings
+
+    def similarity(self, embeddings1: np.ndarray, embeddings2: np.ndarray) -> Any:
+        """Cosine similarity matrix of the two sets of embeddings, the rows belong to embeddings1"""
+        return self.__get_model().similarity(embeddings1, embeddings2)
+
+    def __get_model(self) -> EmbeddingModel:
+        model = self.__model
+        if model is not None:
+            return model
+
+        with self.__load_lock:
+            if self.__model is None:
+                start = time.perf_counter()
+                model = self.__load()
+                metrics.observe("embeddings.load", time.perf_counter() - start)
+
+                start = time.perf_counter()
+                model.encode(WARM_UP_BATCH, convert_to_numpy=True)
+                metrics.observe("embeddings.warm_up", time.perf_counter() - start)
+
+                log.info(f"Embedding model {self.__model_name} loaded")
+                self.__model = model
+            return self.__model
+
+
+def create_embedding_service() -> EmbeddingService:
+    backend = os.getenv(EMBEDDING_BACKEND_ENV, TORCH_BACKEND).lower()
+    if backend == TORCH_BACKEND:
+        return EmbeddingService(os.getenv(EMBEDDING_MODEL_ENV) or DEFAULT_EMBEDDING_MODEL, embedding_cache)
+    if backend != ONNX_BACKEND:
+        raise ValueError(f"{EMBEDDING_BACKEND_ENV} must be {TORCH_BACKEND} or {ONNX_BACKEND}, not {backend}")
+
+    model_dir = os.getenv(EMBEDDING_ONNX_MODEL_DIR_ENV)
+    if not model_dir:
+        raise ValueError(f"{EMBEDDING_ONNX_MODEL_DIR_ENV} must be set for the {ONNX_BACKEND} embedding backend")
+    model_file = os.getenv(EMBEDDING_ONNX_MODEL_FILE_ENV) or DEFAULT_ONNX_MODEL_FILE
+    # The quantised embeddings differ slightly from the torch ones, so they are cached under their own name
+    return EmbeddingService(f"{ONNX_BACKEND}:{os.path.join(model_dir, model_file)}", embedding_cache,
+                            load=lambda: OnnxEmbeddingModel(model_dir, model_file))
+
+
+# Initialize the service so every review of the process shares the model
+embedding_service = create_embedding_service()
@@ -0,0 +1,102 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+import github.Auth
+from github import Github, GithubIntegration
+
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+from utils.secret_manager import secret_manager
+
+# Installation tokens live for an hour, and a review keeps the token it started with until it ends, the snapshot
+# downloads and the comments of a review with slow inits and several LLM rounds come late. A token is only handed to
+# a new review while it has more time left than the longest review takes.
+DEFAULT_REFRESH_MARGIN = timedelta(minutes=30)
+
+# Mints a token for an installation id and returns it with its expiry
+TokenMinter = Callable[[int], Tuple[str, datetime]]
+
+
+@dataclass
+class InstallationClient:
+    token: str
+    expires_at: datetime
+    github: Github
+
+
+class InstallationClientCache:
+    """
+    InstallationClientCache keeps one installation token and one GitHub client per installation for the whole process.
+    Every review of the same installation reuses the token while it outlives the review, and shares the client's HTTP connection pool.
+    """
+
+    def __init__(self, mint_token: Optional[TokenMinter] = None, refresh_margin: timedelta = DEFAULT_REFRESH_MARGIN):
+        self.__mint_token = mint_token or self.__mint_token_with_app_auth
+        self.__refresh_margin = refresh_margin
+        self.__lock = threading.Lock()
+        self.__clients: Dict[int, InstallationClient] = {}
+        self.__integration: Optional[GithubIntegration] = None
+
+    def get(self, installation_id: str | int) -> InstallationClient:
+        key = int(installation_id)
+        with self.__lock:
+            client = self.__clients.get(key)
+            if client and client.expires_at - self.__refresh_margin > datetime.now(timezone.utc):
+                metrics.increment("github.installation_token.hits")
+                return client
+
+            metrics.increment("github.installation_token.misses")
+            token, expires_at = self.__mint_token(key)
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+
+            client = InstallationClient(token=token, expires_at=expires_at, github=Github(auth=github.Auth.Token(token)))
+            self.__clients[key] = client
+            log.debug(f"Minted a new token for installation {key}, expires at {expires_at.isoformat()}")
+            return client
+
+    def invalidate(self, installation_id: str | int) -> None:
+        with self.__lock:
+            self.__clients.pop(int(installation_id), None)
+
+    def __mint_token_with_app_auth(self, installation_id: int) -> Tuple[str, datetime]:
+        # The integration only signs JWTs, so the same instance serves every installation
+        if self.__integration is None:
+            if secret_manager is None:
+                raise ValueError("Secret manager is not initialized")
+            self.__integration = GithubIntegration(auth=github.Auth.AppAuth(get_app_id(), secret_manager.github_app_private_key))
+
+        authorization = self.__integration.get_access_token(installation_id)
+        return authorization.token, authorization.expires_at
+
+
+def get_app_id() -> str:
+    """Get GitHub App ID from environment variable"""
+    app_id = os.getenv("GITHUB_APP_ID")
+    if not app_id:
+        raise ValueError("GITHUB_APP_ID environment variable is not set")
+    return app_id
+
+
+# Initialize the cache so every GitHubOperations instance shares it
+installation_clients = InstallationClientCache()
@@ -0,0 +1,272 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from github.File import File
+from github.IssueComment import IssueComment as GHIssueComment
+from github.PullRequestComment import PullRequestComment
+from github.Requester import Requester
+
+from utils.logging_config import logger as log
+
+PAGE_SIZE = 100
+
+_PAGE_INFO = "pageInfo { hasNextPage endCursor }"
+
+_REVIEW_COMMENT_FIELDS = "databaseId path body originalLine line createdAt replyTo { databaseId } author { login __typename }"
+
+# Connections are switched on and off with @include, so the same query text fetches the first page of everything
+# and later only the connections which still have pages left
+PULL_REQUEST_QUERY = f"""
+query($owner: String!, $name: String!, $number: Int!,
+      $filesCursor: String, $threadsCursor: String, $commentsCursor: String,
+      $withFiles: Boolean!, $withThreads: Boolean!, $withComments: Boolean!) {{
+  repository(owner: $owner, name: $name) {{
+    pullRequest(number: $number) {{
+      files(first: {PAGE_SIZE}, after: $filesCursor) @include(if: $withFiles) {{
+        {_PAGE_INFO}
+        nodes {{ path additions deletions changeType }}
+      }}
+      reviewThreads(first: {PAGE_SIZE}, after: $threadsCursor) @include(if: $withThreads) {{
+        {_PAGE_INFO}
+        nodes {{
+          id
+          diffSide
+          comments(first: {PAGE_SIZE}) {{ {_PAGE_INFO} nodes {{ {_REVIEW_COMMENT_FIELDS} }} }}
+        }}
+      }}
+      comments(first: {PAGE_SIZE}, after: $commentsCursor) @include(if: $withComments) {{
+        {_PAGE_INFO}
+        nodes {{ databaseId body createdAt author {{ login __typename }} }}
+      }}
+    }}
+  }}
+}}
+"""
+
+REVIEW_THREAD_COMMENTS_QUERY = f"""
+query($id: ID!, $cursor: String) {{
+  node(id: $id) {{
+    ... on PullRequestReviewThread {{
+      comments(first: {PAGE_SIZE}, after: $cursor) {{ {_PAGE_INFO} nodes {{ {_REVIEW_COMMENT_FIELDS} }} }}
+    }}
+  }}
+}}
+"""
+
+# GraphQL change types mapped to the status values of the REST files endpoint
+_FILE_STATUS = {
+    "ADDED": "added",
+    "DELETED": "removed",
+    "MODIFIED": "modified",
+    "RENAMED": "renamed",
+    "COPIED": "copied",
+    "CHANGED": "changed",
+}
+
+
+@dataclass
+class PullRequestSnapshot:
+    """PR data fetched with GraphQL, converted to the PyGithub objects the REST endpoints would return"""
+
+    files: List[File] = field(default_factory=list)
+    review_comments: List[PullRequestComment] = field(default_factory=list)
+    issue_comments: List[GHIssueComment] = field(default_factory=list)
+    query_count: int = 0
+
+
+def fetch_pull_request(requester: Requester, repo_full_name: str, repo_url: str, pr_number: int, git_diff: str) -> PullRequestSnapshot:
+    """
+    Fetches the changed files, review comments and issue comments of a PR with paginated GraphQL queries.
+    GraphQL doesn't serve file patches, so they are cut from the PR's unified diff.
+
+    :param requester: Requester of an authenticated GitHub client
+    :param repo_full_name: owner/name of the repository
+    :param repo_url: REST API url of the repository, used to build the urls of the comment objects
+    :param pr_number: Number of the pull request
+    :param git_diff: Unified diff of the pull request
+    :return: PullRequestSnapshot with the same objects as the REST listings
+    """
+    owner, name = repo_full_name.split("/", 1)
+    snapshot = PullRequestSnapshot()
+
+    file_nodes: List[Dict[str, Any]] = []
+    thread_nodes: List[Dict[str, Any]] = []
+    comment_nodes: List[Dict[str, Any]] = []
+
+    variables: Dict[str, Any] = {
+        "owner": owner,
+        "name": name,
+        "number": pr_number,
+        "filesCursor": None,
+        "threadsCursor": None,
+        "commentsCursor": None,
+        "withFiles": True,
+        "withThreads": True,
+        "withComments": True,
+    }
+    connections = {"files": ("withFiles", "filesCursor", file_nodes), "reviewThreads": ("withThreads", "threadsCursor", thread_nodes),
+                   "comments": ("withComments", "commentsCursor", comment_nodes)}
+
+    while variables["withFiles"] or variables["withThreads"] or variables["withComments"]:
+        pull_request = _query(requester, PULL_REQUEST_QUERY, variables, snapshot)["repository"]["pullRequest"]
+        if pull_request is None:
+            raise ValueError(f"Pull request #{pr_number} not found in {repo_full_name}")
+
+        for connection_name, (include_var, cursor_var, nodes) in connections.items():
+            if not variables[include_var]:
+                continue
+            connection = pull_request[connection_name]
+            nodes.extend(connection["nodes"])
+            variables[include_var] = connection["pageInfo"]["hasNextPage"]
+            variables[cursor_var] = connection["pageInfo"]["endCursor"]
+
+    patches = split_unified_diff(git_diff)
+    diff_order = {path: i for i, path in enumerate(patches)}
+    file_nodes.sort(key=lambda n: diff_order.get(n["path"], len(diff_order)))
+    # GraphQL doesn't serve the old path of renamed files either, it is read from the diff too
+    renames = renamed_files(git_diff)
+    snapshot.files = [_to_file(requester, node, patches.get(node["path"]), renames.get(node["path"])) for node in file_nodes]
+
+    review_comments: List[PullRequestComment] = []
+    for thread in thread_nodes:
+        comments = list(thread["comments"]["nodes"])
+        page_info = thread["comments"]["pageInfo"]
+        while page_info["hasNextPage"]:
+            connection = _query(requester, REVIEW_THREAD_COMMENTS_QUERY, {"id": thread["id"], "cursor": page_info["endCursor"]}, snapshot)["node"][
+                "comments"]
+            comments.extend(connection["nodes"])
+            page_info = connection["pageInfo"]
+        review_comments.extend(_to_review_comment(requester, repo_url, c, thread["diffSide"]) for c in comments)
+
+    # The REST listings are ordered by id, keep the same order
+    snapshot.review_comments = sorted(review_comments, key=lambda c: c.id)
+    snapshot.issue_comments = sorted((_to_issue_comment(requester, repo_url, c) for c in comment_nodes), key=lambda c: c.id)
+
+    log.debug(f"Fetched PR #{pr_number} with {snapshot.query_count} GraphQL queries")
+    return snapshot
+
+
+def split_unified_diff(git_diff: str) -> Dict[str, Optional[str]]:
+    """
+    Cuts a unified diff into per file patches, in the format of the REST files endpoint (hunks only, without the file headers).
+    Files without hunks (binary files, pure renames) map to None.
+    """
+    patches: Dict[str, Optional[str]] = {}
+    path: Optional[str] = None
+    hunk_lines: List[str] = []
+    in_hunks = False
+
+    def flush():
+        if path is not None:
+            patches[path] = "\n".join(hunk_lines) if hunk_lines else None
+
+    for line in git_diff.splitlines():
+        if line.startswith("diff --git "):
+            flush()
+            match = re.match(r"diff --git a/(.+) b/(.+)$", line)
+            path = match.group(2) if match else None
+            hunk_lines = []
+            in_hunks = False
+        elif not in_hunks and line.startswith("+++ "):
+            # The new path is authoritative, deleted files keep the path of the diff header
+            if line != "+++ /dev/null":
+                path = line[len("+++ b/"):]
+        elif not in_hunks and line.startswith("rename to "):
+            path = line[len("rename to "):]
+        elif line.startswith("@@"):
+            in_hunks = True
+            hunk_lines.append(line)
+        elif in_hunks:
+            hunk_lines.append(line)
+    flush()
+
+    return patches
+
+
+def renamed_files(git_diff: str) -> Dict[str, str]:
+    """Maps the new path of every file renamed by a unified diff to its old path, the previous_filename of the REST files endpoint"""
+    renames: Dict[str, str] = {}
+    previous_filename: Optional[str] = None
+    for line in git_diff.splitlines():
+        if line.startswith("diff --git "):
+            previous_filename = None
+        elif line.startswith("rename from "):
+            previous_filename = line[len("rename from "):]
+        elif line.startswith("rename to ") and previous_filename is not None:
+            renames[line[len("rename to "):]] = previous_filename
+    return renames
+
+
+def _query(requester: Requester, query: str, variables: Dict[str, Any], snapshot: PullRequestSnapshot) -> Dict[str, Any]:
+    _, response = requester.graphql_query(query, dict(variables))
+    snapshot.query_count += 1
+    if response.get("errors"):
+        raise ValueError(f"GraphQL query failed: {response['errors']}")
+    return response["data"]
+
+
+def _user(author: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not author:
+        return None
+    return {"login": author["login"], "type": "Bot" if author.get("__typename") == "Bot" else "User"}
+
+
+def _to_file(requester: Requester, node: Dict[str, Any], patch: Optional[str], previous_filename: Optional[str]) -> File:
+    attributes = {
+        "filename": node["path"],
+        "status": _FILE_STATUS.get(node["changeType"], node["changeType"].lower()),
+        "additions": node["additions"],
+        "deletions": node["deletions"],
+        "changes": node["additions"] + node["deletions"],
+    }
+    if patch is not None:
+        attributes["patch"] = patch
+    if previous_filename is not None:
+        attributes["previous_filename"] = previous_filename
+    return File(requester, {}, attributes)
+
+
+def _to_review_comment(requester: Requester, repo_url: str, node: Dict[str, Any], side: str) -> PullRequestComment:
+    attributes = {
+        "id": node["databaseId"],
+        "url": f"{repo_url}/pulls/comments/{node['databaseId']}",
+        "path": node["path"],
+        "body": node["body"],
+        "original_line": node["originalLine"],
+        "line": node["line"],
+        "side": side,
+        "created_at": node["createdAt"],
+        "user": _user(node.get("author")),
+    }
+    if node.get("replyTo"):
+        attributes["in_reply_to_id"] = node["replyTo"]["databaseId"]
+    return PullRequestComment(requester, {}, attributes, completed=True)
+
+
+def _to_issue_comment(requester: Requester, repo_url: str, node: Dict[str, Any]) -> GHIssueComment:
+    attributes = {
+        "id": node["databaseId"],
+        "url": f"{repo_url}/issues/comments/{node['databaseId']}",
+        "body": node["body"],
+        "created_at": node["createdAt"],
+        "user": _user(node.get("author")),
+    }
+    return GHIssueComment(requester, {}, attributes, completed=True)
@@ -14,26 +14,30 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-import io
-import os
-import zipfile
+from contextlib import contextmanager
 from dataclasses import asdict, dataclass
 from enum import Enum
-from http import HTTPStatus
-from typing import Optional
+from typing import Iterator, Optional
 
-import github.Auth
-import requests
-from github import Github, GithubException, GithubIntegration, UnknownObjectException
+from github import Github, GithubException, UnknownObjectException
 from github.CheckRun import CheckRun
 from github.Commit import Commit
+from github.ContentFile import ContentFile
+from github.File import File
+from github.GitBlob import GitBlob
+from github.GitTree import GitTree
+from github.IssueComment import IssueComment as GHIssueComment
 from github.PullRequest import PullRequest
 from github.PullRequestComment import PullRequestComment
 from github.Repository import Repository
 
+from utils.github_clients import installation_clients
+from utils.github_graphql import fetch_pull_request
+from utils.github_read_cache import GitHubReadCache
 from utils.logging_config import logger as log
+from utils.repo_snapshot import PathFilter, analyzer_path_filter, snapshot_repo
+from utils.snapshot_manager import RepoSnapshot, snapshot_manager
 from utils.models import ReviewComment, IssueComment
-from utils.secret_manager import secret_manager
 
 GithubOperationException = GithubException
 
@@ -57,6 +61,7 @@ class InvalidGitHubInitialization(Exception):
 class CheckRunConclusion(Enum):
     success = "success"
     failure = "failure"
+    cancelled = "cancelled"
 
 
 class GitHubOperations:
@@ -69,9 +74,11 @@ class GitHubOperations:
         if not isinstance(installation_id, str) or not isinstance(repo_name, str) or not isinstance(pr_number, int):
             raise InvalidGitHubInitialization("Invalid input parameters")
 
+        self._read_cache = GitHubReadCache()
         try:
-            self._github_token: str = self._get_access_token(installation_id)
-            self._github: Github = self._init_github(self._github_token)
+            installation_client = installation_clients.get(installation_id)
+            self._github_token: str = installation_client.token
+            self._github: Github = installation_client.github
             log.info("GitHub client initialized successfully")
             self._repo: Repository = self._github.get_repo(repo_name)
             if pr_number:
@@ -80,6 +87,8 @@ class GitHubOperations:
             log.info("GitHub repository and pull request initialized successfully")
         except Exception as e:
             log.error(f"Failed to initialize GitHub client: {e}")
+            # The cached token might have been revoked, the next attempt should mint a new one
+            installation_clients.invalidate(installation_id)
             raise InvalidGitHubInitialization(f"Failed to initialize GitHub client: {e}") from e
 
     @property
@@ -90,32 +99,34 @@ class GitHubOperations:
     def pr(self) -> PullRequest:
         return self._pr
 
-    def _init_github(self, github_token: str) -> Github:
-        """Initialize GitHub client with app credentials"""
-        try:
-            return Github(github_token)
-        except Exception as e:
-            log.error(f"Invalid GitHub credentials: {e}")
-            raise
+    @property
+    def read_cache(self) -> GitHubReadCache:
+        return self._read_cache
 
-    def _get_access_token(self, installation_id: str) -> str:
-        if secret_manager is None:
-            raise ValueError("Secret manager is not initialized")
+    def get_pr_files(self) -> list[File]:
+        return self._read_cache.get_or_load(("pr_files",), lambda: list(self._pr.get_files()))
 
-        private_key = secret_manager.github_app_private_key
-        app_id = self._get_app_id()
-        git_integration = GithubIntegration(auth=github.Auth.AppAuth(app_id, private_key))
+    def get_pr_commits(self) -> list[Commit]:
+        return self._read_cache.get_or_load(("pr_commits",), lambda: list(self._pr.get_commits()))
 
-        github_token = git_integration.get_access_token(int(installation_id)).token
-        return github_token
+    def get_review_comments(self) -> list[PullRequestComment]:
+        return self._read_cache.get_or_load(("review_comments",), lambda: list(self._pr.get_review_comments()))
 
-    @staticmethod
-    def _get_app_id() -> str:
-        """Get GitHub App ID from environment variable"""
-        app_id = os.getenv("GITHUB_APP_ID")
-        if not app_id:
-            raise ValueError("GITHUB_APP_ID environment variable is not set")
-        return app_id
+    def get_issue_comments(self) -> list[GHIssueComment]:
+        return self._read_cache.get_or_load(("issue_comments",), lambda: list(self._pr.get_issue_comments()))
+
+    def get_contents(self, path: str, ref: str) -> ContentFile | list[ContentFile]:
+        return self._read_cache.get_or_load(("contents", path, ref), lambda: self._repo.get_contents(path, ref=ref))
+
+    def get_commit(self, sha: str) -> Commit:
+        return self._read_cache.get_or_load(("commit", sha), lambda: self._repo.get_commit(sha))
+
+    def get_git_tree(self, sha: str, recursive: bool = False) -> GitTree:
+        return self._read_cache.get_or_load(("git_tree", sha, recursive), lambda: self._repo.get_git_tree(sha, recursive=recursive))
+
+    def get_git_blob(self, sha: str) -> GitBlob:
+        # Blobs are addressed by their content, the base and head trees mostly point to the same ones
+        return self._read_cache.get_or_load(("git_blob", sha), lambda: self._repo.get_git_blob(sha))
 
     def get_github_details(self) -> dict:
         return {
@@ -130,15 +141,15 @@ class GitHubOperations:
         new_issue_comments: list[IssueComment] = None,
     ) -> None:
         try:
-            files = self.pr.get_files()
+            files = self.get_pr_files()
         except UnknownObjectException:
             log.error(f"repo: {self.repo._name} with pr: {self.pr._number} not found")
             return
         except Exception as error:
             log.error(f"General error while fetching repo: {self.repo._name} with pr: {self.pr._number}. error: {error}")
             return
-        latest_commit = list(self.pr.get_commits())[-1].commit
-        commit = self.repo.get_commit(latest_commit.sha)
+        latest_commit = self.get_pr_commits()[-1].commit
+        commit = self.get_commit(latest_commit.sha)
 
         review_comments_transformed: list[GitHubReviewComment] = []
 
@@ -164,6 +175,9 @@ class GitHubOperations:
         if len(review_comments_transformed) > 0:
             self.create_pull_request_review_comments(commit, review_comments_transformed)
 
+        self._read_cache.invalidate("issue_comments")
+        self._read_cache.invalidate("review_comments")
+
     def create_pull_request_review_comments(self, commit: Commit, comments: list[GitHubReviewComment]):
         comments_as_dict = [asdict(c) for c in comments]
 
@@ -180,36 +194,35 @@ class GitHubOperations:
         except Exception as e:
             log.error(f"Error during create a new pending pull request: {e}")
 
-    def clone_repo(self, destination_folder: str) -> str:
-        """Clone the PR's branch content into a folder, returns the path to the repo"""
+    @contextmanager
+    def snapshot(self, sha: Optional[str] = None) -> Iterator[RepoSnapshot]:
+        """
+        Leases the local snapshot of a commit, the PR's head by default.
+        The commit is only downloaded if no review of this process has materialised it yet.
+        """
+        sha = sha or self._pr.head.sha
 
-        log.debug("Cloning the repo into a local folder...")
+        def download(destination_folder: str) -> str:
+            zip_link = self._repo.get_archive_link("zipball", sha)
+            repo_path, _ = snapshot_repo(zip_link, {"Authorization": f"token {self._github_token}"}, destination_folder, analyzer_path_filter())
+            return repo_path
 
-        repo = self._repo
-        pr = self._pr
+        with snapshot_manager.open(self._repo.full_name, sha, download) as snapshot:
+            yield snapshot
 
-        zip_link = repo.get_archive_link("zipball", pr.head.ref)
+    def clone_repo(self, destination_folder: str, path_filter: Optional[PathFilter] = None) -> str:
+        """
+        Clone the PR's head commit into a folder, returns the path to the repo.
+        The content is copied from the commit's snapshot, only the files accepted by path_filter are copied.
+        """
 
-        response = requests.get(zip_link, headers={"Authorization": f"token {self._github_token}"})
-
-        if response.status_code != HTTPStatus.OK:
-            raise ValueError(f"Error while downloading the repo as ZIP, status code: {response.status_code}")
-
-        log.debug("Repo downloaded successfully")
-
-        zip_file_in_memory = io.BytesIO(response.content)
-        with zipfile.ZipFile(zip_file_in_memory, "r") as zip_ref:
-            file_list = zip_ref.namelist()
-            if not file_list:
-                raise ValueError("Cloned repo is empty or the zip is corrupted")
-
-            # Inside the zip there's a folder named (repo-name-<commit-hash>), we would like to return this folder name
-            folder_name = file_list[0].split("/")[0]
+        log.debug("Cloning the repo into a local folder...")
 
-            zip_ref.extractall(destination_folder)
-            log.debug("Repo extracted successfully")
+        with self.snapshot() as snapshot:
+            repo_path = snapshot.copy_to(destination_folder, path_filter)
+        log.debug("Repo copied successfully")
 
-            return f"{destination_folder}/{folder_name}"
+        return repo_path
 
     def create_pull_request_check_run(self) -> CheckRun:
         return self._repo.create_check_run(name="Alfred review", head_sha=self._pr.head.sha, status="in_progress")
@@ -220,6 +233,13 @@ class GitHubOperations:
             if conclusion.name == "success":
                 log.info("Check run completed successfully")
                 check_run.edit(status="completed", conclusion=conclusion.name, output={"title": "PR review successful", "summary": "Alfred review completed successfully"})
+            elif conclusion.name == "cancelled":
+                log.info("Check run cancelled")
+                check_run.edit(
+                    status="completed",
+                    conclusion=conclusion.name,
+                    output={"title": "PR review cancelled", "summary": error_message},
+                )
             else:
                 log.info("Check run completed with failure")
                 check_run.edit(
@@ -231,6 +251,20 @@ class GitHubOperations:
             log.error(f"Unable to edit pull request check run: {e}")
 
     def get_git_diff(self) -> str:
+        return self._read_cache.get_or_load(("git_diff",), self.__fetch_git_diff)
+
+    def prefetch_pr_with_graphql(self) -> None:
+        """
+        Fetches the PR's files, review comments and issue comments with a few GraphQL queries instead of the REST paginations,
+        and primes the read cache with them, so the readers above return the same objects without further requests.
+        """
+        snapshot = fetch_pull_request(self._pr._requester, self._repo.full_name, self._repo.url, self._pr.number, self.get_git_diff())
+        self._read_cache.prime(("pr_files",), snapshot.files)
+        self._read_cache.prime(("review_comments",), snapshot.review_comments)
+        self._read_cache.prime(("issue_comments",), snapshot.issue_comments)
+        log.info(f"PR #{self._pr.number} fetched with {snapshot.query_count} GraphQL queries")
+
+    def __fetch_git_diff(self) -> str:
         git_diff = ""
         # Request the diff format directly using the diff media type
         _, data = self._pr._requester.requestJsonAndCheck("GET", f"{self._pr.url}", headers={"Accept": "application/vnd.github.diff"})
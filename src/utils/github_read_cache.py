@@ -0,0 +1,92 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import threading
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+
+T = TypeVar("T")
+
+
+class GitHubReadCache:
+    """
+    GitHubReadCache memoises GitHub reads for the lifetime of one review.
+    The graph nodes ask for the same PR files, comments and contents several times, only the first request goes to GitHub.
+    It's safe to use from the parallel graph branches, concurrent requests of the same key wait for a single load.
+    """
+
+    def __init__(self, name: str = "github_read_cache"):
+        self.__name = name
+        self.__lock = threading.Lock()
+        self.__values: Dict[Hashable, Any] = {}
+        self.__key_locks: Dict[Hashable, threading.Lock] = {}
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], T]) -> T:
+        with self.__lock:
+            if key in self.__values:
+                self.__hits += 1
+                return self.__values[key]
+            key_lock = self.__key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self.__lock:
+                if key in self.__values:
+                    self.__hits += 1
+                    return self.__values[key]
+
+            # Errors are not cached, the next request tries again
+            value = loader()
+
+            with self.__lock:
+                self.__values[key] = value
+                self.__misses += 1
+            return value
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        """Stores a value fetched by other means, e.g. a batched query, so the next read of the key is a hit"""
+        with self.__lock:
+            self.__values[key] = value
+
+    def invalidate(self, kind: str) -> None:
+        """Drops every entry of a kind, the kind is the first element of the key tuple"""
+        with self.__lock:
+            for key in [k for k in self.__values if isinstance(k, tuple) and k and k[0] == kind]:
+                del self.__values[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {"hits": self.__hits, "misses": self.__misses, "entries": len(self.__values)}
+
+    def report(self) -> Dict[str, int]:
+        """Logs the counters and adds them to the process metrics, call it once at the end of the run"""
+        stats = self.stats()
+        metrics.increment(f"{self.__name}.hits", stats["hits"])
+        metrics.increment(f"{self.__name}.misses", stats["misses"])
+        log.info(f"{self.__name}: {stats['hits']} hits, {stats['misses']} misses (GitHub API reads)")
+        return stats
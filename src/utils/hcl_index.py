@@ -0,0 +1,614 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import hashlib
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterable, Mapping, Optional
+
+from utils.analysis_cache import AnalysisCache
+from utils.constants import HCL_INDEX_CACHE_DIR_ENV, HCL_INDEX_CACHE_MAX_ENTRIES_ENV
+from utils.tmp_dir import tmp_dir
+
+# Bump it whenever the parsing changes, so the indexes of the previous versions are not reused
+HCL_INDEX_VERSION = 3
+DEFAULT_CACHE_MAX_ENTRIES = 256
+
+INDEX_FILE_EXTENSIONS = (".tf", ".tofu")
+TFVARS_FILE_EXTENSIONS = (".tfvars",)
+
+SUMMARY_HEADER = "### Summary of Cross-Reference Problems"
+NO_ISSUES_SUMMARY = f"{SUMMARY_HEADER}\n\nNo cross-reference issues found."
+
+# Arguments of a module block that are not input variables of the called module
+MODULE_META_ARGUMENTS = {"source", "version", "count", "for_each", "providers", "depends_on"}
+
+_IDENTIFIER = r"[A-Za-z_]\w*(?:-[A-Za-z_]\w*)*"
+_HEREDOC = re.compile(r"<<-?([A-Za-z_]\w*)[ \t]*\n")
+_BLOCK_HEADER = re.compile(rf'(?m)^[ \t]*({_IDENTIFIER})((?:[ \t]+(?:"[^"\n]*"|{_IDENTIFIER}))*)[ \t]*\{{')
+_LABEL = re.compile(rf'"([^"\n]*)"|({_IDENTIFIER})')
+_ATTRIBUTE = re.compile(rf"(?m)^[ \t]*({_IDENTIFIER})[ \t]*=(?!=)")
+# First attribute of a single line block, e.g. variable "x" { default = 1 }
+_INLINE_ATTRIBUTE = re.compile(rf"[ \t]*({_IDENTIFIER})[ \t]*=(?!=)")
+_SOURCE = re.compile(r'\s*"([^"\n]*)"')
+_REFERENCE = re.compile(
+    rf"(?<![\w.\-])(?:"
+    rf"(var|local)\.({_IDENTIFIER})"
+    rf"|module\.({_IDENTIFIER})(?:\[[^\]\n]*\])?(?:\.({_IDENTIFIER}))?"
+    rf"|data\.({_IDENTIFIER})\.({_IDENTIFIER})"
+    rf"|([a-z][a-z0-9]*_{_IDENTIFIER})\.({_IDENTIFIER})"
+    rf")"
+)
+# Blocks whose from address names an object that is no longer declared, e.g. moved { from = aws_instance.old }
+_FROM_ADDRESS_BLOCKS = {"moved", "removed"}
+# Names bound by for expressions, dynamic blocks and their iterators shadow resource types in references
+_FOR_ITERATORS = re.compile(rf"\bfor\s+({_IDENTIFIER})(?:\s*,\s*({_IDENTIFIER}))?\s+in\b")
+_DYNAMIC_ITERATOR = re.compile(rf'\bdynamic\s+"({_IDENTIFIER})"|\biterator\s*=\s*({_IDENTIFIER})')
+
+
+@dataclass(frozen=True)
+class Symbol:
+    name: str
+    path: str
+    line: int
+    # Last line of the block of block symbols, 0 for the attributes of locals and tfvars
+    end_line: int = 0
+
+
+@dataclass(frozen=True)
+class Variable(Symbol):
+    has_default: bool = False
+
+
+@dataclass(frozen=True)
+class ModuleCall(Symbol):
+    source: str = ""
+    inputs: frozenset[str] = frozenset()
+
+
+@dataclass(frozen=True)
+class Reference:
+    """A reference found in an expression, kind is one of var, local, module, data and resource"""
+    kind: str
+    name: str
+    path: str
+    line: int
+    # module output name for module references
+    attribute: Optional[str] = None
+    # address of the block holding the reference, e.g. variable.region
+    block: str = ""
+
+    @property
+    def address(self) -> str:
+        """The address of the referenced symbol, as it is written in the expressions"""
+        return self.name if self.kind == "resource" else f"{self.kind}.{self.name}"
+
+
+@dataclass
+class FileIndex:
+    """The symbols declared and referenced by a single Terraform or tfvars file"""
+    path: str
+    variables: dict[str, Variable] = field(default_factory=dict)
+    locals: dict[str, Symbol] = field(default_factory=dict)
+    outputs: dict[str, Symbol] = field(default_factory=dict)
+    resources: dict[str, Symbol] = field(default_factory=dict)
+    data_sources: dict[str, Symbol] = field(default_factory=dict)
+    modules: dict[str, ModuleCall] = field(default_factory=dict)
+    tfvars: dict[str, Symbol] = field(default_factory=dict)
+    references: list[Reference] = field(default_factory=list)
+
+    @property
+    def directory(self) -> str:
+        return _directory(self.path)
+
+    def declarations(self) -> dict[str, Symbol]:
+        """Returns the declared symbols by the address the references use for them"""
+        declarations: dict[str, Symbol] = {}
+        declarations.update((f"var.{name}", symbol) for name, symbol in self.variables.items())
+        declarations.update((f"local.{name}", symbol) for name, symbol in self.locals.items())
+        declarations.update((f"output.{name}", symbol) for name, symbol in self.outputs.items())
+        declarations.update(self.resources.items())
+        declarations.update((f"data.{name}", symbol) for name, symbol in self.data_sources.items())
+        declarations.update((f"module.{name}", symbol) for name, symbol in self.modules.items())
+        return declarations
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        for call in data["modules"].values():
+            call["inputs"] = sorted(call["inputs"])
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "FileIndex":
+        def symbols(values: dict[str, dict[str, Any]]) -> dict[str, Symbol]:
+            return {name: Symbol(**value) for name, value in values.items()}
+
+        return cls(
+            path=data["path"],
+            variables={name: Variable(**value) for name, value in data["variables"].items()},
+            locals=symbols(data["locals"]),
+            outputs=symbols(data["outputs"]),
+            resources=symbols(data["resources"]),
+            data_sources=symbols(data["data_sources"]),
+            modules={
+                name: ModuleCall(**{**value, "inputs": frozenset(value["inputs"])})
+                for name, value in data["modules"].items()
+            },
+            tfvars=symbols(data["tfvars"]),
+            references=[Reference(**value) for value in data["references"]],
+        )
+
+
+@dataclass
+class ModuleSymbols:
+    """The symbols of a Terraform module, merged from all the files of its folder"""
+    directory: str
+    variables: dict[str, Variable] = field(default_factory=dict)
+    locals: dict[str, Symbol] = field(default_factory=dict)
+    outputs: dict[str, Symbol] = field(default_factory=dict)
+    resources: dict[str, Symbol] = field(default_factory=dict)
+    data_sources: dict[str, Symbol] = field(default_factory=dict)
+    modules: dict[str, ModuleCall] = field(default_factory=dict)
+    tfvars: dict[str, Symbol] = field(default_factory=dict)
+    references: list[Reference] = field(default_factory=list)
+    has_terraform_tfvars: bool = False
+
+
+@dataclass(frozen=True)
+class Finding:
+    kind: str
+    directory: str
+    symbol: str
+    path: str
+    line: int
+    description: str
+
+    @property
+    def key(self) -> tuple[str, str, str]:
+        # Files and lines are left out, moving a broken symbol to another file is not a new problem
+        return self.kind, self.directory, self.symbol
+
+    def __str__(self) -> str:
+        return f"- **`{self.symbol}`**: {self.description}"
+
+
+def _directory(path: str) -> str:
+    directory = os.path.dirname(path)
+    return os.path.normpath(directory).replace(os.sep, "/") if directory else ""
+
+
+def _blank(text: str) -> str:
+    return "".join(c if c == "\n" else " " for c in text)
+
+
+def _code_only(text: str) -> str:
+    """
+    Blanks out the comments and the literal parts of the strings and heredocs, keeping their quotes and the
+    expressions of their interpolations. The result has the same length and lines as the text, so the offsets
+    found in it are valid in the text as well.
+    """
+    out: list[str] = []
+    modes = ["code"]
+    # Open braces of every code level, the closing brace of an interpolation is the one found at depth zero
+    braces = [0]
+    markers: list[str] = []
+    i, n = 0, len(text)
+    while i < n:
+        mode = modes[-1]
+        c = text[i]
+        if mode == "code":
+            if c == "#" or text.startswith("//", i):
+                end = text.find("\n", i)
+                end = n if end == -1 else end
+                out.append(" " * (end - i))
+                i = end
+            elif text.startswith("/*", i):
+                end = text.find("*/", i + 2)
+                end = n if end == -1 else end + 2
+                out.append(_blank(text[i:end]))
+                i = end
+            elif (heredoc := _HEREDOC.match(text, i)) is not None:
+                modes.append("heredoc")
+                markers.append(heredoc.group(1))
+                out.append(heredoc.group(0))
+                i = heredoc.end()
+            elif c == '"':
+                modes.append("string")
+                out.append(c)
+                i += 1
+            elif c == "}" and braces[-1] == 0 and len(modes) > 1:
+                # End of an interpolation
+                modes.pop()
+                braces.pop()
+                out.append(" ")
+                i += 1
+            else:
+                if c == "{":
+                    braces[-1] += 1
+                elif c == "}":
+                    braces[-1] -= 1
+                out.append(c)
+                i += 1
+        else:
+            if mode == "heredoc" and (i == 0 or text[i - 1] == "\n"):
+                end = text.find("\n", i)
+                end = n if end == -1 else end
+                if text[i:end].strip() == markers[-1]:
+                    modes.pop()
+                    markers.pop()
+                    out.append(" " * (end - i))
+                    i = end
+                    continue
+            if text.startswith(("$${", "%%{"), i):
+                out.append("   ")
+                i += 3
+            elif text.startswith(("${", "%{"), i):
+                modes.append("code")
+                braces.append(0)
+                out.append("  ")
+                i += 2
+            elif mode == "string" and c == "\\" and i + 1 < n:
+                out.append("  ")
+                i += 2
+            elif mode == "string" and c in '"\n':
+                # An unterminated string ends with its line
+                modes.pop()
+                out.append(c)
+                i += 1
+            else:
+                out.append(c if c == "\n" else " ")
+                i += 1
+    return "".join(out)
+
+
+def _block_end(code: str, start: int) -> int:
+    """Returns the offset after the brace closing the one at start"""
+    depth = 0
+    for i in range(start, len(code)):
+        if code[i] == "{":
+            depth += 1
+        elif code[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(code)
+
+
+def _top_level_attributes(code: str, start: int, end: int) -> dict[str, int]:
+    """Returns the attributes set directly in the body between start and end, with the offset of their values"""
+    depths = []
+    depth = 0
+    for c in code[start:end]:
+        depths.append(depth)
+        if c in "{[(":
+            depth += 1
+        elif c in "}])":
+            depth -= 1
+    attributes: dict[str, int] = {}
+    if (inline := _INLINE_ATTRIBUTE.match(code, start, end)) is not None:
+        attributes[inline.group(1)] = inline.end()
+    for match in _ATTRIBUTE.finditer(code, start, end):
+        if depths[match.start(1) - start] == 0:
+            attributes.setdefault(match.group(1), match.end())
+    return attributes
+
+
+def _labels(text: str) -> list[str]:
+    return [quoted or bare for quoted, bare in _LABEL.findall(text)]
+
+
+def _line(code: str, offset: int) -> int:
+    return code.count("\n", 0, offset) + 1
+
+
+def index_file(path: str, content: str) -> FileIndex:
+    """Parses the top-level blocks of a Terraform file, or the assignments of a tfvars file"""
+    index = FileIndex(path)
+    code = _code_only(content)
+
+    if path.endswith(TFVARS_FILE_EXTENSIONS):
+        for name, offset in _top_level_attributes(code, 0, len(code)).items():
+            index.tfvars[name] = Symbol(name, path, _line(code, offset))
+        return index
+
+    shadowed = _shadowed(content, code)
+
+    position = 0
+    while (header := _BLOCK_HEADER.search(code, position)) is not None:
+        block_type = header.group(1)
+        labels = _labels(content[header.start(2):header.end(2)])
+        body_start = header.end() - 1
+        body_end = _block_end(code, body_start)
+        position = body_end
+        line = _line(code, header.start(1))
+        end_line = _line(code, body_end - 1)
+        attributes = _top_level_attributes(code, body_start + 1, body_end - 1)
+
+        block = block_type
+        if block_type == "variable" and len(labels) == 1:
+            index.variables[labels[0]] = Variable(labels[0], path, line, end_line, has_default="default" in attributes)
+            block = f"variable.{labels[0]}"
+        elif block_type == "output" and len(labels) == 1:
+            index.outputs[labels[0]] = Symbol(labels[0], path, line, end_line)
+            block = f"output.{labels[0]}"
+        elif block_type == "resource" and len(labels) == 2:
+            address = ".".join(labels)
+            index.resources[address] = Symbol(address, path, line, end_line)
+            block = address
+        elif block_type == "data" and len(labels) == 2:
+            address = ".".join(labels)
+            index.data_sources[address] = Symbol(address, path, line, end_line)
+            block = f"data.{address}"
+        elif block_type == "module" and len(labels) == 1:
+            source = ""
+            if "source" in attributes and (match := _SOURCE.match(content, attributes["source"])) is not None:
+                source = match.group(1)
+            inputs = frozenset(name for name in attributes if name not in MODULE_META_ARGUMENTS)
+            index.modules[labels[0]] = ModuleCall(labels[0], path, line, end_line, source=source, inputs=inputs)
+            block = f"module.{labels[0]}"
+        elif block_type == "locals" and not labels:
+            for name, offset in attributes.items():
+                index.locals[name] = Symbol(name, path, _line(code, offset))
+        elif block_type == "check":
+            # The nested data blocks of a check are scoped to it and not indexed, so its references can't be resolved
+            continue
+
+        if block_type in _FROM_ADDRESS_BLOCKS and "from" in attributes:
+            from_start = attributes["from"]
+            from_end = code.find("\n", from_start, body_end)
+            from_end = body_end if from_end == -1 else from_end
+            index.references.extend(_references(code, header.end(), from_start, path, block, shadowed))
+            index.references.extend(_references(code, from_end, body_end, path, block, shadowed))
+        else:
+            index.references.extend(_references(code, header.end(), body_end, path, block, shadowed))
+
+    return index
+
+
+def _shadowed(content: str, code: str) -> set[str]:
+    shadowed = {name for names in _FOR_ITERATORS.findall(code) for name in names if name}
+    shadowed |= {name for names in _DYNAMIC_ITERATOR.findall(content) for name in names if name}
+    return shadowed
+
+
+def _references(code: str, start: int, end: int, path: str, block: str, shadowed: set[str]) -> list[Reference]:
+    references = []
+    for match in _REFERENCE.finditer(code, start, end):
+        ref_line = _line(code, match.start())
+        if match.group(1):
+            references.append(Reference(match.group(1), match.group(2), path, ref_line, block=block))
+        elif match.group(3):
+            references.append(Reference("module", match.group(3), path, ref_line, attribute=match.group(4), block=block))
+        elif match.group(5):
+            name = f"{match.group(5)}.{match.group(6)}"
+            references.append(Reference("data", name, path, ref_line, block=block))
+        elif match.group(7) not in shadowed:
+            name = f"{match.group(7)}.{match.group(8)}"
+            references.append(Reference("resource", name, path, ref_line, block=block))
+    return references
+
+
+def find_references(path: str, content: str) -> list[Reference]:
+    """Returns the references of any piece of Terraform code, e.g. a hunk of a diff that isn't a whole block"""
+    code = _code_only(content)
+    return _references(code, 0, len(code), path, "", _shadowed(content, code))
+
+
+def resolve_source(directory: str, source: str) -> Optional[str]:
+    """Returns the repo-relative folder of a local module source, None for registry and remote sources"""
+    if not source.startswith(("./", "../")):
+        return None
+    resolved = os.path.normpath(os.path.join(directory, source)).replace(os.sep, "/")
+    if resolved == ".":
+        return ""
+    return None if resolved.startswith("..") else resolved
+
+
+class HclIndex:
+    """
+    Symbol table and reference graph of the Terraform code of a commit.
+    The index is kept per file, so a file can be replaced without parsing the others again.
+    """
+
+    def __init__(self, files: Optional[dict[str, FileIndex]] = None):
+        self.files: dict[str, FileIndex] = files or {}
+
+    @classmethod
+    def build(cls, files: Iterable[tuple[str, str]]) -> "HclIndex":
+        index = cls()
+        for path, content in files:
+            index.update_file(path, content)
+        return index
+
+    @staticmethod
+    def is_indexed(path: str) -> bool:
+        return path.endswith(INDEX_FILE_EXTENSIONS + TFVARS_FILE_EXTENSIONS)
+
+    def update_file(self, path: str, content: str) -> None:
+        if self.is_indexed(path):
+            self.files[path] = index_file(path, content)
+
+    def remove_file(self, path: str) -> None:
+        self.files.pop(path, None)
+
+    def patch(self, removed: Iterable[str], updated: dict[str, str]) -> "HclIndex":
+        """
+        Returns a new index with the removed files dropped and the updated files parsed again, the other files
+        are shared with this index. This is how the head index of a PR is derived from the index of its base.
+        """
+        index = HclIndex(dict(self.files))
+        for path in removed:
+            index.remove_file(path)
+        for path, content in updated.items():
+            index.update_file(path, content)
+        return index
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"files": [self.files[path].to_dict() for path in sorted(self.files)]}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "HclIndex":
+        return cls({value["path"]: FileIndex.from_dict(value) for value in data["files"]})
+
+    def modules(self) -> dict[str, ModuleSymbols]:
+        modules: dict[str, ModuleSymbols] = {}
+        for path in sorted(self.files):
+            file = self.files[path]
+            module = modules.setdefault(file.directory, ModuleSymbols(file.directory))
+            module.variables.update(file.variables)
+            module.locals.update(file.locals)
+            module.outputs.update(file.outputs)
+            module.resources.update(file.resources)
+            module.data_sources.update(file.data_sources)
+            module.modules.update(file.modules)
+            module.tfvars.update(file.tfvars)
+            module.references.extend(file.references)
+            module.has_terraform_tfvars |= os.path.basename(path) == "terraform.tfvars"
+        return modules
+
+    def findings(self) -> list[Finding]:
+        """Returns the cross-reference problems of the whole codebase"""
+        modules = self.modules()
+        findings: list[Finding] = []
+        for module in modules.values():
+            findings.extend(self._undefined_references(module, modules))
+            findings.extend(self._module_interface(module, modules))
+            findings.extend(self._unused_symbols(module))
+            findings.extend(self._tfvars(module))
+        return sorted(set(findings), key=lambda f: (f.path, f.line, f.kind, f.symbol))
+
+    @staticmethod
+    def _undefined_references(module: ModuleSymbols, modules: dict[str, ModuleSymbols]) -> list[Finding]:
+        findings = []
+        declared: dict[str, tuple[Mapping[str, Symbol], str, str]] = {
+            "var": (module.variables, "variable", "undefined_variable"),
+            "local": (module.locals, "local value", "undefined_local"),
+            "data": (module.data_sources, "data source", "undefined_data_source"),
+            "resource": (module.resources, "resource", "undefined_resource"),
+            "module": (module.modules, "module block", "undefined_module"),
+        }
+        for ref in module.references:
+            symbols, what, kind = declared[ref.kind]
+            symbol = ref.name if ref.kind == "resource" else f"{ref.kind}.{ref.name}"
+            if ref.name not in symbols:
+                findings.append(Finding(
+                    kind, module.directory, symbol, ref.path, ref.line,
+                    f"Used in `{ref.path}` but not defined: no {what} `{ref.name}` is declared in the module",
+                ))
+                continue
+
+            if ref.kind != "module" or ref.attribute is None:
+                continue
+            child = resolve_source(module.directory, module.modules[ref.name].source)
+            if child is not None and child in modules and ref.attribute not in modules[child].outputs:
+                findings.append(Finding(
+                    "undefined_module_output", module.directory, f"module.{ref.name}.{ref.attribute}", ref.path,
+                    ref.line,
+                    f"Used in `{ref.path}` but not defined: the module at `{child or '.'}` has no output `{ref.attribute}`",
+                ))
+        return findings
+
+    @staticmethod
+    def _module_interface(module: ModuleSymbols, modules: dict[str, ModuleSymbols]) -> list[Finding]:
+        findings = []
+        for call in module.modules.values():
+            child = resolve_source(module.directory, call.source)
+            if child is None or child not in modules:
+                continue
+            variables = modules[child].variables
+            for name in sorted(call.inputs - variables.keys()):
+                findings.append(Finding(
+                    "unknown_module_input", module.directory, f"module.{call.name}.{name}", call.path, call.line,
+                    f"Used in `{call.path}` but not defined: the module at `{child or '.'}` has no input variable `{name}`",
+                ))
+            for name in sorted(variables.keys() - call.inputs):
+                if not variables[name].has_default:
+                    findings.append(Finding(
+                        "missing_module_input", module.directory, f"module.{call.name}.{name}", call.path, call.line,
+                        f"Required input not provided in `{call.path}`: the variable `{name}` of the module at "
+                        f"`{child or '.'}` has no default value",
+                    ))
+        return findings
+
+    @staticmethod
+    def _unused_symbols(module: ModuleSymbols) -> list[Finding]:
+        findings = []
+        # A variable used only by its own validation is still unused
+        used = {
+            (ref.kind, ref.name) for ref in module.references
+            if not (ref.kind == "var" and ref.block == f"variable.{ref.name}")
+        }
+        for name, variable in module.variables.items():
+            if ("var", name) not in used:
+                findings.append(Finding(
+                    "unused_variable", module.directory, f"var.{name}", variable.path, variable.line,
+                    f"Defined in `{variable.path}` but not used: the variable is not referenced anywhere in the module",
+                ))
+        for name, local in module.locals.items():
+            if ("local", name) not in used:
+                findings.append(Finding(
+                    "unused_local", module.directory, f"local.{name}", local.path, local.line,
+                    f"Defined in `{local.path}` but not used: the local value is not referenced anywhere in the module",
+                ))
+        return findings
+
+    @staticmethod
+    def _tfvars(module: ModuleSymbols) -> list[Finding]:
+        findings: list[Finding] = []
+        if not module.variables and not module.tfvars:
+            return findings
+        for name, assignment in module.tfvars.items():
+            if name not in module.variables:
+                findings.append(Finding(
+                    "undeclared_tfvars_variable", module.directory, f"var.{name}", assignment.path, assignment.line,
+                    f"Defined in `{assignment.path}` but not declared: no variable `{name}` is declared in the module",
+                ))
+        if module.has_terraform_tfvars:
+            for name, variable in module.variables.items():
+                if not variable.has_default and name not in module.tfvars:
+                    findings.append(Finding(
+                        "missing_tfvars_value", module.directory, f"var.{name}", variable.path, variable.line,
+                        f"Defined in `{variable.path}` but missing from the tfvars files: the variable has no default value",
+                    ))
+        return findings
+
+
+def new_findings(base: HclIndex, head: HclIndex) -> list[Finding]:
+    """Returns the problems of the head commit that the base commit doesn't have, i.e. the ones added by the PR"""
+    known = {finding.key for finding in base.findings()}
+    return [finding for finding in head.findings() if finding.key not in known]
+
+
+def format_summary(findings: list[Finding]) -> str:
+    if not findings:
+        return NO_ISSUES_SUMMARY
+    return f"{SUMMARY_HEADER}\n\n" + "\n".join(str(finding) for finding in findings)
+
+
+def hcl_index_key(repo_full_name: str, sha: str) -> str:
+    return hashlib.sha256(f"{HCL_INDEX_VERSION}\0{repo_full_name}\0{sha}".encode("utf-8")).hexdigest()
+
+
+def create_hcl_index_cache() -> AnalysisCache:
+    directory = os.getenv(HCL_INDEX_CACHE_DIR_ENV) or os.path.join(tmp_dir(), "hcl_index_cache")
+    max_entries = int(os.getenv(HCL_INDEX_CACHE_MAX_ENTRIES_ENV) or DEFAULT_CACHE_MAX_ENTRIES)
+    return AnalysisCache(directory, max_entries)
+
+
+# Initialize the cache so every review of the process shares the indexes of the base commits
+hcl_index_cache = create_hcl_index_cache()
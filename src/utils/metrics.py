@@ -0,0 +1,95 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+
+class Metrics:
+    """
+    Metrics is a process-wide registry of counters, gauges and timings.
+    The snapshot is served on the metrics endpoint, it's meant for dashboards and debugging, not for exact accounting.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__counters: Dict[str, int] = defaultdict(int)
+        self.__gauges: Dict[str, float] = {}
+        self.__gauge_callbacks: Dict[str, Callable[[], float]] = {}
+        self.__timings: Dict[str, Dict[str, float]] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self.__lock:
+            self.__counters[name] += value
+
+    def counter(self, name: str) -> int:
+        with self.__lock:
+            return self.__counters.get(name, 0)
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self.__lock:
+            self.__gauges[name] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], float]) -> None:
+        """Registers a gauge which is evaluated lazily every time a snapshot is taken"""
+        with self.__lock:
+            self.__gauge_callbacks[name] = callback
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self.__lock:
+            timing = self.__timings.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "last_seconds": 0.0})
+            timing["count"] += 1
+            timing["total_seconds"] += seconds
+            timing["max_seconds"] = max(timing["max_seconds"], seconds)
+            timing["last_seconds"] = seconds
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.__lock:
+            gauges = dict(self.__gauges)
+            callbacks = dict(self.__gauge_callbacks)
+            counters = dict(self.__counters)
+            timings = {name: dict(timing) for name, timing in self.__timings.items()}
+
+        for name, callback in callbacks.items():
+            try:
+                gauges[name] = callback()
+            except Exception:
+                # A broken gauge must not break the whole snapshot
+                continue
+
+        return {"counters": counters, "gauges": gauges, "timings": timings}
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.__counters.clear()
+            self.__gauges.clear()
+            self.__timings.clear()
+
+
+# Initialize the registry so other modules can use it
+metrics = Metrics()
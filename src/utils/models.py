@@ -64,6 +64,13 @@ class StaticAnalyzerOutputIssues(BaseModel):
 
     file_name: str = Field(description="This is the filename which has terraform issues")
     full_issue_description: str = Field(description="This is the full description of terraform issue")
+    line_number: Optional[int] = Field(default=None, description="The line number of the issue, if the linter output has it")
+    rule: Optional[str] = Field(default=None, description="The name of the linter rule which reported the issue, if any")
+
+    def __str__(self) -> str:
+        location = f"{self.file_name}:{self.line_number}" if self.line_number else self.file_name
+        rule = f" [{self.rule}]" if self.rule else ""
+        return f"{location}{rule}: {self.full_issue_description}"
 
 
 class StaticAnalyzerOutputList(BaseModel):
@@ -0,0 +1,155 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import argparse
+import json
+import os
+from typing import Any, cast
+
+import numpy as np
+
+# The int8 model written by export(), beside the float model.onnx it's quantised from
+DEFAULT_ONNX_MODEL_FILE = "model_quantized.onnx"
+FLOAT_ONNX_MODEL_FILE = "model.onnx"
+# The max_seq_length of all-MiniLM-L6-v2, used when the model folder has no sentence_bert_config.json
+DEFAULT_MAX_SEQ_LENGTH = 256
+BATCH_SIZE = 32
+NORMALIZE_MODULE = "sentence_transformers.models.Normalize"
+
+
+def mean_pooling(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Averages the embeddings of the tokens of each text, the padding is left out like in the Pooling module"""
+    mask = attention_mask[:, :, None].astype(np.float32)
+    return (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+
+def cosine_similarity(embeddings1: np.ndarray, embeddings2: np.ndarray) -> np.ndarray:
+    """Cosine similarity matrix of the two sets of embeddings, the rows belong to embeddings1"""
+    embeddings1 = normalize(np.asarray(embeddings1, dtype=np.float32))
+    embeddings2 = normalize(np.asarray(embeddings2, dtype=np.float32))
+    return embeddings1 @ embeddings2.T
+
+
+def _read_json(model_dir: str, name: str) -> Any:
+    path = os.path.join(model_dir, name)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class OnnxEmbeddingModel:
+    """
+    OnnxEmbeddingModel runs a mean pooling sentence transformer, like all-MiniLM-L6-v2, exported to ONNX, with ONNX
+    Runtime on the CPU. It has the encode() and similarity() of SentenceTransformer the embedding service uses.
+    Everything is read from the model folder written by export(), nothing is downloaded.
+    """
+
+    def __init__(self, model_dir: str, model_file: str = DEFAULT_ONNX_MODEL_FILE):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The onnx embedding backend needs the onnxruntime package") from e
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, model_file)
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        for path in (model_path, tokenizer_path):
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"{path} not found, export the model with python -m utils.onnx_embeddings export")
+
+        sentence_config = _read_json(model_dir, "sentence_bert_config.json") or {}
+        modules = _read_json(model_dir, "modules.json") or []
+        self.__normalize = any(module.get("type") == NORMALIZE_MODULE for module in modules)
+
+        self.__tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.__tokenizer.enable_truncation(max_length=sentence_config.get("max_seq_length", DEFAULT_MAX_SEQ_LENGTH))
+        self.__tokenizer.enable_padding(pad_id=self.__tokenizer.token_to_id("[PAD]") or 0)
+
+        self.__session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.__input_names = [model_input.name for model_input in self.__session.get_inputs()]
+
+    def encode(self, texts: list[str], convert_to_numpy: bool = True) -> np.ndarray:
+        # Texts of similar lengths are batched together to pad less, like SentenceTransformer.encode does
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        batches = []
+        for start in range(0, len(texts), BATCH_SIZE):
+            encodings = self.__tokenizer.encode_batch([texts[i] for i in order[start:start + BATCH_SIZE]])
+            inputs = {
+                "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+                "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+                "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+            }
+            token_embeddings = self.__session.run(None, {name: inputs[name] for name in self.__input_names})[0]
+            batches.append(mean_pooling(token_embeddings, inputs["attention_mask"]))
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        embeddings = np.concatenate(batches)[np.argsort(order)]
+        if self.__normalize:
+            embeddings = normalize(embeddings)
+        return embeddings.astype(np.float32)
+
+    def similarity(self, embeddings1: np.ndarray, embeddings2: np.ndarray) -> np.ndarray:
+        return cosine_similarity(embeddings1, embeddings2)
+
+
+def export(model_name: str, output_dir: str) -> str:
+    """
+    Saves the sentence transformer to output_dir with its tokenizer and configs, exports its transformer to ONNX and
+    quantises the weights to int8. Needs torch, onnx and onnxruntime, and the model in the Hugging Face cache or network
+    access, so it runs when the image is built rather than in the pods. Returns the path of the quantised model.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    # The saved folder is loadable by the torch backend too, which is how the two backends are compared
+    model.save(output_dir)
+
+    # The Transformer module keeps the Hugging Face model in auto_model, torch types unknown attributes as Tensor | Module
+    transformer = cast(torch.nn.Module, model[0].auto_model).eval()
+    tokens = model.tokenizer(["Export the embedding model."], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in tokens]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    float_path = os.path.join(output_dir, FLOAT_ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(transformer, tuple(tokens[name] for name in input_names), float_path, input_names=input_names,
+                          output_names=["last_hidden_state"], dynamic_axes=dynamic_axes, opset_version=17)
+
+    quantized_path = os.path.join(output_dir, DEFAULT_ONNX_MODEL_FILE)
+    quantize_dynamic(float_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+
+if __name__ == "__main__":
+    from utils.embeddings import DEFAULT_EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Manage the ONNX model of the onnx embedding backend")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export the embedding model to an int8 quantised ONNX model")
+    export_parser.add_argument("output_dir", help="Folder of the model, the EMBEDDING_ONNX_MODEL_DIR of the pods")
+    export_parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL, help="Sentence transformer to export")
+    cli_args = parser.parse_args()
+
+    if cli_args.command == "export":
+        print(f"Exported {cli_args.model} to {export(cli_args.model, cli_args.output_dir)}")
@@ -0,0 +1,121 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import IO, Callable, Optional
+
+import requests
+
+from utils.constants import REPO_SNAPSHOT_MODE_ENV, TMP_DIR_ENV
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+
+CHUNK_SIZE = 1024 * 1024
+# Archives above this size are spilled from memory to a temporary file on disk
+SPOOL_MAX_MEMORY_BYTES = 8 * 1024 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 60
+
+# The files the static analyzers and the cross reference need from a repo
+ANALYZER_FILE_EXTENSIONS = (".tf", ".tfvars", ".tofu", ".tofuvars", ".tf.json", ".tfvars.json")
+ANALYZER_FILE_NAMES = (".tflint.hcl", ".terraform.lock.hcl")
+
+PathFilter = Callable[[str], bool]
+
+
+def is_analyzer_file(path: str) -> bool:
+    return path.endswith(ANALYZER_FILE_EXTENSIONS) or os.path.basename(path) in ANALYZER_FILE_NAMES
+
+
+def analyzer_path_filter() -> Optional[PathFilter]:
+    """Returns the filter of the snapshot files, REPO_SNAPSHOT_MODE=full turns the filtering off"""
+    if os.getenv(REPO_SNAPSHOT_MODE_ENV, "filtered").lower() == "full":
+        return None
+    return is_analyzer_file
+
+
+@dataclass
+class SnapshotStats:
+    bytes_downloaded: int = 0
+    bytes_extracted: int = 0
+    files_extracted: int = 0
+    files_skipped: int = 0
+
+
+def download_archive(url: str, headers: dict, stats: SnapshotStats) -> IO[bytes]:
+    """Streams the archive into a spooled temporary file, so it's never held in memory as a whole"""
+    archive = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY_BYTES, dir=os.getenv(TMP_DIR_ENV))
+    try:
+        with requests.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+            if response.status_code != HTTPStatus.OK:
+                raise ValueError(f"Error while downloading the repo as ZIP, status code: {response.status_code}")
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                archive.write(chunk)
+                stats.bytes_downloaded += len(chunk)
+    except BaseException:
+        archive.close()
+        raise
+
+    archive.seek(0)
+    return archive
+
+
+def extract_archive(archive: IO[bytes], destination_folder: str, stats: SnapshotStats, path_filter: Optional[PathFilter] = None) -> str:
+    """Extracts the files accepted by the path filter, returns the name of the archive's root folder"""
+    with zipfile.ZipFile(archive, "r") as zip_ref:
+        members = zip_ref.infolist()
+        if not members:
+            raise ValueError("Cloned repo is empty or the zip is corrupted")
+
+        # Inside the zip there's a folder named (repo-name-<commit-hash>), every path is relative to it
+        folder_name = members[0].filename.split("/")[0]
+        os.makedirs(os.path.join(destination_folder, folder_name), exist_ok=True)
+
+        for member in members:
+            if member.is_dir():
+                continue
+            relative_path = member.filename.split("/", 1)[-1]
+            if path_filter is not None and not path_filter(relative_path):
+                stats.files_skipped += 1
+                continue
+            zip_ref.extract(member, destination_folder)
+            stats.files_extracted += 1
+            stats.bytes_extracted += member.file_size
+
+    return folder_name
+
+
+def snapshot_repo(url: str, headers: dict, destination_folder: str, path_filter: Optional[PathFilter] = None) -> tuple[str, SnapshotStats]:
+    """Downloads and extracts a repo archive, returns the path to the repo and the transfer stats"""
+    stats = SnapshotStats()
+    with metrics.timer("repo_snapshot.duration"):
+        with download_archive(url, headers, stats) as archive:
+            try:
+                folder_name = extract_archive(archive, destination_folder, stats, path_filter)
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"Cloned repo is empty or the zip is corrupted: {e}") from e
+
+    metrics.increment("repo_snapshot.bytes_downloaded", stats.bytes_downloaded)
+    metrics.increment("repo_snapshot.bytes_extracted", stats.bytes_extracted)
+    log.info(
+        f"Repo snapshot: {stats.bytes_downloaded} bytes downloaded, {stats.bytes_extracted} bytes extracted "
+        f"in {stats.files_extracted} files, {stats.files_skipped} files skipped"
+    )
+    return os.path.join(destination_folder, folder_name), stats
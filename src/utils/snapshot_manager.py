@@ -0,0 +1,232 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+from urllib.parse import quote, unquote
+
+from utils.constants import REPO_SNAPSHOT_DIR_ENV, REPO_SNAPSHOT_MAX_BYTES_ENV, REPO_SNAPSHOT_MAX_ENTRIES_ENV
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+from utils.repo_snapshot import PathFilter
+from utils.tmp_dir import tmp_dir
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 32
+
+# Materialises a commit into the given folder and returns the path of the repo root inside it
+SnapshotLoader = Callable[[str], str]
+
+
+@dataclass
+class RepoSnapshot:
+    """A commit of a repo materialised on the local disk. Snapshots are shared, they must never be modified."""
+
+    sha: str
+    path: str
+    size_bytes: int
+    _leases: int = field(default=0, repr=False, compare=False)
+
+    def list_files(self, directory: str = "", extensions: Optional[tuple[str, ...]] = None, recursive: bool = True) -> list[str]:
+        """Returns the repo-relative paths of the files under the directory, sorted by path"""
+        root = os.path.join(self.path, directory)
+        if not os.path.isdir(root):
+            return []
+
+        paths = []
+        for current, dirs, names in os.walk(root):
+            if not recursive:
+                dirs.clear()
+            for name in names:
+                relative_path = os.path.relpath(os.path.join(current, name), self.path).replace(os.sep, "/")
+                if extensions is None or relative_path.endswith(extensions):
+                    paths.append(relative_path)
+        return sorted(paths)
+
+    def read_file(self, path: str) -> str:
+        with open(os.path.join(self.path, path), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def copy_to(self, destination_folder: str, path_filter: Optional[PathFilter] = None) -> str:
+        """Copies the snapshot into a private, writable folder, returns the path to the copy"""
+        destination = os.path.join(destination_folder, self.sha)
+
+        def ignore(directory: str, names: list[str]) -> list[str]:
+            if path_filter is None:
+                return []
+            relative_dir = os.path.relpath(directory, self.path)
+            return [
+                name for name in names
+                if not os.path.isdir(os.path.join(directory, name)) and not path_filter(os.path.normpath(os.path.join(relative_dir, name)).replace(os.sep, "/"))
+            ]
+
+        shutil.copytree(self.path, destination, ignore=ignore, dirs_exist_ok=True)
+        return destination
+
+
+class SnapshotManager:
+    """
+    SnapshotManager keeps the commits of the reviewed repos materialised on the local disk, keyed by the commit SHA.
+    A commit is downloaded once, every node of every review reading the same commit is served from the same snapshot.
+    The least recently used snapshots are evicted when the total size or the number of snapshots exceeds the limits,
+    except the ones which are still being read.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if max_bytes <= 0 or max_entries <= 0:
+            raise ValueError("Snapshot cache limits must be positive")
+        self.__directory = directory
+        self.__max_bytes = max_bytes
+        self.__max_entries = max_entries
+        self.__lock = threading.Lock()
+        self.__key_locks: dict[tuple[str, str], threading.Lock] = {}
+        # The least recently used snapshots are at the front
+        self.__snapshots: OrderedDict[tuple[str, str], RepoSnapshot] = OrderedDict()
+        self.__total_bytes = 0
+        self.__load_index()
+
+    @property
+    def total_bytes(self) -> int:
+        return self.__total_bytes
+
+    def __len__(self) -> int:
+        return len(self.__snapshots)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        with self.__lock:
+            return key in self.__snapshots
+
+    @contextmanager
+    def open(self, repo_full_name: str, sha: str, loader: SnapshotLoader) -> Iterator[RepoSnapshot]:
+        """Leases the snapshot of the commit, the loader is only called if the commit is not materialised yet"""
+        key = (repo_full_name, sha)
+        snapshot = self.__lease(key)
+        if snapshot is None:
+            with self.__key_lock(key):
+                # Another review might have materialised it while we were waiting for the lock
+                snapshot = self.__lease(key) or self.__materialise(key, loader)
+
+        try:
+            yield snapshot
+        finally:
+            with self.__lock:
+                snapshot._leases -= 1
+                self.__evict()
+
+    def __lease(self, key: tuple[str, str]) -> Optional[RepoSnapshot]:
+        with self.__lock:
+            snapshot = self.__snapshots.get(key)
+            if snapshot is None:
+                return None
+            self.__snapshots.move_to_end(key)
+            snapshot._leases += 1
+        metrics.increment("repo_snapshot.hits")
+        return snapshot
+
+    def __key_lock(self, key: tuple[str, str]) -> threading.Lock:
+        with self.__lock:
+            return self.__key_locks.setdefault(key, threading.Lock())
+
+    def __materialise(self, key: tuple[str, str], loader: SnapshotLoader) -> RepoSnapshot:
+        metrics.increment("repo_snapshot.misses")
+        staging_folder = os.path.join(self.__directory, f".staging-{uuid.uuid4().hex}")
+        final_path = self.__path(key)
+        try:
+            repo_path = loader(staging_folder)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            shutil.rmtree(final_path, ignore_errors=True)
+            # The snapshot only becomes visible once it's complete
+            os.rename(repo_path, final_path)
+        finally:
+            shutil.rmtree(staging_folder, ignore_errors=True)
+
+        snapshot = RepoSnapshot(sha=key[1], path=final_path, size_bytes=_folder_size(final_path), _leases=1)
+        with self.__lock:
+            self.__snapshots[key] = snapshot
+            self.__total_bytes += snapshot.size_bytes
+            self.__key_locks.pop(key, None)
+            self.__evict()
+        log.debug(f"Snapshot of {key[0]}@{key[1]} materialised, {snapshot.size_bytes} bytes")
+        return snapshot
+
+    def __evict(self) -> None:
+        """Must be called with the lock held"""
+        for key in list(self.__snapshots):
+            if self.__total_bytes <= self.__max_bytes and len(self.__snapshots) <= self.__max_entries:
+                return
+            snapshot = self.__snapshots[key]
+            if snapshot._leases > 0:
+                continue
+            del self.__snapshots[key]
+            self.__total_bytes -= snapshot.size_bytes
+            shutil.rmtree(snapshot.path, ignore_errors=True)
+            metrics.increment("repo_snapshot.evictions")
+
+    def __path(self, key: tuple[str, str]) -> str:
+        repo_full_name, sha = key
+        # Percent-encoded, so the folder name maps back to exactly one repository name
+        return os.path.join(self.__directory, quote(repo_full_name, safe=""), sha)
+
+    def __load_index(self) -> None:
+        """Picks up the snapshots of a previous process, the oldest ones are evicted first"""
+        if not os.path.isdir(self.__directory):
+            return
+
+        found = []
+        for repo_dir in os.listdir(self.__directory):
+            repo_path = os.path.join(self.__directory, repo_dir)
+            if repo_dir.startswith(".staging-"):
+                # Leftover of an interrupted download
+                shutil.rmtree(repo_path, ignore_errors=True)
+                continue
+            if not os.path.isdir(repo_path):
+                continue
+            if "%2F" not in repo_dir:
+                # Folder of the owner__name layout of earlier versions, its name can't be mapped back reliably
+                shutil.rmtree(repo_path, ignore_errors=True)
+                continue
+            for sha in os.listdir(repo_path):
+                path = os.path.join(repo_path, sha)
+                found.append((os.stat(path).st_mtime, (unquote(repo_dir), sha), path))
+
+        with self.__lock:
+            for _, key, path in sorted(found):
+                snapshot = RepoSnapshot(sha=key[1], path=path, size_bytes=_folder_size(path))
+                self.__snapshots[key] = snapshot
+                self.__total_bytes += snapshot.size_bytes
+            self.__evict()
+
+
+def _folder_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(current, name)) for current, _, names in os.walk(path) for name in names)
+
+
+def create_snapshot_manager() -> SnapshotManager:
+    directory = os.getenv(REPO_SNAPSHOT_DIR_ENV) or os.path.join(tmp_dir(), "repo_snapshots")
+    max_bytes = int(os.getenv(REPO_SNAPSHOT_MAX_BYTES_ENV) or DEFAULT_MAX_BYTES)
+    max_entries = int(os.getenv(REPO_SNAPSHOT_MAX_ENTRIES_ENV) or DEFAULT_MAX_ENTRIES)
+    return SnapshotManager(directory, max_bytes, max_entries)
+
+
+# Initialize the manager so every review of the process shares the snapshots
+snapshot_manager = create_snapshot_manager()
@@ -0,0 +1,340 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import argparse
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from subprocess import PIPE, run
+from typing import Iterator, Optional
+
+from utils.constants import (
+    TERRAFORM_OFFLINE_ENV,
+    TERRAFORM_PLUGIN_CACHE_DIR_ENV,
+    TERRAFORM_PROVIDER_MIRROR_DIR_ENV,
+    TMP_DIR_ENV,
+)
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+from utils.tmp_dir import tmp_dir
+
+LOCKFILE_NAME = ".terraform.lock.hcl"
+INSTALL_LOCK_POLL_INTERVAL = 0.5
+
+_PROVIDER_BLOCK_PATTERN = re.compile(r'provider\s+"([^"]+)"\s*\{(.*?)\n\}', re.DOTALL)
+_VERSION_PATTERN = re.compile(r'^\s*version\s*=\s*"([^"]*)"', re.MULTILINE)
+_CONSTRAINTS_PATTERN = re.compile(r'^\s*constraints\s*=\s*"([^"]*)"', re.MULTILINE)
+
+
+def parse_lockfile(content: str) -> dict[str, tuple[str, str]]:
+    """Returns the locked providers of a .terraform.lock.hcl: source address -> (version, constraints)"""
+    providers = {}
+    for source, body in _PROVIDER_BLOCK_PATTERN.findall(content):
+        version = _VERSION_PATTERN.search(body)
+        constraints = _CONSTRAINTS_PATTERN.search(body)
+        providers[source] = (version.group(1) if version else "", constraints.group(1) if constraints else "")
+    return providers
+
+
+def lockfile_key(content: str) -> str:
+    """The cache key of a lockfile, two lockfiles locking the same provider versions share it"""
+    providers = parse_lockfile(content)
+    canonical = "\n".join(f"{source}={version}" for source, (version, _) in sorted(providers.items()))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class TerraformCache:
+    """
+    TerraformCache shares the downloaded providers between the terraform runs of the process, and of the pod if the
+    cache folder is on a persistent volume. Providers are served from a local filesystem mirror if one is configured,
+    then from the plugin cache, and only downloaded from the registry when neither has them, unless offline.
+    The lockfiles whose providers are already cached are recorded, so the hit rate can be monitored.
+    """
+
+    def __init__(self, plugin_cache_dir: str, mirror_dir: Optional[str] = None, offline: bool = False):
+        self.__plugin_cache_dir = os.path.abspath(plugin_cache_dir)
+        self.__mirror_dir = os.path.abspath(mirror_dir) if mirror_dir else None
+        self.__offline = offline
+        self.__lock = threading.Lock()
+        self.__install_lock = threading.Lock()
+        self.__cli_config_file = os.path.join(os.path.dirname(self.__plugin_cache_dir), "terraform.rc")
+        self.__cli_config_checked = False
+
+    @property
+    def plugin_cache_dir(self) -> str:
+        return self.__plugin_cache_dir
+
+    @property
+    def mirror_dir(self) -> Optional[str]:
+        return self.__mirror_dir
+
+    @property
+    def cli_config_file(self) -> str:
+        return self.__cli_config_file
+
+    def environment(self) -> dict[str, str]:
+        """The environment variables which make terraform use the cache"""
+        self.__write_cli_config()
+        return {
+            "TF_CLI_CONFIG_FILE": self.__cli_config_file,
+            "TF_PLUGIN_CACHE_DIR": self.__plugin_cache_dir,
+            # The lockfiles of the analyzed repos are thrown away with the workspace, so a cached provider can be
+            # used even if the repo has no lockfile, or the lockfile lacks the checksum of our platform
+            "TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE": "true",
+            "TF_IN_AUTOMATION": "true",
+        }
+
+    def configure_environment(self) -> None:
+        """Makes every terraform process started by this process use the cache"""
+        os.environ.update(self.environment())
+
+    @contextmanager
+    def install_lock(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Serializes the provider installs, terraform doesn't make the plugin cache safe for concurrent writes.
+        The threads of the process wait for each other, and the processes and pods sharing the cache folder wait on a
+        file lock in it. Raises TimeoutError if the lock is not acquired within timeout seconds.
+        """
+        start = time.perf_counter()
+        if not self.__install_lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise _install_lock_timeout(timeout)
+        try:
+            os.makedirs(self.__plugin_cache_dir, exist_ok=True)
+            with open(os.path.join(self.__plugin_cache_dir, ".install.lock"), "a") as lock_file:
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX if timeout is None else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if timeout is not None and time.perf_counter() - start >= timeout:
+                            raise _install_lock_timeout(timeout) from None
+                        time.sleep(INSTALL_LOCK_POLL_INTERVAL)
+                metrics.observe("terraform_cache.install_lock_wait", time.perf_counter() - start)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            self.__install_lock.release()
+
+    def needs_install_lock(self, module_folder: str) -> bool:
+        """
+        Whether the init of a module may install providers into the plugin cache, and has to hold the install lock.
+        The providers of a recorded lockfile are in the cache already, and a filesystem mirror is only read.
+        """
+        if self.__mirror_dir:
+            return False
+        content = _read_file(os.path.join(module_folder, LOCKFILE_NAME))
+        return content is None or not self.is_cached(content)
+
+    def is_cached(self, lockfile_content: str) -> bool:
+        return os.path.exists(self.__marker_path(lockfile_content))
+
+    def record(self, repo_folder: str) -> bool:
+        """
+        Records the lockfile of a successfully initialized repo, returns whether its providers were cached before.
+        Repos without a lockfile are not recorded.
+        """
+        lockfile = os.path.join(repo_folder, LOCKFILE_NAME)
+        if not os.path.isfile(lockfile):
+            metrics.increment("terraform_cache.no_lockfile")
+            return False
+
+        with open(lockfile, "r", encoding="utf-8") as f:
+            content = f.read()
+
+        if self.is_cached(content):
+            metrics.increment("terraform_cache.hits")
+            return True
+
+        metrics.increment("terraform_cache.misses")
+        self.__mark(content)
+        return False
+
+    def seed(self, lockfiles_dir: str) -> int:
+        """
+        Warms the cache with the providers locked by every .terraform.lock.hcl under a folder, returns the number of
+        lockfiles seeded. With a mirror folder the providers are mirrored, so they can be installed offline afterwards.
+        """
+        seeded = 0
+        for current, _, names in os.walk(lockfiles_dir):
+            if LOCKFILE_NAME not in names:
+                continue
+            with open(os.path.join(current, LOCKFILE_NAME), "r", encoding="utf-8") as f:
+                content = f.read()
+            if not parse_lockfile(content):
+                continue
+            if self.is_cached(content):
+                log.info(f"Providers of {current} are already cached")
+                continue
+            if self.__seed_lockfile(content):
+                self.__mark(content)
+                seeded += 1
+            else:
+                log.error(f"Error while caching the providers of {current}")
+
+        # The mirror has new providers, they must be excluded from the direct installation
+        self.__write_cli_config(force=True)
+        return seeded
+
+    def __seed_lockfile(self, content: str) -> bool:
+        with tempfile.TemporaryDirectory(dir=os.getenv(TMP_DIR_ENV)) as config_dir:
+            with open(os.path.join(config_dir, "main.tf"), "w", encoding="utf-8") as f:
+                f.write(_required_providers(parse_lockfile(content)))
+            with open(os.path.join(config_dir, LOCKFILE_NAME), "w", encoding="utf-8") as f:
+                f.write(content)
+
+            env = dict(os.environ, **self.environment())
+            if self.__mirror_dir:
+                args = ["terraform", "providers", "mirror", self.__mirror_dir]
+            else:
+                args = ["terraform", "init", "-backend=false", "-input=false"]
+            with self.install_lock():
+                result = run(args, cwd=config_dir, env=env, stdout=PIPE, stderr=PIPE, text=True)
+            if result.returncode != 0:
+                log.error(f"{' '.join(args[:3])} failed: {result.stderr}")
+            return result.returncode == 0
+
+    def __marker_path(self, lockfile_content: str) -> str:
+        return os.path.join(self.__plugin_cache_dir, ".lockfiles", lockfile_key(lockfile_content))
+
+    def __mark(self, lockfile_content: str) -> None:
+        marker = self.__marker_path(lockfile_content)
+        os.makedirs(os.path.dirname(marker), exist_ok=True)
+        with open(marker, "w", encoding="utf-8") as f:
+            f.write(lockfile_content)
+
+    def __write_cli_config(self, force: bool = False) -> None:
+        """
+        Regenerates the CLI config once per process, so a config left on a persistent volume by an earlier version of
+        the settings is replaced, and again when forced. The file is only replaced if its content changes.
+        """
+        with self.__lock:
+            if self.__cli_config_checked and not force:
+                return
+            os.makedirs(self.__plugin_cache_dir, exist_ok=True)
+            config = _cli_config(self.__plugin_cache_dir, self.__mirror_dir, self.__offline)
+            self.__cli_config_checked = True
+            if _read_file(self.__cli_config_file) == config:
+                return
+            tmp_file = f"{self.__cli_config_file}.{os.getpid()}"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write(config)
+            os.replace(tmp_file, self.__cli_config_file)
+            log.info(f"Terraform CLI config written to {self.__cli_config_file}")
+
+
+def _install_lock_timeout(timeout: Optional[float]) -> TimeoutError:
+    metrics.increment("terraform_cache.install_lock_timeouts")
+    return TimeoutError(f"Timed out after {timeout:g} seconds waiting for the provider install lock")
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _mirrored_providers(mirror_dir: str) -> list[str]:
+    """Lists the providers of a filesystem mirror, laid out as <hostname>/<namespace>/<type>/..."""
+    providers: list[str] = []
+    if not os.path.isdir(mirror_dir):
+        return providers
+    for hostname in sorted(os.listdir(mirror_dir)):
+        for namespace in sorted(_subfolders(os.path.join(mirror_dir, hostname))):
+            for provider_type in sorted(_subfolders(os.path.join(mirror_dir, hostname, namespace))):
+                providers.append(f"{hostname}/{namespace}/{provider_type}")
+    return providers
+
+
+def _subfolders(path: str) -> list[str]:
+    if not os.path.isdir(path):
+        return []
+    return [name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name))]
+
+
+def _cli_config(plugin_cache_dir: str, mirror_dir: Optional[str], offline: bool) -> str:
+    lines = [f'plugin_cache_dir = "{plugin_cache_dir}"']
+    if not mirror_dir:
+        return "\n".join(lines) + "\n"
+
+    providers = _mirrored_providers(mirror_dir)
+    if not providers and not offline:
+        return "\n".join(lines) + "\n"
+
+    # Terraform installs a provider with the first method which includes it, so the mirrored providers have to be
+    # excluded from the direct installation explicitly, otherwise the registry would never be used for the others
+    mirrored = ", ".join(f'"{provider}"' for provider in providers)
+    lines.append("provider_installation {")
+    lines.append("  filesystem_mirror {")
+    lines.append(f'    path = "{mirror_dir}"')
+    if not offline:
+        lines.append(f"    include = [{mirrored}]")
+    lines.append("  }")
+    if not offline:
+        lines.append("  direct {")
+        lines.append(f"    exclude = [{mirrored}]")
+        lines.append("  }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def _required_providers(providers: dict[str, tuple[str, str]]) -> str:
+    lines = ["terraform {", "  required_providers {"]
+    used_names: set[str] = set()
+    for source, (version, _) in sorted(providers.items()):
+        name = source.split("/")[-1]
+        if name in used_names:
+            name = f"{name}_{len(used_names)}"
+        used_names.add(name)
+        lines.append(f'    {name} = {{ source = "{source}", version = "{version}" }}')
+    lines.extend(["  }", "}"])
+    return "\n".join(lines) + "\n"
+
+
+def create_terraform_cache() -> TerraformCache:
+    root = os.path.join(tmp_dir(), "terraform")
+    plugin_cache_dir = os.getenv(TERRAFORM_PLUGIN_CACHE_DIR_ENV) or os.path.join(root, "plugin-cache")
+    mirror_dir = os.getenv(TERRAFORM_PROVIDER_MIRROR_DIR_ENV) or None
+    offline = os.getenv(TERRAFORM_OFFLINE_ENV, "false").lower() == "true"
+    return TerraformCache(plugin_cache_dir, mirror_dir, offline)
+
+
+# Initialize the cache so every static analyzer run of the process shares it
+terraform_cache = create_terraform_cache()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the Terraform provider cache of the static analyzer")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    seed_parser = subparsers.add_parser("seed", help="Warm the cache with the providers of every lockfile under a folder")
+    seed_parser.add_argument("lockfiles_dir", help="Folder searched recursively for .terraform.lock.hcl files")
+    cli_args = parser.parse_args()
+
+    if cli_args.command == "seed":
+        if shutil.which("terraform") is None:
+            parser.error("terraform is not installed")
+        count = terraform_cache.seed(cli_args.lockfiles_dir)
+        print(f"Seeded the providers of {count} lockfile(s) into {terraform_cache.mirror_dir or terraform_cache.plugin_cache_dir}")
@@ -0,0 +1,121 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import json
+import os
+from typing import Any, Optional
+
+from utils.models import StaticAnalyzerOutputIssues
+
+
+class DiagnosticsParseError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+def _load(output: str, tool: str) -> dict[str, Any]:
+    try:
+        data = json.loads(output)
+    except ValueError as e:
+        raise DiagnosticsParseError(f"{tool} output is not JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise DiagnosticsParseError(f"{tool} output is not a JSON object")
+    return data
+
+
+def _file_name(range_: Optional[dict], directory: str) -> str:
+    filename = (range_ or {}).get("filename")
+    if not filename:
+        return directory or "."
+    # The filenames are relative to the analyzed module, the issues refer to the files from the repo root
+    return os.path.normpath(os.path.join(directory, filename)).replace(os.sep, "/")
+
+
+def _line_number(range_: Optional[dict]) -> Optional[int]:
+    line = ((range_ or {}).get("start") or {}).get("line")
+    return line if isinstance(line, int) else None
+
+
+def parse_validate_json(output: str, directory: str = "") -> list[StaticAnalyzerOutputIssues]:
+    """Maps the errors of `terraform validate -json` to issues, warnings are dropped like the LLM summary does"""
+    data = _load(output, "terraform validate")
+    diagnostics = data.get("diagnostics")
+    if not isinstance(diagnostics, list):
+        raise DiagnosticsParseError("terraform validate output has no diagnostics")
+
+    issues = []
+    for diagnostic in diagnostics:
+        if diagnostic.get("severity") != "error":
+            continue
+        description = diagnostic.get("summary", "")
+        if diagnostic.get("detail"):
+            description = f"{description}: {diagnostic['detail']}"
+        context = (diagnostic.get("snippet") or {}).get("context")
+        if context:
+            description = f"{description} (in {context})"
+        issues.append(
+            StaticAnalyzerOutputIssues(
+                file_name=_file_name(diagnostic.get("range"), directory),
+                full_issue_description=description,
+                line_number=_line_number(diagnostic.get("range")),
+            )
+        )
+    return issues
+
+
+def parse_tflint_json(output: str, directory: str = "") -> list[StaticAnalyzerOutputIssues]:
+    """Maps the errors of `tflint --format=json` to issues, warnings and notices are dropped like the LLM summary does"""
+    data = _load(output, "tflint")
+    if not isinstance(data.get("issues"), list) or not isinstance(data.get("errors", []), list):
+        raise DiagnosticsParseError("tflint output has no issues")
+
+    issues = []
+    for issue in data["issues"]:
+        rule = issue.get("rule") or {}
+        if rule.get("severity") != "error":
+            continue
+        issues.append(
+            StaticAnalyzerOutputIssues(
+                file_name=_file_name(issue.get("range"), directory),
+                full_issue_description=issue.get("message", ""),
+                line_number=_line_number(issue.get("range")),
+                rule=rule.get("name"),
+            )
+        )
+
+    # Errors of tflint itself, like an invalid config or an unparseable file
+    for error in data.get("errors", []):
+        issues.append(
+            StaticAnalyzerOutputIssues(
+                file_name=_file_name(error.get("range"), directory),
+                full_issue_description=error.get("message", ""),
+                line_number=_line_number(error.get("range")),
+            )
+        )
+    return issues
+
+
+def rename_files(issues: list[StaticAnalyzerOutputIssues], file_rename_map: dict[str, str]) -> list[StaticAnalyzerOutputIssues]:
+    """Restores the original names of the files renamed for the analysis, e.g. modified_main.tf -> main.tofu"""
+    if not file_rename_map:
+        return issues
+    for issue in issues:
+        for old_filename, new_filename in file_rename_map.items():
+            issue.file_name = issue.file_name.replace(new_filename, old_filename)
+            issue.full_issue_description = issue.full_issue_description.replace(new_filename, old_filename)
+    return issues
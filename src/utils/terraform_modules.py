@@ -0,0 +1,140 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import hashlib
+import os
+import re
+from typing import Iterable, Optional
+
+from utils.repo_snapshot import is_analyzer_file
+
+MODULE_FILE_EXTENSIONS = (".tf", ".tf.json", ".tofu")
+
+# Only the local module calls connect the modules of a repo, registry and git sources are downloaded by init
+_LOCAL_SOURCE_PATTERN = re.compile(r'^\s*source\s*=\s*"(\.{1,2}/[^"]*)"', re.MULTILINE)
+
+
+def _normalize(directory: str) -> str:
+    directory = os.path.normpath(directory).replace(os.sep, "/")
+    return "" if directory == "." else directory
+
+
+def find_modules(repo_folder: str) -> dict[str, set[str]]:
+    """Returns every Terraform module of a repo with the local modules it calls, as repo-relative folders"""
+    modules: dict[str, set[str]] = {}
+    for current, dirs, names in os.walk(repo_folder):
+        # Skip .terraform, .git and the like
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        module_files = [name for name in names if name.endswith(MODULE_FILE_EXTENSIONS)]
+        if not module_files:
+            continue
+
+        directory = _normalize(os.path.relpath(current, repo_folder))
+        calls = set()
+        for name in module_files:
+            with open(os.path.join(current, name), "r", encoding="utf-8", errors="replace") as f:
+                for source in _LOCAL_SOURCE_PATTERN.findall(f.read()):
+                    callee = _normalize(os.path.join(directory, source))
+                    if not callee.startswith(".."):
+                        calls.add(callee)
+        modules[directory] = calls
+    return modules
+
+
+def find_root_modules(repo_folder: str, changed_files: list[str], modules: Optional[dict[str, set[str]]] = None) -> list[str]:
+    """
+    Returns the root modules affected by the changed files, as repo-relative folders, "" being the repo root.
+    A changed child module is analyzed through the root modules calling it, since validate checks the whole
+    configuration of a root module, including its local child modules.
+    """
+    if modules is None:
+        modules = find_modules(repo_folder)
+    callers: dict[str, set[str]] = {directory: set() for directory in modules}
+    for caller, callees in modules.items():
+        for callee in callees:
+            if callee in callers and callee != caller:
+                callers[callee].add(caller)
+
+    touched = {_normalize(os.path.dirname(path)) for path in changed_files if is_analyzer_file(path)}
+
+    roots: set[str] = set()
+    for directory in touched:
+        if directory not in modules:
+            # tfvars-only folders, deleted modules
+            continue
+        visited = set()
+        stack = [directory]
+        while stack:
+            module = stack.pop()
+            if module in visited:
+                continue
+            visited.add(module)
+            if not callers[module]:
+                roots.add(module)
+            stack.extend(callers[module])
+        if not roots & visited:
+            # The module only takes part in call cycles, analyze it on its own
+            roots.add(directory)
+
+    return sorted(roots)
+
+
+def module_closure(modules: dict[str, set[str]], directory: str) -> set[str]:
+    """Returns the module with every local module it calls, directly or transitively"""
+    closure = set()
+    stack = [directory]
+    while stack:
+        module = stack.pop()
+        if module in closure:
+            continue
+        closure.add(module)
+        stack.extend(callee for callee in modules.get(module, ()) if callee in modules)
+    return closure
+
+
+def content_hash(repo_folder: str, directories: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Hashes the analyzer files of the given folders, or of the whole repo if no folders are given.
+    The repo root's tflint config and lockfile are always part of the hash, since they affect every module.
+    Returns None if there are no analyzer files at all.
+    """
+    paths: set[str] = set()
+    if directories is None:
+        for current, dirs, names in os.walk(repo_folder):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            directory = _normalize(os.path.relpath(current, repo_folder))
+            paths.update(_normalize(os.path.join(directory, name)) for name in names if is_analyzer_file(name))
+    else:
+        for directory in directories:
+            folder = os.path.join(repo_folder, directory)
+            if os.path.isdir(folder):
+                paths.update(
+                    _normalize(os.path.join(directory, name)) for name in os.listdir(folder)
+                    if is_analyzer_file(name) and os.path.isfile(os.path.join(folder, name))
+                )
+        paths.update(name for name in (".tflint.hcl", ".terraform.lock.hcl") if os.path.isfile(os.path.join(repo_folder, name)))
+
+    if not paths:
+        return None
+
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.encode("utf-8") + b"\0")
+        with open(os.path.join(repo_folder, path), "rb") as f:
+            digest.update(f.read())
+        digest.update(b"\0")
+    return digest.hexdigest()
@@ -0,0 +1,26 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import tempfile
+
+from utils.constants import TMP_DIR_ENV
+
+
+def tmp_dir() -> str:
+    """The folder of the caches and scratch files: TMP_DIR, or the temporary folder of the system rather than the working directory"""
+    return os.getenv(TMP_DIR_ENV) or tempfile.gettempdir()
@@ -0,0 +1,241 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import multiprocessing
+import os
+import resource
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import partial
+from subprocess import PIPE, CompletedProcess, TimeoutExpired
+from typing import Optional
+
+from utils.constants import (
+    TOOL_RUNNER_MEMORY_LIMIT_BYTES_ENV,
+    TOOL_RUNNER_TIMEOUT_SECONDS_ENV,
+    TOOL_RUNNER_WORKERS_ENV,
+)
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+
+# Wall-clock timeouts of the tools, init downloads providers and modules, so it gets the most time
+DEFAULT_TIMEOUTS = {
+    "terraform init": 600.0,
+    "terraform validate": 120.0,
+    "tflint": 180.0,
+}
+DEFAULT_TIMEOUT = 300.0
+VERSION_TIMEOUT = 30.0
+DEFAULT_MEMORY_LIMIT_BYTES = 4 * 1024 * 1024 * 1024
+
+
+def tool_name(args: list[str]) -> str:
+    """The name the tool is timed and limited by, e.g. "terraform init" or "tflint" """
+    if args and os.path.basename(args[0]) == "terraform" and len(args) > 1:
+        return f"terraform {args[1]}"
+    return os.path.basename(args[0]) if args else ""
+
+
+@dataclass
+class ToolLimits:
+    timeout_seconds: float
+    # CPU seconds of each process, 0 means unlimited
+    cpu_seconds: int = 0
+    # Address space of each process, 0 means unlimited
+    memory_bytes: int = 0
+
+
+class ToolResult(CompletedProcess):
+    def __init__(self, args, returncode, stdout=None, stderr=None, timed_out: bool = False, duration_seconds: float = 0.0):
+        super().__init__(args, returncode, stdout, stderr)
+        self.timed_out = timed_out
+        self.duration_seconds = duration_seconds
+
+
+def _limit_resources(limits: ToolLimits) -> None:
+    # Runs in the child between fork and exec, the limits are inherited by the providers terraform starts
+    if limits.cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds))
+    if limits.memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (limits.memory_bytes, limits.memory_bytes))
+
+
+def _execute(args: list[str], cwd: Optional[str], env: Optional[dict], limits: ToolLimits) -> tuple[int, str, str, bool, float]:
+    """Runs a tool to completion or until its timeout. Module level, so it can run in the worker processes."""
+    start = time.monotonic()
+    process = subprocess.Popen(
+        args,
+        cwd=cwd,
+        env=env,
+        stdout=PIPE,
+        stderr=PIPE,
+        text=True,
+        # A new process group, so the tool can be killed together with everything it started
+        start_new_session=True,
+        preexec_fn=partial(_limit_resources, limits),
+    )
+    timed_out = False
+    try:
+        stdout, stderr = process.communicate(timeout=limits.timeout_seconds)
+    except TimeoutExpired:
+        timed_out = True
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        stdout, stderr = process.communicate()
+        stderr = f"{stderr}\n{tool_name(args)} timed out after {limits.timeout_seconds:g} seconds and was killed"
+    return process.returncode, stdout, stderr, timed_out, time.monotonic() - start
+
+
+def _warm_up(_: int) -> int:
+    return os.getpid()
+
+
+class ToolRunner:
+    """
+    ToolRunner runs the analyzer tools with wall-clock timeouts and resource limits, and kills the whole process group
+    of a tool which runs out of time.
+    The tools are started from a pool of small worker processes, forked once from a fork server. Starting a process
+    with resource limits requires a plain fork, which is slow from the big review process with its models loaded.
+    With no workers configured the tools are started from the calling process.
+    """
+
+    def __init__(self, workers: int = 0, timeouts: Optional[dict[str, float]] = None, default_timeout: float = DEFAULT_TIMEOUT,
+                 memory_bytes: int = DEFAULT_MEMORY_LIMIT_BYTES):
+        self.__workers = workers
+        self.__timeouts = dict(DEFAULT_TIMEOUTS if timeouts is None else timeouts)
+        self.__default_timeout = default_timeout
+        self.__memory_bytes = memory_bytes
+        self.__pool: Optional[ProcessPoolExecutor] = None
+        self.__lock = threading.Lock()
+        # Version command -> its output, the tools are not upgraded while the process runs
+        self.__versions: dict[str, str] = {}
+        self.__versions_lock = threading.Lock()
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    def limits(self, args: list[str], timeout: Optional[float] = None) -> ToolLimits:
+        timeout = timeout or self.__timeouts.get(tool_name(args), self.__default_timeout)
+        # The CPU time can't exceed the wall-clock time by much, unless the tool is multithreaded
+        return ToolLimits(timeout_seconds=timeout, cpu_seconds=int(timeout * 4), memory_bytes=self.__memory_bytes)
+
+    def start(self) -> None:
+        """Starts the worker processes up front, so the first review doesn't pay for it"""
+        if self.__workers <= 0:
+            return
+        with self.__lock:
+            if self.__pool is not None:
+                return
+            self.__pool = ProcessPoolExecutor(max_workers=self.__workers, mp_context=multiprocessing.get_context("forkserver"))
+            pool = self.__pool
+        pids = set(pool.map(_warm_up, range(self.__workers)))
+        log.info(f"Tool runner started with {len(pids)} worker processes")
+
+    def stop(self) -> None:
+        with self.__lock:
+            pool, self.__pool = self.__pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def run(self, args: list[str], cwd: Optional[str] = None, stdout: int = PIPE, stderr: int = PIPE, text: bool = True,
+            timeout: Optional[float] = None, env: Optional[dict] = None) -> ToolResult:
+        """A drop-in replacement of subprocess.run for the captured, text mode calls of the analyzers"""
+        if stdout != PIPE or stderr != PIPE or not text:
+            raise ValueError("ToolRunner only supports captured text output")
+
+        limits = self.limits(args, timeout)
+        # The workers were forked earlier, they don't see the changes of the environment since then
+        env = dict(os.environ) if env is None else env
+
+        if self.__workers > 0:
+            self.start()
+        with self.__lock:
+            pool = self.__pool
+
+        if pool is None:
+            outcome = _execute(args, cwd, env, limits)
+        else:
+            try:
+                outcome = pool.submit(_execute, args, cwd, env, limits).result()
+            except BrokenProcessPool:
+                log.error("Tool runner worker died, restarting the pool")
+                self.__reset(pool)
+                outcome = _execute(args, cwd, env, limits)
+
+        returncode, out, err, timed_out, duration = outcome
+        name = tool_name(args)
+        metrics.observe(f"tool_runner.{name.replace(' ', '_')}", duration)
+        if timed_out:
+            metrics.increment("tool_runner.timeouts")
+            log.error(f"{name} timed out after {limits.timeout_seconds:g} seconds in {cwd}")
+        return ToolResult(args, returncode, out, err, timed_out=timed_out, duration_seconds=duration)
+
+    def version(self, args: list[str]) -> str:
+        """The output of a version command, e.g. terraform version, run once per process. Empty if the tool can't run"""
+        key = " ".join(args)
+        with self.__versions_lock:
+            if key not in self.__versions:
+                try:
+                    # Run once, so it doesn't need the workers. Without the checkpoint terraform doesn't look for a
+                    # newer release, which would change the output
+                    env = dict(os.environ, CHECKPOINT_DISABLE="1")
+                    returncode, stdout, _, _, _ = _execute(args, None, env, self.limits(args, VERSION_TIMEOUT))
+                    self.__versions[key] = stdout.strip() if returncode == 0 else ""
+                except OSError as e:
+                    log.warning(f"Error running {key}: {e}")
+                    self.__versions[key] = ""
+            return self.__versions[key]
+
+    def __reset(self, broken: ProcessPoolExecutor) -> None:
+        with self.__lock:
+            if self.__pool is broken:
+                self.__pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+def create_tool_runner() -> ToolRunner:
+    workers = int(os.getenv(TOOL_RUNNER_WORKERS_ENV) or os.cpu_count() or 2)
+    timeout = os.getenv(TOOL_RUNNER_TIMEOUT_SECONDS_ENV)
+    # A global timeout overrides the defaults of every tool
+    timeouts: Optional[dict[str, float]] = {} if timeout else None
+    memory_bytes = int(os.getenv(TOOL_RUNNER_MEMORY_LIMIT_BYTES_ENV) or DEFAULT_MEMORY_LIMIT_BYTES)
+    return ToolRunner(workers, timeouts, float(timeout or DEFAULT_TIMEOUT), memory_bytes)
+
+
+# Initialize the runner so every static analyzer run of the process shares the workers
+tool_runner = create_tool_runner()
+
+
+def run(args: list[str], cwd: Optional[str] = None, stdout: int = PIPE, stderr: int = PIPE, text: bool = True,
+        timeout: Optional[float] = None) -> ToolResult:
+    return tool_runner.run(args, cwd=cwd, stdout=stdout, stderr=stderr, text=text, timeout=timeout)
+
+
+def tool_timeout(args: list[str]) -> float:
+    return tool_runner.limits(args).timeout_seconds
+
+
+def tool_version(args: list[str]) -> str:
+    return tool_runner.version(args)
@@ -0,0 +1,118 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import queue
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from utils.constants import (
+    STATIC_ANALYZER_WORKSPACE_DIR_ENV,
+    STATIC_ANALYZER_WORKSPACE_TMPFS_ENV,
+    STATIC_ANALYZER_WORKSPACES_ENV,
+)
+from utils.logging_config import logger as log
+from utils.metrics import metrics
+from utils.tmp_dir import tmp_dir
+
+DEFAULT_WORKSPACES = 4
+TMPFS_DIR = "/dev/shm"
+
+
+class WorkspacePool:
+    """
+    WorkspacePool hands out private working folders to the static analyzer runs.
+    The folders are created once and reused, a run has exclusive access to its folder until it's released,
+    and the folder is emptied on release whatever way the run ended.
+    """
+
+    def __init__(self, root: str, size: int = DEFAULT_WORKSPACES):
+        if size <= 0:
+            raise ValueError("Workspace pool size must be positive")
+        self.__root = root
+        self.__size = size
+        self.__free: queue.Queue[str] = queue.Queue()
+        self.__created = False
+        self.__create_lock = threading.Lock()
+        metrics.register_gauge("static_analyzer.workspaces_in_use", lambda: self.in_use)
+
+    @property
+    def root(self) -> str:
+        return self.__root
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def in_use(self) -> int:
+        return self.__size - self.__free.qsize() if self.__created else 0
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[str]:
+        """Leases a workspace, blocks until one is free. Raises queue.Empty if none is freed within the timeout"""
+        self.__create()
+        with metrics.timer("static_analyzer.workspace_wait"):
+            workspace = self.__free.get(timeout=timeout)
+        try:
+            yield workspace
+        finally:
+            _empty_folder(workspace)
+            self.__free.put(workspace)
+
+    def __create(self) -> None:
+        # The folders are created lazily by the first run, so importing the module has no side effects
+        with self.__create_lock:
+            if self.__created:
+                return
+            for i in range(self.__size):
+                workspace = os.path.join(self.__root, f"workspace-{i}")
+                os.makedirs(workspace, exist_ok=True)
+                # Leftovers of a previous process
+                _empty_folder(workspace)
+                self.__free.put(workspace)
+            self.__created = True
+
+
+def _empty_folder(folder: str) -> None:
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            log.error(f"Error while cleaning up the workspace {folder}: {e}")
+
+
+def create_workspace_pool() -> WorkspacePool:
+    root = os.getenv(STATIC_ANALYZER_WORKSPACE_DIR_ENV)
+    if not root:
+        use_tmpfs = os.getenv(STATIC_ANALYZER_WORKSPACE_TMPFS_ENV, "false").lower() == "true"
+        if use_tmpfs and os.path.isdir(TMPFS_DIR):
+            root = os.path.join(TMPFS_DIR, "static_analyzer")
+        else:
+            root = os.path.join(tmp_dir(), "workspaces")
+    size = int(os.getenv(STATIC_ANALYZER_WORKSPACES_ENV) or DEFAULT_WORKSPACES)
+    return WorkspacePool(root, size)
+
+
+# Initialize the pool so every static analyzer run of the process shares it
+workspace_pool = create_workspace_pool()
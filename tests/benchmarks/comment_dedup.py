@@ -0,0 +1,150 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""
+Compares the vectorised comment dedup with the per pair loops it replaced, on synthetic embeddings.
+Usage: python -m tests.benchmarks.comment_dedup [--sizes 50 500 5000] [--dimensions 384]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sentence_transformers.util import cos_sim
+
+from utils.comment_dedup import remove_duplicate_comments
+from utils.models import ReviewComment
+
+SIMILARITY_LIMIT = 0.6
+TOTAL_SIMILARITY_LIMIT = 0.9
+
+
+def legacy_remove_duplicate_comments(review_comments, new_review_comments, encode, similarity,
+                                     similarity_limit=SIMILARITY_LIMIT, total_similarity_limit=TOTAL_SIMILARITY_LIMIT):
+    """The per pair loops of CommentFilterer before the vectorised engine, the reference of its output"""
+
+    def comments_similar(comment1, comment2, value):
+        return (value > total_similarity_limit and comment1.filename == comment2.filename) or (
+            value > similarity_limit and abs(comment1.line_number - comment2.line_number) < 5 and comment1.filename == comment2.filename
+        )
+
+    if not new_review_comments:
+        return []
+    new_message_embeddings = encode([c.comment for c in new_review_comments])
+    new_message_similarity = similarity(new_message_embeddings, new_message_embeddings)
+    to_exclude = set()
+    filtered = []
+    for i, similarities in enumerate(new_message_similarity):
+        if i in to_exclude:
+            continue
+        filtered.append(new_review_comments[i])
+        for j in range(i + 1, new_message_similarity.shape[0]):
+            if comments_similar(new_review_comments[i], new_review_comments[j], similarities[j].item()):
+                to_exclude.add(j)
+
+    if not review_comments:
+        return filtered
+
+    new_and_existing_similarity = similarity(encode([c.comment for c in filtered]), encode([c.comment for c in review_comments]))
+    merged = []
+    for i, similarities in enumerate(new_and_existing_similarity):
+        if not any(comments_similar(filtered[i], review_comments[j], similarities[j].item()) for j in range(len(similarities))):
+            merged.append(filtered[i])
+    return merged
+
+
+class SyntheticEncoder:
+    """Deterministic embeddings of the synthetic comments, near duplicates share a base vector"""
+
+    def __init__(self, dimensions: int, seed: int = 0):
+        self.dimensions = dimensions
+        self.rng = np.random.default_rng(seed)
+        self.vectors: dict[str, np.ndarray] = {}
+        self.calls = 0
+        self.encoded = 0
+
+    def add(self, text: str, base: np.ndarray, noise: float) -> None:
+        vector = base + self.rng.normal(scale=noise, size=self.dimensions)
+        self.vectors[text] = (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.calls += 1
+        self.encoded += len(texts)
+        return np.stack([self.vectors[text] for text in texts])
+
+
+def synthetic_comments(count: int, existing_count: int, dimensions: int, seed: int = 0, files: int | None = None,
+                       lines: int = 100):
+    """
+    Returns new and existing comments spread over a few files, several comments share a topic,
+    which gives similarities on both sides of the limits
+    """
+    rng = np.random.default_rng(seed)
+    encoder = SyntheticEncoder(dimensions, seed)
+    topics = [rng.normal(size=dimensions) for _ in range(max(1, (count + existing_count) // 4))]
+    files = [f"modules/m{i}/main.tf" for i in range(files or max(1, (count + existing_count) // 100))]
+
+    def comment(index: int, prefix: str) -> ReviewComment:
+        text = f"{prefix} comment {index}"
+        encoder.add(text, topics[rng.integers(len(topics))], noise=rng.choice([0.05, 0.6, 1.5, 2.5]) * np.sqrt(1 / dimensions) * 10)
+        return ReviewComment(filename=files[rng.integers(len(files))], line_number=int(rng.integers(1, lines)),
+                             comment=text, status="added")
+
+    new = [comment(i, "new") for i in range(count)]
+    existing = [comment(i, "existing") for i in range(existing_count)]
+    return new, existing, encoder
+
+
+def benchmark(count: int, dimensions: int) -> dict:
+    new, existing, encoder = synthetic_comments(count, count, dimensions)
+    start = time.perf_counter()
+    expected = legacy_remove_duplicate_comments(existing, new, encoder, cos_sim)
+    legacy_seconds = time.perf_counter() - start
+    legacy_encoded = encoder.encoded
+
+    start = time.perf_counter()
+    actual = remove_duplicate_comments(existing, new, encoder, cos_sim, SIMILARITY_LIMIT, TOTAL_SIMILARITY_LIMIT)
+    seconds = time.perf_counter() - start
+
+    return {
+        "comments": count,
+        "kept": len(actual),
+        "legacy_seconds": legacy_seconds,
+        "seconds": seconds,
+        "legacy_encoded": legacy_encoded,
+        "encoded": encoder.encoded - legacy_encoded,
+        "identical": actual == expected,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000],
+                        help="number of new comments, checked against as many existing ones")
+    parser.add_argument("--dimensions", type=int, default=384, help="embedding dimensions, 384 for all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    print(f"{'comments':>8} {'kept':>6} {'loops (s)':>10} {'numpy (s)':>10} {'speedup':>8} {'encoded':>13} {'identical':>9}")
+    for size in args.sizes:
+        result = benchmark(size, args.dimensions)
+        print(f"{result['comments']:>8} {result['kept']:>6} {result['legacy_seconds']:>10.3f} {result['seconds']:>10.3f} "
+              f"{result['legacy_seconds'] / result['seconds']:>7.1f}x {result['legacy_encoded']:>6} -> {result['encoded']:<5} "
+              f"{str(result['identical']):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""
+Compares the exact and ANN comment dedup backends on a mega-PR: a few generated files, a fixed number of new comments
+and a growing history of existing ones, on synthetic embeddings.
+Usage: python -m tests.benchmarks.comment_dedup_backends [--new 1000] [--history 1000 5000 20000] [--files 4]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from tests.benchmarks.comment_dedup import SIMILARITY_LIMIT, TOTAL_SIMILARITY_LIMIT, synthetic_comments
+from utils.comment_dedup import ANN_BACKEND, EXACT_BACKEND, remove_duplicate_comments
+
+
+def numpy_similarity(embeddings1: np.ndarray, embeddings2: np.ndarray) -> np.ndarray:
+    """Cosine similarity of the normalised synthetic embeddings, in numpy so tracemalloc sees the matrices"""
+    return embeddings1 @ embeddings2.T
+
+
+def run(backend: str, new, existing, encoder) -> tuple[list, float, float]:
+    """Returns the kept comments, the seconds and the peak memory in MB of the dedup, beside the embeddings"""
+    # The embeddings are encoded before tracing, both backends hold them the same way
+    embeddings = {"new": encoder([c.comment for c in new]), "existing": encoder([c.comment for c in existing])}
+
+    def encode(texts: list[str]) -> np.ndarray:
+        return embeddings["new"] if texts[0] == new[0].comment else embeddings["existing"]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = remove_duplicate_comments(existing, new, encode, numpy_similarity, SIMILARITY_LIMIT, TOTAL_SIMILARITY_LIMIT,
+                                     backend=backend)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, seconds, peak / 2 ** 20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--new", type=int, default=1000, help="number of new comments")
+    parser.add_argument("--history", type=int, nargs="+", default=[1000, 5000, 20000],
+                        help="number of existing comments")
+    parser.add_argument("--files", type=int, default=4, help="number of files the comments are spread over")
+    parser.add_argument("--lines", type=int, default=5000, help="number of lines of each file")
+    parser.add_argument("--dimensions", type=int, default=384, help="embedding dimensions, 384 for all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'kept':>6} {'exact (s)':>10} {'exact (MB)':>11} {'ann (s)':>8} {'ann (MB)':>9} {'identical':>9}")
+    for history in args.history:
+        new, existing, encoder = synthetic_comments(args.new, history, args.dimensions, files=args.files,
+                                                    lines=args.lines)
+        expected, exact_seconds, exact_peak = run(EXACT_BACKEND, new, existing, encoder)
+        actual, ann_seconds, ann_peak = run(ANN_BACKEND, new, existing, encoder)
+        print(f"{history:>8} {len(expected):>6} {exact_seconds:>10.3f} {exact_peak:>11.1f} {ann_seconds:>8.3f} "
+              f"{ann_peak:>9.1f} {str(actual == expected):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""
+Compares the torch and ONNX embedding backends on synthetic review comments: load time, encode latency, peak RSS,
+similarity error and dedup decisions. Each backend runs in its own process, so neither pays for the imports and
+memory of the other.
+Usage: python -m tests.benchmarks.embedding_backends ONNX_MODEL_DIR [--model sentence-transformers/all-MiniLM-L6-v2]
+       [--comments 400]
+The model folder is written by python -m utils.onnx_embeddings export, and the torch backend can load it as well.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from utils.comment_dedup import remove_duplicate_comments
+from utils.models import ReviewComment
+from utils.onnx_embeddings import cosine_similarity
+
+# The limits of CommentFilterer
+SIMILARITY_LIMIT = 0.6
+TOTAL_SIMILARITY_LIMIT = 0.9
+TEMPLATES = [
+    "The {resource} `{name}` has no tags, add the owner and cost-center tags.",
+    "Tags are missing on `{name}`, every {resource} needs the owner tag.",
+    "`{attribute}` of `{name}` is hard-coded, move it to a variable.",
+    "Enable encryption at rest on the {resource} `{name}`.",
+    "The {resource} `{name}` is not encrypted, set a KMS key.",
+    "The security group of `{name}` allows 0.0.0.0/0 on port {port}, restrict the ingress CIDR.",
+    "Set prevent_destroy in a lifecycle block of the {resource} `{name}`, it holds state.",
+    "`{attribute}` is deprecated in the latest provider, `{name}` should use its replacement.",
+    "Pin the provider version used by `{name}`, the module accepts any version.",
+    "The {resource} `{name}` is created without logging, enable access logs.",
+]
+RESOURCES = ["S3 bucket", "RDS instance", "EKS cluster", "EC2 instance", "Lambda function", "SQS queue"]
+NAMES = ["logs", "artifacts", "orders", "web", "workers", "payments", "analytics", "backups"]
+ATTRIBUTES = ["instance_type", "engine_version", "cidr_block", "retention_in_days", "ami", "memory_size"]
+PORTS = [22, 80, 443, 3306, 5432, 6379]
+
+
+def synthetic_texts(count: int, seed: int = 0) -> list[str]:
+    """Review comments from a few templates, so many are paraphrases or near copies of each other"""
+    rng = np.random.default_rng(seed)
+    return [
+        TEMPLATES[rng.integers(len(TEMPLATES))].format(
+            resource=RESOURCES[rng.integers(len(RESOURCES))], name=NAMES[rng.integers(len(NAMES))],
+            attribute=ATTRIBUTES[rng.integers(len(ATTRIBUTES))], port=PORTS[rng.integers(len(PORTS))])
+        for _ in range(count)
+    ]
+
+
+def synthetic_comments(texts: list[str], seed: int = 0) -> tuple[list[ReviewComment], list[ReviewComment]]:
+    """The first half of the texts are the existing comments, the second half the new ones"""
+    rng = np.random.default_rng(seed)
+    comments = [ReviewComment(filename=f"modules/m{rng.integers(10)}/main.tf", line_number=int(rng.integers(1, 200)),
+                              comment=text, status="added") for text in texts]
+    return comments[:len(comments) // 2], comments[len(comments) // 2:]
+
+
+def worker(backend: str, model: str, model_dir: str, count: int, output: str) -> None:
+    """Loads one backend, encodes the texts and writes the embeddings to output, prints its measures as JSON"""
+    texts = synthetic_texts(count)
+    start = time.perf_counter()
+    from utils.embeddings import EmbeddingService
+    from utils.onnx_embeddings import OnnxEmbeddingModel
+
+    if backend == "onnx":
+        service = EmbeddingService(f"onnx:{model_dir}", load=lambda: OnnxEmbeddingModel(model_dir))
+    else:
+        service = EmbeddingService(model_dir or model)
+    service.start()
+    load_seconds = time.perf_counter() - start
+
+    # Review sized batches, the latency the comment filterer sees
+    latencies = []
+    for batch_start in range(0, len(texts), 20):
+        batch_start_time = time.perf_counter()
+        service.encode(texts[batch_start:batch_start + 20])
+        latencies.append(time.perf_counter() - batch_start_time)
+    np.save(output, service.encode(texts))
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        # ru_maxrss is in KB on Linux
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def run_worker(backend: str, args: argparse.Namespace, output: str) -> dict:
+    command = [sys.executable, "-m", "tests.benchmarks.embedding_backends", "--worker", backend, "--model", args.model,
+               "--comments", str(args.comments), "--output", output, args.model_dir]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def kept_comments(existing: list[ReviewComment], new: list[ReviewComment], embeddings: dict[str, np.ndarray]) -> set[str]:
+    def encode(texts: list[str]) -> np.ndarray:
+        return np.stack([embeddings[text] for text in texts])
+
+    return {c.comment for c in remove_duplicate_comments(existing, new, encode, cosine_similarity, SIMILARITY_LIMIT,
+                                                         TOTAL_SIMILARITY_LIMIT)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model_dir", help="folder of the exported model")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2",
+                        help="model of the torch backend when the folder has no torch weights")
+    parser.add_argument("--comments", type=int, default=400, help="number of synthetic review comments")
+    parser.add_argument("--worker", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        model_dir = args.model_dir if args.worker == "onnx" or os.path.isfile(
+            os.path.join(args.model_dir, "modules.json")) else ""
+        worker(args.worker, args.model, model_dir, args.comments, args.output)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        measures = {backend: run_worker(backend, args, os.path.join(tmp, f"{backend}.npy")) for backend in ("torch", "onnx")}
+        embeddings = {backend: np.load(os.path.join(tmp, f"{backend}.npy")) for backend in measures}
+
+    print(f"{'backend':>8} {'load (s)':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'RSS (MB)':>9}")
+    for backend, measure in measures.items():
+        print(f"{backend:>8} {measure['load_seconds']:>9.2f} {measure['p50_ms']:>9.1f} {measure['p95_ms']:>9.1f} "
+              f"{measure['rss_mb']:>9.0f}")
+
+    texts = synthetic_texts(args.comments)
+    error = np.abs(cosine_similarity(embeddings["onnx"], embeddings["onnx"])
+                   - cosine_similarity(embeddings["torch"], embeddings["torch"]))
+    print(f"\nsimilarity error: max {error.max():.4f}, mean {error.mean():.4f}")
+
+    existing, new = synthetic_comments(texts)
+    kept = {backend: kept_comments(existing, new, dict(zip(texts, embeddings[backend]))) for backend in embeddings}
+    agreeing = sum((c.comment in kept["torch"]) == (c.comment in kept["onnx"]) for c in new)
+    print(f"dedup decisions: {agreeing}/{len(new)} agree, torch keeps {len(kept['torch'])}, onnx keeps {len(kept['onnx'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# The caches of the process are created when their modules are imported, before any fixture runs,
+# so they are pointed at a folder of the test session rather than the working directory
+_SESSION_TMP_DIR = tempfile.mkdtemp(prefix="pr-review-tests-")
+os.environ["TMP_DIR"] = _SESSION_TMP_DIR
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(_SESSION_TMP_DIR, "embedding_cache.sqlite3")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_SESSION_TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def tmp_dir(tmp_path, monkeypatch):
+    """The caches created by a test are written to its tmp_path"""
+    monkeypatch.setenv("TMP_DIR", str(tmp_path))
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "embedding_cache.sqlite3"))
+    return tmp_path
@@ -14,6 +14,7 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import base64
 import os
 from unittest.mock import MagicMock, patch
 from graphs.nodes.contexts import DefaultContext
@@ -25,7 +26,6 @@ from utils.constants import AZURE_OPENAI_API_KEY_ENV
 from utils.github_operations import GitHubOperations
 from utils.modelfactory import models
 import pytest
-from unittest.mock import MagicMock
 from graphs.chains.title_description_review import create_title_description_reviewer_chain
 import warnings
 
@@ -94,3 +94,188 @@ def test_cross_reference_reflector_call(mock_reflector_context):
     })
     response = cf.context.chain.invoke()
     assert "cross_reference_reflector_output" in response
+
+
+def test_cross_reference_initializer_fetches_only_missing_blobs(tmp_path):
+    from graphs.nodes.cross_reference_reflection import CrossReferenceInitializer
+    from utils.blob_cache import BlobCache, git_blob_sha
+
+    shared, changed = b'variable "region" {}\n', b'resource "null_resource" "a" {}\n'
+    contents = {git_blob_sha(c): c for c in (shared, changed)}
+
+    def element(path, content):
+        return MagicMock(type="blob", path=path, sha=git_blob_sha(content))
+
+    trees = {
+        "head_tree": [element("variables.tf", shared), element("main.tf", changed), element("README.md", b"")],
+        "base_tree": [element("variables.tf", shared)],
+    }
+
+    github = MagicMock(spec=GitHubOperations)
+    github.get_commit.side_effect = lambda sha: MagicMock(**{"commit.tree.sha": f"{sha}_tree"})
+    github.get_git_tree.side_effect = lambda sha, recursive: MagicMock(tree=trees[sha])
+    github.get_git_blob.side_effect = lambda sha: MagicMock(content=base64.b64encode(contents[sha]).decode())
+
+    cache = BlobCache(str(tmp_path))
+    cache.put(git_blob_sha(shared), shared)
+
+    context = DefaultContext()
+    context.github = github
+    initializer = CrossReferenceInitializer(context)
+    with patch("graphs.nodes.cross_reference_reflection.blob_cache", cache):
+        head_files = initializer._get_files_from_sha(github, "head")
+        base_files = initializer._get_files_from_sha(github, "base")
+
+    assert [(f.path, f.content) for f in head_files] == [("variables.tf", shared.decode()), ("main.tf", changed.decode())]
+    assert [f.path for f in base_files] == ["variables.tf"]
+    github.get_git_blob.assert_called_once_with(git_blob_sha(changed))
+
+
+def test_cross_reference_initializer_index_mode(tmp_path):
+    from graphs.nodes.cross_reference_reflection import CrossReferenceCommenter, CrossReferenceInitializer, File
+    from utils.analysis_cache import AnalysisCache
+
+    base_files = [
+        File("main.tf", 'variable "region" {}\noutput "region" { value = var.region }\n'),
+        File("old.tf", 'output "old" { value = var.region }\n'),
+    ]
+    head_files = {"main.tf": 'variable "region" {}\noutput "region" { value = var.regoin }\n'}
+    github = MagicMock(spec=GitHubOperations)
+    github.pr = MagicMock(**{"head.sha": "head", "base.sha": "base"})
+    github.repo.full_name = "org/repo"
+    github.get_git_diff.return_value = "-var.region\n+var.regoin"
+    github.get_pr_files.return_value = [
+        MagicMock(filename="main.tf", status="modified"),
+        MagicMock(filename="old.tf", status="removed"),
+        MagicMock(filename="README.md", status="added"),
+    ]
+    github.snapshot.return_value.__enter__.return_value.read_file.side_effect = lambda path: head_files[path]
+
+    context = DefaultContext()
+    context.github = github
+    initializer = CrossReferenceInitializer(context)
+    state = create_default_github_pr_state()
+    with (patch("graphs.nodes.cross_reference_reflection.hcl_index_cache", AnalysisCache(str(tmp_path))),
+          patch.object(initializer, "_get_files_from_snapshot", return_value=base_files) as read_base):
+        result = initializer(state)
+
+        assert "- **`var.regoin`**: Used in `main.tf` but not defined" in result["cross_reference_problems"].body
+        assert "- **`var.region`**: Defined in `main.tf` but not used" in result["cross_reference_problems"].body
+        assert "+var.regoin" in result["messages"][0].content
+        # Only the changed files of the head are read
+        github.snapshot.assert_called_once_with("head")
+        assert [c.args for c in github.snapshot.return_value.__enter__.return_value.read_file.call_args_list] == [("main.tf",)]
+
+        # Without problems the summary is posted without asking the generator for explanations
+        github.get_pr_files.return_value = [MagicMock(filename="README.md", status="added")]
+        result = initializer(state)
+
+        # The index of the base is read from the cache
+        read_base.assert_called_once_with(github, "base")
+
+    assert "messages" not in result
+    state.update(result)
+    comments = CrossReferenceCommenter()(state)["new_issue_comments"]
+    assert comments[0].body == "### Summary of Cross-Reference Problems\n\nNo cross-reference issues found."
+
+
+def test_reflection_converged():
+    from graphs.nodes.cross_reference_reflection import reflection_converged
+
+    assert reflection_converged(
+        "### Validation Results\n- Confirmed Issues: [`var.region` is not defined]\n- Incorrect Issues: []\n"
+        "- Additional Concerns: None"
+    )
+    assert reflection_converged(
+        "### Validation Results\n- **Confirmed Issues**: []\n- **Incorrect Issues**: None.\n"
+        "- **Additional Concerns**: No critical concerns."
+    )
+    assert not reflection_converged(
+        "### Validation Results\n- Confirmed Issues: []\n- Incorrect Issues:\n  - `var.region` is defined in variables.tf\n"
+        "- Additional Concerns: []"
+    )
+    assert not reflection_converged(
+        "### Validation Results\n- Confirmed Issues: []\n- Incorrect Issues: []\n"
+        "- Additional Concerns: [`module.vpc` misses the required input `cidr`]"
+    )
+    assert not reflection_converged("The analysis looks fine.")
+
+
+def test_cross_reference_issues():
+    from graphs.nodes.cross_reference_reflection import cross_reference_issues
+
+    answer = "### Summary of Cross-Reference Problems\n\n- **`var.a`**: Used in `main.tf` but not defined: x\n"
+    assert cross_reference_issues(answer) == cross_reference_issues(answer.replace(": x", ":   x") + "\n")
+    assert cross_reference_issues(answer) != cross_reference_issues(answer.replace("var.a", "var.b"))
+    assert cross_reference_issues("### Summary of Cross-Reference Problems\n\nNo cross-reference issues found.") == frozenset()
+
+
+def test_cross_reference_commenter_posts_the_last_generator_answer():
+    from langchain_core.messages import AIMessage, HumanMessage
+    from graphs.nodes.cross_reference_reflection import CrossReferenceCommenter
+
+    state = create_default_github_pr_state()
+    state["messages"] = [HumanMessage("prompt"), AIMessage("first answer"), HumanMessage("### Validation Results"),
+                         AIMessage("second answer"), HumanMessage("### Validation Results")]
+
+    comments = CrossReferenceCommenter()(state)["new_issue_comments"]
+
+    assert [comment.body for comment in comments] == ["second answer"]
+
+
+def test_cross_reference_chains_send_the_conversation():
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+    from langchain_core.runnables import RunnableLambda
+
+    sent = []
+    model = MagicMock()
+    model.with_structured_output.return_value = RunnableLambda(lambda prompt: sent.append(prompt.to_messages()))
+    conversation = [HumanMessage('variable "a" { default = "${var.b}" }'), AIMessage("answer"), HumanMessage("validation")]
+
+    create_cross_reference_generator_chain(model)(conversation).invoke({})
+    create_cross_reference_reflector_chain(model)(conversation[:2]).invoke({})
+
+    assert isinstance(sent[0][0], SystemMessage)
+    assert sent[0][1:] == conversation
+    assert sent[1][1:] == conversation[:2]
+    assert sent[0][0] != sent[1][0]
+
+
+def test_cross_reference_generator_and_reflector_token_usage():
+    from langchain_core.messages import AIMessage, HumanMessage
+    from graphs.nodes.cross_reference_reflection import token_usage_report
+
+    def raw(input_tokens, cached, output_tokens):
+        return AIMessage("", usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens,
+                                             "total_tokens": input_tokens + output_tokens,
+                                             "input_token_details": {"cache_read": cached}})
+
+    generator_context = DefaultContext(chain=MagicMock())
+    generator_context.chain.return_value.invoke.return_value = {
+        "raw": raw(1000, 0, 50), "parsing_error": None,
+        "parsed": crossReferenceGeneratorOutput(cross_reference_generator_output="answer"),
+    }
+    reflector_context = DefaultContext(chain=MagicMock())
+    reflector_context.chain.return_value.invoke.return_value = {
+        "raw": raw(1060, 1024, 20), "parsing_error": None,
+        "parsed": crossReferenceReflectorOutput(cross_reference_reflector_output="validation"),
+    }
+
+    state = create_default_github_pr_state()
+    state["messages"] = [HumanMessage("prompt")]
+    generated = CrossReferenceGenerator(generator_context)(state)
+    state["messages"] = state["messages"] + generated["messages"]
+    reflected = CrossReferenceReflector(reflector_context)(state)
+
+    assert generated["messages"] == [AIMessage("answer")]
+    assert reflected["messages"] == [HumanMessage("validation")]
+    # The reflector sees the generator's answer as the user's turn
+    assert [msg.type for msg in reflector_context.chain.call_args.args[0]] == ["human", "human"]
+    usages = generated["cross_reference_token_usage"] + reflected["cross_reference_token_usage"]
+    assert usages == [
+        {"node": "cross_reference_generator", "iteration": 1, "messages": 1, "input_tokens": 1000,
+         "cached_input_tokens": 0, "output_tokens": 50},
+        {"node": "cross_reference_reflector", "iteration": 1, "messages": 2, "input_tokens": 1060,
+         "cached_input_tokens": 1024, "output_tokens": 20},
+    ]
+    assert token_usage_report(usages).splitlines()[-1].split() == ["total", "3", "2060", "1024", "70"]
@@ -15,7 +15,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import os
-from subprocess import CompletedProcess
+from subprocess import CalledProcessError, CompletedProcess
 from typing import Optional
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableSerializable
@@ -30,9 +30,11 @@ from graphs.nodes.static_analyzer import StaticAnalyzer
 
 from graphs.states import GitHubPRState, create_default_github_pr_state
 from tests.nodes.utils import vector_based_similarity
-from utils.constants import AZURE_OPENAI_API_KEY_ENV
+from utils.constants import AZURE_OPENAI_API_KEY_ENV, STATIC_ANALYZER_OUTPUT_MODE_ENV
 from utils.github_operations import GitHubOperations
 from utils.modelfactory import models
+from utils.analysis_cache import AnalysisCache
+from utils.workspace_pool import WorkspacePool
 
 _mock_output_folder = "./repo_copy/test-repo"
 
@@ -130,6 +132,7 @@ def test_static_analyzer_call_chain_error(mock_context, mock_state):
         cf(mock_state)
 
 
+@patch.dict(os.environ, {STATIC_ANALYZER_OUTPUT_MODE_ENV: "llm"})
 @patch("graphs.nodes.static_analyzer.shutil.rmtree")
 @patch("graphs.nodes.static_analyzer.run")
 def test_static_analyzer_call(mock_run, mock_rmtree, mock_context, mock_state):
@@ -140,9 +143,168 @@ def test_static_analyzer_call(mock_run, mock_rmtree, mock_context, mock_state):
     cf = StaticAnalyzer(mock_context)
     resp = cf(mock_state)
 
-    mock_run.assert_any_call(_tf_validate_args, cwd=_mock_output_folder, stdout=-1, stderr=-1, text=True)
-    mock_run.assert_any_call(_tflint_args, cwd=_mock_output_folder, stdout=-1, stderr=-1, text=True)
+    mock_run.assert_any_call(_tf_validate_args, cwd=_mock_output_folder, stdout=-1, stderr=-1, text=True, timeout=None)
+    mock_run.assert_any_call(_tflint_args, cwd=_mock_output_folder, stdout=-1, stderr=-1, text=True, timeout=None)
     mock_rmtree.assert_called_with(_mock_output_folder)
 
     summary = resp["static_analyzer_output"]
     assert vector_based_similarity(summary, _expected_summary) > 0.90
+
+
+@patch("graphs.nodes.static_analyzer.shutil.rmtree")
+@patch("graphs.nodes.static_analyzer.run")
+def test_static_analyzer_call_cleans_up_on_error(mock_run, mock_rmtree, mock_context, mock_state, tmp_path):
+    mock_run.side_effect = CalledProcessError(1, _tfinit_args, stderr="init failed")
+    mock_context.chain = MockChain()
+
+    with patch("graphs.nodes.static_analyzer.workspace_pool", WorkspacePool(str(tmp_path))):
+        resp = StaticAnalyzer(mock_context)(mock_state)
+
+    assert resp == {}
+    mock_context.github.clone_repo.assert_called_once()
+    assert mock_context.github.clone_repo.call_args.args[0].startswith(str(tmp_path))
+    mock_rmtree.assert_called_with(_mock_output_folder)
+
+
+class CapturingChain(RunnableSerializable):
+    inputs: list = []
+
+    def invoke(self, input, config=None):
+        self.inputs.append(input)
+        return AIMessage(content=_expected_summary)
+
+
+def _clone_modules(workspace, **kwargs):
+    repo = os.path.join(workspace, "sha")
+    for module in ("envs/dev", "envs/prod", "modules/unused"):
+        os.makedirs(os.path.join(repo, module))
+        with open(os.path.join(repo, module, "main.tf"), "w") as f:
+            f.write(f"# {module}")
+    return repo
+
+
+def _run_modules(args, cwd, **kwargs):
+    if args[:2] == ["tflint", "--format=compact"]:
+        return CompletedProcess(args=args, returncode=2, stdout=f"main.tf:1:1: Warning - {os.path.basename(cwd)}", stderr="")
+    return CompletedProcess(args=args, returncode=0, stdout="", stderr="")
+
+
+@patch.dict(os.environ, {STATIC_ANALYZER_OUTPUT_MODE_ENV: "llm"})
+@patch("graphs.nodes.static_analyzer.run")
+def test_static_analyzer_call_per_root_module(mock_run, mock_context, mock_state, tmp_path):
+    mock_run.side_effect = _run_modules
+    mock_context.github.clone_repo.side_effect = _clone_modules
+    mock_context.github.get_pr_files.return_value = [MagicMock(filename="envs/dev/main.tf"), MagicMock(filename="envs/prod/main.tf")]
+    mock_context.chain = CapturingChain()
+
+    with patch("graphs.nodes.static_analyzer.workspace_pool", WorkspacePool(str(tmp_path / "workspaces"))), \
+            patch("graphs.nodes.static_analyzer.analysis_cache", AnalysisCache(str(tmp_path / "cache"))):
+        StaticAnalyzer(mock_context)(mock_state)
+
+    cwds = {call.kwargs["cwd"] for call in mock_run.call_args_list}
+    assert {os.path.relpath(cwd, str(tmp_path / "workspaces")) for cwd in cwds} == {"workspace-0/sha/envs/dev", "workspace-0/sha/envs/prod"}
+    assert mock_run.call_count == 6
+
+    linter_outputs = mock_context.chain.inputs[-1]["linter_outputs"]
+    assert "envs/dev/main.tf:1:1: Warning - dev" in linter_outputs
+    assert "envs/prod/main.tf:1:1: Warning - prod" in linter_outputs
+
+
+@patch.dict(os.environ, {STATIC_ANALYZER_OUTPUT_MODE_ENV: "llm"})
+@patch("graphs.nodes.static_analyzer.run")
+def test_static_analyzer_call_reuses_cached_results(mock_run, mock_context, mock_state, tmp_path):
+    mock_run.side_effect = _run_modules
+    mock_context.github.clone_repo.side_effect = _clone_modules
+    mock_context.github.get_pr_files.return_value = [MagicMock(filename="envs/dev/main.tf")]
+    mock_context.chain = CapturingChain()
+
+    with patch("graphs.nodes.static_analyzer.workspace_pool", WorkspacePool(str(tmp_path / "workspaces"))), \
+            patch("graphs.nodes.static_analyzer.analysis_cache", AnalysisCache(str(tmp_path / "cache"))):
+        StaticAnalyzer(mock_context)(mock_state)
+        StaticAnalyzer(mock_context)(mock_state)
+
+    # The second review of the same content doesn't run anything
+    assert mock_run.call_count == 3
+    assert mock_context.chain.inputs[-1] == mock_context.chain.inputs[-2]
+
+
+@patch.dict(os.environ, {STATIC_ANALYZER_OUTPUT_MODE_ENV: "llm"})
+@patch("graphs.nodes.static_analyzer.run")
+def test_static_analyzer_call_reruns_after_a_tool_upgrade(mock_run, mock_context, mock_state, tmp_path):
+    mock_run.side_effect = _run_modules
+    mock_context.github.clone_repo.side_effect = _clone_modules
+    mock_context.github.get_pr_files.return_value = [MagicMock(filename="envs/dev/main.tf")]
+    mock_context.chain = CapturingChain()
+
+    with patch("graphs.nodes.static_analyzer.workspace_pool", WorkspacePool(str(tmp_path / "workspaces"))), \
+            patch("graphs.nodes.static_analyzer.analysis_cache", AnalysisCache(str(tmp_path / "cache"))):
+        with patch("graphs.nodes.static_analyzer.tool_version", lambda args: f"{args[0]} 1.0"):
+            StaticAnalyzer(mock_context)(mock_state)
+        with patch("graphs.nodes.static_analyzer.tool_version", lambda args: f"{args[0]} 1.1"):
+            StaticAnalyzer(mock_context)(mock_state)
+
+    assert mock_run.call_count == 6
+
+
+_validate_json = """{"format_version": "1.0", "valid": false, "error_count": 1, "warning_count": 0, "diagnostics": [
+    {"severity": "error", "summary": "Reference to undeclared resource",
+     "detail": "A managed resource \\"aws_security_group\\" \\"main_sg\\" has not been declared in the root module.",
+     "range": {"filename": "main.tf", "start": {"line": 12, "column": 5}, "end": {"line": 12, "column": 30}},
+     "snippet": {"context": "resource \\"aws_instance\\" \\"web_server\\""}}]}"""
+
+_tflint_json = """{"issues": [
+    {"rule": {"name": "aws_instance_invalid_type", "severity": "error"}, "message": "\\"t1.2xlarge\\" is an invalid value as instance_type",
+     "range": {"filename": "main.tf", "start": {"line": 20, "column": 3}}},
+    {"rule": {"name": "terraform_unused_declarations", "severity": "warning"}, "message": "variable \\"vpc_cidr\\" is declared but not used",
+     "range": {"filename": "variables.tf", "start": {"line": 7, "column": 1}}}], "errors": []}"""
+
+
+def _run_structured(args, cwd, **kwargs):
+    if args == ["terraform", "validate", "-json"]:
+        return CompletedProcess(args=args, returncode=1, stdout=_validate_json, stderr="")
+    if args[:2] == ["tflint", "--format=json"]:
+        return CompletedProcess(args=args, returncode=2, stdout=_tflint_json, stderr="")
+    return CompletedProcess(args=args, returncode=0, stdout="", stderr="")
+
+
+@patch.dict(os.environ, {STATIC_ANALYZER_OUTPUT_MODE_ENV: "structured"})
+@patch("graphs.nodes.static_analyzer.run")
+def test_static_analyzer_call_structured_skips_the_llm(mock_run, mock_context, mock_state, tmp_path):
+    mock_run.side_effect = _run_structured
+    mock_context.github.clone_repo.side_effect = _clone_modules
+    mock_context.github.get_pr_files.return_value = [MagicMock(filename="envs/dev/main.tf")]
+    mock_context.chain = CapturingChain()
+
+    with patch("graphs.nodes.static_analyzer.workspace_pool", WorkspacePool(str(tmp_path / "workspaces"))), \
+            patch("graphs.nodes.static_analyzer.analysis_cache", AnalysisCache(str(tmp_path / "cache"))):
+        resp = StaticAnalyzer(mock_context)(mock_state)
+
+    assert mock_context.chain.inputs == []
+    issues = resp["static_analyzer_output"].issues
+    assert [(issue.file_name, issue.line_number, issue.rule) for issue in issues] == [
+        ("envs/dev/main.tf", 12, None),
+        ("envs/dev/main.tf", 20, "aws_instance_invalid_type"),
+    ]
+    assert issues[0].full_issue_description.startswith("Reference to undeclared resource: A managed resource")
+    assert sorted((run["tool"], run["directory"], run["returncode"]) for run in resp["tool_runs"]) == [
+        ("terraform init", "envs/dev", 0),
+        ("terraform validate", "envs/dev", 1),
+        ("tflint", "envs/dev", 2),
+    ]
+
+
+@patch.dict(os.environ, {STATIC_ANALYZER_OUTPUT_MODE_ENV: "structured"})
+@patch("graphs.nodes.static_analyzer.run")
+def test_static_analyzer_call_structured_falls_back_to_the_llm(mock_run, mock_context, mock_state, tmp_path):
+    mock_run.side_effect = lambda args, cwd, **kwargs: CompletedProcess(
+        args=args, returncode=1 if args[:2] == ["terraform", "init"] else 0, stdout="", stderr="Error: Failed to query available provider packages")
+    mock_context.github.clone_repo.side_effect = _clone_modules
+    mock_context.github.get_pr_files.return_value = [MagicMock(filename="envs/dev/main.tf")]
+    mock_context.chain = CapturingChain()
+
+    with patch("graphs.nodes.static_analyzer.workspace_pool", WorkspacePool(str(tmp_path / "workspaces"))), \
+            patch("graphs.nodes.static_analyzer.analysis_cache", AnalysisCache(str(tmp_path / "cache"))):
+        StaticAnalyzer(mock_context)(mock_state)
+
+    assert len(mock_context.chain.inputs) == 1
+    assert "Failed to query available provider packages" in mock_context.chain.inputs[0]["linter_outputs"]
@@ -0,0 +1,45 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+from utils.analysis_cache import AnalysisCache
+
+
+def test_analysis_cache_round_trip(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+
+    assert cache.get("a" * 64) is None
+    cache.put("a" * 64, {"directory": "envs/prod", "init": {"returncode": 0}})
+
+    assert cache.get("a" * 64) == {"directory": "envs/prod", "init": {"returncode": 0}}
+
+
+def test_analysis_cache_evicts_least_recently_used(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_entries=2)
+    cache.put("a" * 64, {"n": 1})
+    cache.put("b" * 64, {"n": 2})
+    cache.get("a" * 64)
+    cache.put("c" * 64, {"n": 3})
+
+    assert cache.get("b" * 64) is None
+    assert cache.get("a" * 64) == {"n": 1}
+    assert len(cache) == 2
+
+
+def test_analysis_cache_survives_restart(tmp_path):
+    AnalysisCache(str(tmp_path)).put("a" * 64, {"n": 1})
+
+    assert AnalysisCache(str(tmp_path)).get("a" * 64) == {"n": 1}
@@ -0,0 +1,79 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+
+import pytest
+
+from utils.blob_cache import BlobCache, git_blob_sha
+
+
+def _blob(text: str) -> tuple[str, bytes]:
+    content = text.encode("utf-8")
+    return git_blob_sha(content), content
+
+
+def test_git_blob_sha_matches_git():
+    # echo "hello" | git hash-object --stdin
+    assert git_blob_sha(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+
+
+def test_blob_cache_round_trip(tmp_path):
+    cache = BlobCache(str(tmp_path))
+    sha, content = _blob('resource "null_resource" "a" {}\n')
+
+    assert cache.get(sha) is None
+    cache.put(sha, content)
+
+    assert cache.get(sha) == content
+    assert sha in cache
+
+
+def test_blob_cache_rejects_mismatched_content(tmp_path):
+    cache = BlobCache(str(tmp_path))
+    sha, _ = _blob("a")
+
+    with pytest.raises(ValueError):
+        cache.put(sha, b"b")
+    assert len(cache) == 0
+
+
+def test_blob_cache_evicts_least_recently_used(tmp_path):
+    first, second, third = _blob("a" * 10), _blob("b" * 10), _blob("c" * 10)
+    cache = BlobCache(str(tmp_path), max_bytes=20)
+
+    cache.put(*first)
+    cache.put(*second)
+    # Touch the first blob, so the second one becomes the least recently used
+    cache.get(first[0])
+    cache.put(*third)
+
+    assert first[0] in cache
+    assert second[0] not in cache
+    assert third[0] in cache
+    assert cache.total_bytes == 20
+    assert not os.path.exists(tmp_path / second[0][:2] / second[0])
+
+
+def test_blob_cache_survives_restart(tmp_path):
+    sha, content = _blob("variable \"region\" {}\n")
+    BlobCache(str(tmp_path)).put(sha, content)
+
+    reopened = BlobCache(str(tmp_path))
+
+    assert reopened.get(sha) == content
+    assert reopened.total_bytes == len(content)
@@ -0,0 +1,124 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import numpy as np
+import pytest
+from sentence_transformers.util import cos_sim
+
+from tests.benchmarks.comment_dedup import legacy_remove_duplicate_comments, synthetic_comments
+from utils.comment_dedup import LshIndex, first_unique, remove_duplicate_comments, similar_mask
+from utils.metrics import metrics
+from utils.models import ReviewComment
+
+
+def _comment(filename: str, line_number: int, text: str = "") -> ReviewComment:
+    return ReviewComment(filename=filename, line_number=line_number, comment=text, status="added")
+
+
+def test_similar_mask():
+    comments1 = [_comment("a.tf", 10), _comment("b.tf", 10)]
+    comments2 = [_comment("a.tf", 14), _comment("a.tf", 15), _comment("b.tf", 100)]
+    similarity = np.array([[0.7, 0.7, 0.95], [0.95, 0.6, 0.95]], dtype=np.float32)
+
+    assert similar_mask(similarity, comments1, comments2, 0.6, 0.9).tolist() == [
+        # close and similar, similar but 5 lines apart, equal but in another file
+        [True, False, False],
+        [False, False, True],
+    ]
+
+
+def test_first_unique():
+    duplicates = np.array([
+        [True, False, False, True, False],
+        [False, True, False, False, True],
+        [False, False, True, False, False],
+        # 3 is excluded by 0, so it doesn't exclude 4 on its own
+        [False, False, False, True, True],
+        [False, False, False, False, True],
+    ])
+
+    assert first_unique(duplicates) == [0, 1, 2]
+    assert first_unique(duplicates[np.ix_([0, 2, 3, 4], [0, 2, 3, 4])]) == [0, 1, 3]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("count,existing_count", [(1, 0), (40, 0), (40, 40), (150, 60)])
+def test_same_output_as_the_per_pair_loops(seed, count, existing_count):
+    new, existing, encoder = synthetic_comments(count, existing_count, dimensions=32, seed=seed)
+
+    expected = legacy_remove_duplicate_comments(existing, new, encoder, cos_sim)
+    encoded = encoder.encoded
+    actual = remove_duplicate_comments(existing, new, encoder, cos_sim, 0.6, 0.9)
+
+    assert actual == expected
+    # Every message is encoded once
+    assert encoder.encoded - encoded == count + existing_count
+
+
+def test_no_new_comments():
+    assert remove_duplicate_comments([_comment("a.tf", 1)], [], lambda texts: np.zeros((len(texts), 2)), cos_sim, 0.6, 0.9) == []
+
+
+def test_lsh_index_finds_near_duplicates():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 32)).astype(np.float32)
+    near = vectors[:20] + rng.normal(scale=0.05, size=(20, 32)).astype(np.float32)
+    index = LshIndex(vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+
+    starts, ends = index.buckets(index.hash(near / np.linalg.norm(near, axis=1, keepdims=True)))
+
+    for i in range(len(near)):
+        members = index.members(starts[i], ends[i])
+        assert i in members
+        # Unrelated vectors rarely share a bucket
+        assert len(np.unique(members)) < 50
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("count,existing_count,files", [(40, 0, 1), (150, 60, 2), (300, 600, 3)])
+def test_ann_backend_same_output_as_the_per_pair_loops(seed, count, existing_count, files):
+    new, existing, encoder = synthetic_comments(count, existing_count, dimensions=32, seed=seed, files=files, lines=300)
+
+    expected = legacy_remove_duplicate_comments(existing, new, encoder, cos_sim)
+    encoded = encoder.encoded
+    actual = remove_duplicate_comments(existing, new, encoder, cos_sim, 0.6, 0.9, backend="ann")
+
+    assert actual == expected
+    assert encoder.encoded - encoded == count + existing_count
+
+
+def test_auto_backend_switches_by_size():
+    new, existing, encoder = synthetic_comments(60, 40, dimensions=32, files=3)
+    expected = remove_duplicate_comments(existing, new, encoder, cos_sim, 0.6, 0.9, backend="exact")
+    before = metrics.snapshot()["counters"]
+
+    assert remove_duplicate_comments(existing, new, encoder, cos_sim, 0.6, 0.9, exact_max_pairs=60 * 100) == expected
+    # Too many pairs for one matrix, but every file fits in one
+    assert remove_duplicate_comments(existing, new, encoder, cos_sim, 0.6, 0.9, exact_max_pairs=60 * 100 - 1) == expected
+    # Too many pairs for any matrix
+    assert remove_duplicate_comments(existing, new, encoder, cos_sim, 0.6, 0.9, exact_max_pairs=0) == expected
+
+    after = metrics.snapshot()["counters"]
+    assert after.get("comment_dedup.exact", 0) - before.get("comment_dedup.exact", 0) == 1
+    assert after.get("comment_dedup.exact_buckets", 0) - before.get("comment_dedup.exact_buckets", 0) == 3
+    assert after.get("comment_dedup.ann_buckets", 0) - before.get("comment_dedup.ann_buckets", 0) == 3
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        remove_duplicate_comments([], [_comment("a.tf", 1)], lambda texts: np.zeros((len(texts), 2)), cos_sim, 0.6, 0.9,
+                                  backend="faiss")
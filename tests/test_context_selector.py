@@ -0,0 +1,105 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+from utils.context_selector import (TRUNCATED_NOTE, _seeds, estimate_tokens, rank_context_files, select_context_files,
+                                    summarize_file)
+from utils.hcl_index import index_file
+from utils.models import ContextFile
+
+FILES = [
+    ContextFile(path="app/main.tf", content='resource "aws_s3_bucket" "logs" {\n  bucket = var.bucket_name\n}\n'),
+    ContextFile(path="app/variables.tf", content='variable "bucket_name" {}\nvariable "region" {\n  default = "x"\n}\n'),
+    ContextFile(path="app/policy.tf", content='resource "aws_s3_bucket_policy" "logs" {\n  bucket = aws_s3_bucket.logs.id\n'
+                                              '  policy = local.policy\n'
+                                              + "".join(f'  # statement {i} of the bucket policy\n' for i in range(20))
+                                              + '}\n'),
+    ContextFile(path="app/locals.tf", content='locals {\n  policy = "{}"\n}\n'),
+    ContextFile(path="app/unrelated.tf", content='resource "aws_sqs_queue" "q" {\n  name = "q"\n}\n'),
+]
+
+CHANGES = [{"filename": "app/main.tf", "start_line": 2, "changed_code": "+  bucket = var.bucket_name", "status": "added"}]
+
+
+def test_rank_context_files_by_reference_distance():
+    ranked = [(file.path, distance) for file, distance in rank_context_files(FILES, CHANGES)]
+
+    assert ranked == [
+        ("app/main.tf", 0),
+        # declares var.bucket_name, referenced by the changed line
+        ("app/variables.tf", 1),
+        # references aws_s3_bucket.logs, the changed block
+        ("app/policy.tf", 1),
+        # declares local.policy, referenced by policy.tf
+        ("app/locals.tf", 2),
+        ("app/unrelated.tf", None),
+    ]
+
+
+def test_rank_follows_local_module_calls():
+    files = [
+        ContextFile(path="main.tf", content='module "net" {\n  source = "./modules/net"\n  cidr = var.cidr\n}\n'),
+        ContextFile(path="modules/net/variables.tf", content='variable "cidr" {}\n'),
+        ContextFile(path="other/main.tf", content='variable "cidr" {}\n'),
+    ]
+    changes = [{"filename": "main.tf", "start_line": 3, "changed_code": "+  cidr = var.cidr", "status": "added"}]
+
+    ranked = [(file.path, distance) for file, distance in rank_context_files(files, changes)]
+
+    # var.cidr of other/ is another module's variable
+    assert ranked == [("main.tf", 0), ("modules/net/variables.tf", 1), ("other/main.tf", None)]
+
+
+def test_removed_hunks_are_not_located_in_the_head_file():
+    content = 'resource "aws_s3_bucket" "logs" {\n  bucket = "logs"\n}\n\nresource "aws_sqs_queue" "q" {\n  name = "q"\n}\n'
+    indexes = {"app/main.tf": index_file("app/main.tf", content)}
+    added = {"filename": "app/main.tf", "start_line": 6, "changed_code": '+  name = "q"', "status": "added"}
+    # Line 6 of the base file, which had more blocks before the queue
+    removed = {"filename": "app/main.tf", "start_line": 6, "changed_code": '-  acl = "private"', "status": "removed"}
+
+    assert _seeds(indexes, [added]) == {("app", "aws_sqs_queue.q")}
+    assert _seeds(indexes, [removed]) == set()
+
+
+def test_select_context_files_within_budget():
+    everything = select_context_files(FILES, CHANGES, token_budget=10_000)
+    assert everything.files == [file for file, _ in rank_context_files(FILES, CHANGES)]
+    assert (everything.full, everything.summarized, everything.dropped) == (5, 0, 0)
+
+    # Room for the two closest files and the signatures of the third one
+    budget = sum(estimate_tokens(str(file)) for file in FILES[:2]) + estimate_tokens(str(summarize_file(FILES[2])))
+    selection = select_context_files(FILES, CHANGES, token_budget=budget)
+
+    assert selection.tokens <= budget
+    assert selection.files == [FILES[0], FILES[1], summarize_file(FILES[2])]
+    assert (selection.full, selection.summarized, selection.dropped) == (2, 1, 2)
+
+
+def test_summarize_file():
+    file = ContextFile(path="main.tf", content=(
+        'variable "name" {}\n'
+        'resource "aws_s3_bucket" "logs" {\n  bucket = var.name\n}\n'
+        'module "net" {\n  source = "./net"\n  cidr = "10.0.0.0/16"\n}\n'
+        'output "arn" {\n  value = aws_s3_bucket.logs.arn\n}\n'
+    ))
+
+    assert summarize_file(file).content.splitlines() == [
+        TRUNCATED_NOTE,
+        '1: variable "name" {}  # required',
+        '2: resource "aws_s3_bucket" "logs" {}',
+        '5: module "net" { source = "./net", inputs = [cidr] }',
+        '9: output "arn" {}',
+    ]
@@ -0,0 +1,89 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+from unittest.mock import patch
+
+import pytest
+
+from jobs import InMemoryDeliveryCache, SQLiteDeliveryCache
+from utils.metrics import metrics
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def create_cache(request, tmp_path):
+    def create(ttl_seconds: float = 60, max_entries: int = 100):
+        if request.param == "memory":
+            return InMemoryDeliveryCache(ttl_seconds, max_entries)
+        return SQLiteDeliveryCache(str(tmp_path / "deliveries.db"), ttl_seconds, max_entries)
+
+    return create
+
+
+def test_delivery_cache_detects_duplicates(create_cache):
+    cache = create_cache()
+    duplicates_before = metrics.counter("webhook.duplicate_deliveries")
+
+    assert not cache.is_duplicate("delivery-1")
+    assert cache.is_duplicate("delivery-1")
+    assert not cache.is_duplicate("delivery-2")
+    assert metrics.counter("webhook.duplicate_deliveries") == duplicates_before + 1
+
+
+def test_delivery_cache_ignores_missing_id(create_cache):
+    cache = create_cache()
+    assert not cache.is_duplicate(None)
+    assert not cache.is_duplicate(None)
+    assert not cache.is_duplicate("")
+
+
+@patch("jobs.delivery_cache.time.time")
+def test_delivery_cache_expires_entries(mock_time, create_cache):
+    cache = create_cache(ttl_seconds=10)
+
+    mock_time.return_value = 1000.0
+    assert not cache.is_duplicate("delivery-1")
+    mock_time.return_value = 1005.0
+    assert cache.is_duplicate("delivery-1")
+    mock_time.return_value = 1011.0
+    assert not cache.is_duplicate("delivery-1")
+
+
+def test_delivery_cache_is_bounded(create_cache):
+    cache = create_cache(max_entries=2)
+
+    for delivery_id in ["delivery-1", "delivery-2", "delivery-3"]:
+        assert not cache.is_duplicate(delivery_id)
+
+    assert len(cache) == 2
+    # The oldest id was evicted
+    assert not cache.is_duplicate("delivery-1")
+
+
+def test_delivery_cache_discard(create_cache):
+    cache = create_cache()
+    assert not cache.is_duplicate("delivery-1")
+    cache.discard("delivery-1")
+    assert not cache.is_duplicate("delivery-1")
+
+
+def test_sqlite_delivery_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "deliveries.db")
+    cache = SQLiteDeliveryCache(path)
+    assert not cache.is_duplicate("delivery-1")
+    cache.close()
+
+    assert SQLiteDeliveryCache(path).is_duplicate("delivery-1")
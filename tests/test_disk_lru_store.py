@@ -0,0 +1,51 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+
+from utils.disk_lru_store import DiskLruStore
+
+
+def test_disk_lru_store_weighs_bytes(tmp_path):
+    store = DiskLruStore("test_cache", str(tmp_path), capacity=10)
+
+    store.write("aa1", b"12345")
+    store.write("aa1", b"1234")
+    store.write("bb1", b"123456")
+    # Bigger than the whole store, never kept
+    store.write("cc1", b"12345678901")
+
+    assert store.total_weight == 10
+    assert store.read("aa1") == b"1234"
+    assert "cc1" not in store
+
+
+def test_disk_lru_store_picks_up_the_entries_of_a_previous_process(tmp_path):
+    store = DiskLruStore("test_cache", str(tmp_path), capacity=3, suffix=".json", weigh_bytes=False)
+    for key in ("aa1", "bb1", "cc1"):
+        store.write(key, b"{}")
+    # Left behind by a process killed while writing
+    (tmp_path / "aa" / ".tmpabc").write_bytes(b"{")
+    os.utime(tmp_path / "aa" / "aa1.json", (0, 0))
+
+    reopened = DiskLruStore("test_cache", str(tmp_path), capacity=2, suffix=".json", weigh_bytes=False)
+
+    # The oldest modified entry is evicted to fit the smaller capacity
+    assert len(reopened) == 2
+    assert "aa1" not in reopened
+    assert not os.path.exists(tmp_path / "aa" / "aa1.json")
+    assert reopened.read("bb1") == b"{}"
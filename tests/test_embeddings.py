@@ -0,0 +1,167 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from utils.embedding_cache import EmbeddingCache, create_embedding_cache, to_float16
+from utils.embeddings import DEFAULT_EMBEDDING_MODEL, WARM_UP_BATCH, EmbeddingService, create_embedding_service
+from utils.metrics import metrics
+from utils.tmp_dir import tmp_dir
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls: list[list[str]] = []
+        self.active = 0
+        self.overlapped = False
+        self.lock = threading.Lock()
+
+    def encode(self, texts, convert_to_numpy=True):
+        with self.lock:
+            self.active += 1
+            self.overlapped |= self.active > 1
+        self.calls.append(list(texts))
+        embeddings = np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+        with self.lock:
+            self.active -= 1
+        return embeddings
+
+    def similarity(self, a, b):
+        return a @ b.T
+
+
+def _timing_count(name: str) -> int:
+    return metrics.snapshot()["timings"].get(name, {}).get("count", 0)
+
+
+def test_model_is_loaded_and_warmed_up_once():
+    model = FakeModel()
+    loads_before, encodes_before = _timing_count("embeddings.load"), _timing_count("embeddings.encode")
+    encoded_before = metrics.counter("embeddings.encoded_texts")
+    with patch("sentence_transformers.SentenceTransformer", return_value=model) as constructor:
+        service = EmbeddingService("some/model")
+        assert not service.loaded
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda i: service.encode([f"comment {i}"]), range(32)))
+
+    constructor.assert_called_once_with("some/model")
+    assert service.loaded
+    assert model.calls[0] == WARM_UP_BATCH
+    assert len(model.calls) == 33
+    assert not model.overlapped
+    assert all(result.shape == (1, 2) for result in results)
+    assert _timing_count("embeddings.load") == loads_before + 1
+    assert _timing_count("embeddings.encode") == encodes_before + 32
+    assert metrics.counter("embeddings.encoded_texts") == encoded_before + 32
+
+
+def test_start_loads_the_model_up_front():
+    constructor = MagicMock(return_value=FakeModel())
+    with patch("sentence_transformers.SentenceTransformer", constructor):
+        service = EmbeddingService()
+        service.start()
+        service.start()
+        similarity = service.similarity(service.encode(["a", "bb"]), service.encode(["a"]))
+
+    constructor.assert_called_once()
+    assert similarity.tolist() == [[2.0], [3.0]]
+
+
+def test_only_new_texts_are_encoded_with_a_cache(tmp_path):
+    model = FakeModel()
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    with patch("sentence_transformers.SentenceTransformer", return_value=model):
+        service = EmbeddingService("some/model", cache)
+        first = service.encode(["a", "bb", "a"])
+        second = service.encode(["ccc", "bb"])
+
+    # warm-up, then each text once
+    assert model.calls[1:] == [["a", "bb"], ["ccc"]]
+    assert first.tolist() == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert second.tolist() == [[3.0, 1.0], [2.0, 1.0]]
+    assert len(cache) == 3
+
+
+def test_embedding_cache(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(path, max_entries=2)
+    vector = np.array([0.1, -0.2, 0.3], dtype=np.float32)
+
+    cache.put_many("model", {"a": vector, "b": vector * 2})
+    assert cache.get_many("other-model", ["a"]) == {}
+    found = cache.get_many("model", ["a", "missing"])
+    assert list(found) == ["a"]
+    assert found["a"].dtype == np.float32
+    np.testing.assert_array_equal(found["a"], to_float16(vector))
+
+    # "b" is the least recently used one
+    cache.put_many("model", {"c": vector * 3})
+    cache.close()
+
+    reopened = EmbeddingCache(path, max_entries=2)
+    assert set(reopened.get_many("model", ["a", "b", "c"])) == {"a", "c"}
+    assert len(reopened) == 2
+
+
+def test_embedding_cache_is_created_in_the_temporary_folder(monkeypatch, tmp_path):
+    monkeypatch.delenv("EMBEDDING_CACHE_PATH")
+    cache = create_embedding_cache()
+    cache.put_many("model", {"a": np.zeros(2, dtype=np.float32)})
+    cache.close()
+    assert (tmp_path / "embedding_cache.sqlite3").exists()
+
+    # Never the working directory
+    monkeypatch.delenv("TMP_DIR")
+    assert tmp_dir() == tempfile.gettempdir()
+
+
+def test_backend_is_selected_by_configuration(monkeypatch):
+    for name in ("EMBEDDING_BACKEND", "EMBEDDING_MODEL", "EMBEDDING_ONNX_MODEL_DIR", "EMBEDDING_ONNX_MODEL_FILE"):
+        monkeypatch.delenv(name, raising=False)
+    assert create_embedding_service().model_name == DEFAULT_EMBEDDING_MODEL
+
+    monkeypatch.setenv("EMBEDDING_BACKEND", "onnx")
+    with pytest.raises(ValueError):
+        create_embedding_service()
+
+    monkeypatch.setenv("EMBEDDING_ONNX_MODEL_DIR", "/models/minilm")
+    service = create_embedding_service()
+    # Loaded on start, and cached apart from the torch embeddings
+    assert not service.loaded
+    assert service.model_name == "onnx:/models/minilm/model_quantized.onnx"
+
+    monkeypatch.setenv("EMBEDDING_BACKEND", "tensorflow")
+    with pytest.raises(ValueError):
+        create_embedding_service()
+
+
+def test_model_of_another_backend():
+    model = FakeModel()
+    with patch("sentence_transformers.SentenceTransformer") as constructor:
+        service = EmbeddingService("onnx:some/model", load=lambda: model)
+        embeddings = service.encode(["a"])
+
+    constructor.assert_not_called()
+    assert model.calls == [WARM_UP_BATCH, ["a"]]
+    assert embeddings.tolist() == [[1.0, 1.0]]
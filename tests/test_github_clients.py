@@ -0,0 +1,84 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from utils.github_clients import InstallationClientCache
+
+
+def _minter(lifetime: timedelta):
+    minter = MagicMock()
+    minter.side_effect = lambda installation_id: (f"token-{installation_id}-{minter.call_count}", datetime.now(timezone.utc) + lifetime)
+    return minter
+
+
+def test_installation_client_cache_reuses_token_and_client():
+    minter = _minter(timedelta(hours=1))
+    cache = InstallationClientCache(mint_token=minter)
+
+    first = cache.get("42")
+    second = cache.get(42)
+
+    assert minter.call_count == 1
+    assert first is second
+    assert first.token == "token-42-1"
+
+
+def test_installation_client_cache_is_keyed_by_installation():
+    minter = _minter(timedelta(hours=1))
+    cache = InstallationClientCache(mint_token=minter)
+
+    assert cache.get("1").github is not cache.get("2").github
+    assert minter.call_count == 2
+
+
+def test_installation_client_cache_refreshes_ahead_of_expiry():
+    minter = _minter(timedelta(minutes=3))
+    cache = InstallationClientCache(mint_token=minter, refresh_margin=timedelta(minutes=5))
+
+    first = cache.get("42")
+    second = cache.get("42")
+
+    assert minter.call_count == 2
+    assert first.token != second.token
+
+
+def test_installation_client_cache_does_not_hand_out_a_token_shorter_lived_than_a_review():
+    minter = _minter(timedelta(minutes=20))
+    cache = InstallationClientCache(mint_token=minter)
+
+    cache.get("42")
+    cache.get("42")
+
+    assert minter.call_count == 2
+
+
+def test_installation_client_cache_invalidate():
+    minter = _minter(timedelta(hours=1))
+    cache = InstallationClientCache(mint_token=minter)
+
+    cache.get("42")
+    cache.invalidate("42")
+    cache.get("42")
+
+    assert minter.call_count == 2
+
+
+def test_installation_client_cache_accepts_naive_expiry():
+    cache = InstallationClientCache(mint_token=lambda _: ("token", datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)))
+    assert cache.get("42").expires_at.tzinfo is not None
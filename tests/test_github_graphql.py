@@ -0,0 +1,133 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+from unittest.mock import MagicMock
+
+from utils.github_graphql import PULL_REQUEST_QUERY, fetch_pull_request, renamed_files, split_unified_diff
+
+_git_diff = """\
+diff --git a/main.tf b/main.tf
+index 1111111..2222222 100644
+--- a/main.tf
++++ b/main.tf
+@@ -1,2 +1,2 @@
+ resource "aws_vpc" "main" {
+-  cidr_block = "10.0.0.0/16"
++  cidr_block = "10.1.0.0/16"
+diff --git a/old.tf b/old.tf
+deleted file mode 100644
+index 3333333..0000000
+--- a/old.tf
++++ /dev/null
+@@ -1 +0,0 @@
+-variable "unused" {}
+diff --git a/a.tf b/b.tf
+similarity index 100%
+rename from a.tf
+rename to b.tf
+diff --git a/logo.png b/logo.png
+new file mode 100644
+index 0000000..4444444
+Binary files /dev/null and b/logo.png differ
+"""
+
+
+def _page(nodes, has_next=False, cursor=None):
+    return {"pageInfo": {"hasNextPage": has_next, "endCursor": cursor}, "nodes": nodes}
+
+
+def _review_comment(comment_id, line, body="comment"):
+    return {
+        "databaseId": comment_id,
+        "path": "main.tf",
+        "body": body,
+        "originalLine": line,
+        "line": line,
+        "createdAt": "2025-01-01T00:00:00Z",
+        "replyTo": None,
+        "author": {"login": "alfred[bot]", "__typename": "Bot"},
+    }
+
+
+def test_split_unified_diff():
+    patches = split_unified_diff(_git_diff)
+
+    assert list(patches) == ["main.tf", "old.tf", "b.tf", "logo.png"]
+    assert patches["main.tf"] == '@@ -1,2 +1,2 @@\n resource "aws_vpc" "main" {\n-  cidr_block = "10.0.0.0/16"\n+  cidr_block = "10.1.0.0/16"'
+    assert patches["old.tf"] == '@@ -1 +0,0 @@\n-variable "unused" {}'
+    assert patches["b.tf"] is None
+    assert patches["logo.png"] is None
+
+
+def test_renamed_files():
+    assert renamed_files(_git_diff) == {"b.tf": "a.tf"}
+
+
+def test_fetch_pull_request_paginates_and_converts():
+    responses = [
+        # First page of every connection
+        {
+            "data": {
+                "repository": {
+                    "pullRequest": {
+                        "files": _page([{"path": "old.tf", "additions": 0, "deletions": 1, "changeType": "DELETED"}], True, "f1"),
+                        "reviewThreads": _page([{"id": "T1", "diffSide": "LEFT", "comments": _page([_review_comment(7, 3)], True, "c1")}]),
+                        "comments": _page([{"databaseId": 5, "body": "issue", "createdAt": "2025-01-01T00:00:00Z", "author": None}]),
+                    }
+                }
+            }
+        },
+        # Second page of files only
+        {
+            "data": {
+                "repository": {
+                    "pullRequest": {
+                        "files": _page([
+                            {"path": "b.tf", "additions": 0, "deletions": 0, "changeType": "RENAMED"},
+                            {"path": "main.tf", "additions": 1, "deletions": 1, "changeType": "MODIFIED"},
+                        ]),
+                    }
+                }
+            }
+        },
+        # Rest of the thread's comments
+        {"data": {"node": {"comments": _page([_review_comment(3, 1, "older")])}}},
+    ]
+    requester = MagicMock()
+    requester.graphql_query.side_effect = [({}, r) for r in responses]
+
+    snapshot = fetch_pull_request(requester, "org/repo", "https://api.github.com/repos/org/repo", 1, _git_diff)
+
+    assert snapshot.query_count == 3
+    second_call_variables = requester.graphql_query.call_args_list[1].args[1]
+    assert second_call_variables["withFiles"] and not second_call_variables["withThreads"] and not second_call_variables["withComments"]
+    assert second_call_variables["filesCursor"] == "f1"
+    assert requester.graphql_query.call_args_list[0].args[0] == PULL_REQUEST_QUERY
+
+    # Files follow the order of the diff, like the REST listing
+    assert [f.filename for f in snapshot.files] == ["main.tf", "old.tf", "b.tf"]
+    assert [f.status for f in snapshot.files] == ["modified", "removed", "renamed"]
+    assert snapshot.files[0].patch.startswith("@@ -1,2 +1,2 @@")
+    assert [f.previous_filename for f in snapshot.files] == [None, None, "a.tf"]
+
+    assert [c.id for c in snapshot.review_comments] == [3, 7]
+    assert snapshot.review_comments[0].raw_data["original_line"] == 1
+    assert snapshot.review_comments[0].raw_data["side"] == "LEFT"
+    assert snapshot.review_comments[0].user.type == "Bot"
+
+    assert snapshot.issue_comments[0].body == "issue"
+    assert snapshot.issue_comments[0].url == "https://api.github.com/repos/org/repo/issues/comments/5"
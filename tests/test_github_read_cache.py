@@ -0,0 +1,78 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from utils.github_read_cache import GitHubReadCache
+
+
+def test_github_read_cache_memoises_loads():
+    cache = GitHubReadCache()
+    loader = MagicMock(return_value=["main.tf"])
+
+    assert cache.get_or_load(("pr_files",), loader) == ["main.tf"]
+    assert cache.get_or_load(("pr_files",), loader) == ["main.tf"]
+
+    loader.assert_called_once()
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_github_read_cache_does_not_cache_errors():
+    cache = GitHubReadCache()
+    loader = MagicMock(side_effect=[ValueError("rate limited"), "content"])
+
+    with pytest.raises(ValueError):
+        cache.get_or_load(("contents", "main.tf", "sha"), loader)
+
+    assert cache.get_or_load(("contents", "main.tf", "sha"), loader) == "content"
+    assert loader.call_count == 2
+
+
+def test_github_read_cache_invalidate_by_kind():
+    cache = GitHubReadCache()
+    cache.get_or_load(("contents", "a.tf", "sha"), lambda: "a")
+    cache.get_or_load(("contents", "b.tf", "sha"), lambda: "b")
+    cache.get_or_load(("issue_comments",), lambda: [])
+
+    cache.invalidate("contents")
+
+    assert cache.stats()["entries"] == 1
+    assert cache.get_or_load(("contents", "a.tf", "sha"), lambda: "new") == "new"
+
+
+def test_github_read_cache_loads_concurrent_requests_once():
+    cache = GitHubReadCache()
+    calls = 0
+
+    def loader():
+        nonlocal calls
+        calls += 1
+        time.sleep(0.05)
+        return "files"
+
+    threads = [threading.Thread(target=cache.get_or_load, args=(("pr_files",), loader)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == 1
+    assert cache.hits == 4
@@ -0,0 +1,202 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import json
+
+from utils.hcl_index import NO_ISSUES_SUMMARY, HclIndex, format_summary, index_file, new_findings
+
+MAIN_TF = '''
+variable "region" {
+  type = string
+  validation {
+    # var.commented is not a reference
+    condition     = length(var.region) > 0
+    error_message = "The region of var.region must be set."
+  }
+}
+
+variable "unused" { default = "x" }
+
+locals {
+  name = "bucket-${var.region}"
+  tags = { for key, value in var.tags : key => value }
+}
+
+resource "aws_s3_bucket" "bucket" {
+  bucket = local.name
+  dynamic "cors_rule" {
+    for_each = []
+    content {
+      allowed_origins = cors_rule.value
+    }
+  }
+  policy = <<-EOT
+    literal var.in_heredoc, ${aws_iam_role.role.arn}
+  EOT
+}
+
+module "network" {
+  source = "./modules/network"
+  cidr   = "10.0.0.0/16"
+  vpc    = data.aws_vpc.default.id
+}
+
+output "subnet" {
+  value = module.network.subnet_ids
+}
+'''
+
+NETWORK_TF = '''
+variable "cidr" {}
+variable "name" {}
+output "subnet_id" { value = var.cidr }
+'''
+
+
+def _findings(index: HclIndex) -> set[tuple[str, str]]:
+    return {(finding.kind, finding.symbol) for finding in index.findings()}
+
+
+def test_index_file_symbols_and_references():
+    index = index_file("main.tf", MAIN_TF)
+
+    assert set(index.variables) == {"region", "unused"}
+    assert index.variables["unused"].has_default
+    assert not index.variables["region"].has_default
+    assert set(index.locals) == {"name", "tags"}
+    assert set(index.resources) == {"aws_s3_bucket.bucket"}
+    assert index.modules["network"].source == "./modules/network"
+    assert index.modules["network"].inputs == {"cidr", "vpc"}
+    assert set(index.outputs) == {"subnet"}
+    assert {(ref.kind, ref.name) for ref in index.references} == {
+        ("var", "region"), ("var", "tags"), ("local", "name"), ("resource", "aws_iam_role.role"),
+        ("data", "aws_vpc.default"), ("module", "network"),
+    }
+    assert index.variables["region"].line == 2
+
+
+def test_index_tfvars_assignments():
+    index = index_file("envs/prod/terraform.tfvars", 'region = "eu-west-1"\ntags = {\n  team = "x"\n}\n')
+
+    assert set(index.tfvars) == {"region", "tags"}
+    assert index.directory == "envs/prod"
+
+
+def test_findings():
+    index = HclIndex.build([
+        ("main.tf", MAIN_TF),
+        ("modules/network/main.tf", NETWORK_TF),
+        ("terraform.tfvars", 'region = "eu-west-1"\nzone = "a"\n'),
+        ("README.md", "var.ignored"),
+    ])
+
+    assert _findings(index) == {
+        ("undefined_variable", "var.tags"),
+        ("undefined_resource", "aws_iam_role.role"),
+        ("undefined_data_source", "data.aws_vpc.default"),
+        ("undefined_module_output", "module.network.subnet_ids"),
+        ("unknown_module_input", "module.network.vpc"),
+        ("missing_module_input", "module.network.name"),
+        ("unused_variable", "var.unused"),
+        ("unused_variable", "var.name"),
+        ("unused_local", "local.tags"),
+        ("undeclared_tfvars_variable", "var.zone"),
+    }
+
+
+def test_moved_removed_and_check_blocks_are_not_undefined_references():
+    index = HclIndex.build([("main.tf", '''
+resource "aws_instance" "new" {}
+moved {
+  from = aws_instance.old
+  to   = aws_instance.new
+}
+moved { from = module.legacy }
+removed {
+  from = aws_s3_bucket.logs
+  lifecycle {
+    destroy = false
+  }
+}
+check "health" {
+  data "http" "site" {
+    url = "https://example.com"
+  }
+  assert {
+    condition     = data.http.site.status_code == 200
+    error_message = "down"
+  }
+}
+moved {
+  from = aws_instance.older
+  to   = aws_instance.missing
+}
+''')])
+
+    # The to address of a moved block must still be declared
+    assert _findings(index) == {("undefined_resource", "aws_instance.missing")}
+
+
+def test_new_findings_are_the_ones_added_by_the_head():
+    base = HclIndex.build([("main.tf", 'variable "old" {}\n')])
+    head = HclIndex.build([
+        ("variables.tf", 'variable "old" {}\n'),
+        ("main.tf", 'resource "null_resource" "a" {\n  triggers = { region = var.region }\n}\n'),
+    ])
+
+    findings = new_findings(base, head)
+
+    # var.old was already unused in the base, moving it to another file is not a new problem
+    assert [(finding.kind, finding.symbol, finding.path, finding.line) for finding in findings] == [
+        ("undefined_variable", "var.region", "main.tf", 2),
+    ]
+    assert format_summary(findings) == (
+        "### Summary of Cross-Reference Problems\n\n"
+        "- **`var.region`**: Used in `main.tf` but not defined: no variable `region` is declared in the module"
+    )
+    assert format_summary([]) == NO_ISSUES_SUMMARY
+
+
+def test_update_and_remove_file():
+    index = HclIndex.build([("main.tf", 'output "x" { value = var.a }\n'), ("variables.tf", 'variable "a" {}\n')])
+    assert _findings(index) == set()
+
+    index.remove_file("variables.tf")
+    assert _findings(index) == {("undefined_variable", "var.a")}
+
+    index.update_file("main.tf", 'output "x" { value = 1 }\n')
+    assert _findings(index) == set()
+
+
+def test_patch_and_serialization():
+    base = HclIndex.build([
+        ("main.tf", MAIN_TF),
+        ("modules/network/main.tf", NETWORK_TF),
+        ("old.tf", 'output "old" { value = var.unused }\n'),
+    ])
+    restored = HclIndex.from_dict(json.loads(json.dumps(base.to_dict())))
+
+    assert restored.files == base.files
+    assert restored.findings() == base.findings()
+
+    head = restored.patch(["old.tf"], {"modules/network/main.tf": NETWORK_TF + 'output "subnet_ids" { value = var.name }\n'})
+
+    assert set(head.files) == {"main.tf", "modules/network/main.tf"}
+    # The unchanged files are shared with the base index, not parsed again
+    assert head.files["main.tf"] is restored.files["main.tf"]
+    assert set(restored.files) == {"main.tf", "modules/network/main.tf", "old.tf"}
+    assert {(f.kind, f.symbol) for f in new_findings(restored, head)} == {("unused_variable", "var.unused")}
@@ -0,0 +1,196 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import asyncio
+
+import pytest
+
+from jobs import CodeReviewJob, JobQueue, QueueFullError, ReviewChatJob
+from utils.metrics import metrics
+
+
+def _job(pr_number: int = 1) -> CodeReviewJob:
+    return CodeReviewJob(repo_name="org/repo", pr_number=pr_number, installation_id=42)
+
+
+@pytest.mark.asyncio
+async def test_job_queue_processes_jobs():
+    queue = JobQueue(max_size=10, concurrency=2, name="test_queue_process")
+    processed = []
+
+    async def handler(job):
+        processed.append(job.pr_number)
+
+    await queue.start(handler)
+    for i in range(5):
+        queue.enqueue(_job(i))
+    await queue.join()
+    await queue.stop()
+
+    assert sorted(processed) == [0, 1, 2, 3, 4]
+    assert queue.depth == 0
+    assert queue.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_job_queue_respects_concurrency():
+    queue = JobQueue(max_size=10, concurrency=2, name="test_queue_concurrency")
+    running = 0
+    max_running = 0
+
+    async def handler(_):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    await queue.start(handler)
+    for i in range(6):
+        queue.enqueue(_job(i))
+    await queue.join()
+    await queue.stop()
+
+    assert max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_job_queue_rejects_when_full():
+    queue = JobQueue(max_size=1, concurrency=1, name="test_queue_full")
+    queue.enqueue(_job(1))
+
+    with pytest.raises(QueueFullError):
+        queue.enqueue(_job(2))
+
+    assert queue.depth == 1
+    assert metrics.counter("test_queue_full.rejected") == 1
+
+
+@pytest.mark.asyncio
+async def test_job_queue_survives_failing_job():
+    queue = JobQueue(max_size=10, concurrency=1, name="test_queue_failing")
+    processed = []
+
+    async def handler(job):
+        if isinstance(job, ReviewChatJob):
+            raise ValueError("boom")
+        processed.append(job.pr_number)
+
+    await queue.start(handler)
+    queue.enqueue(ReviewChatJob(repo_name="org/repo", pr_number=1, installation_id=42, comment={}))
+    queue.enqueue(_job(2))
+    await queue.join()
+    await queue.stop()
+
+    assert processed == [2]
+    assert metrics.counter("test_queue_failing.failed") == 1
+    assert metrics.snapshot()["gauges"]["test_queue_failing.depth"] == 0
+
+
+def test_job_queue_invalid_concurrency():
+    with pytest.raises(ValueError):
+        JobQueue(max_size=1, concurrency=0)
+
+
+@pytest.mark.asyncio
+async def test_job_queue_coalesces_queued_reviews_of_same_pr():
+    queue = JobQueue(max_size=10, concurrency=1, name="test_queue_coalesce")
+    first, second, other = _job(1), _job(1), _job(2)
+
+    queue.enqueue(first)
+    queue.enqueue(second)
+    queue.enqueue(other)
+    assert queue.depth == 2
+
+    processed = []
+
+    async def handler(job):
+        processed.append(job)
+
+    await queue.start(handler)
+    await queue.join()
+    await queue.stop()
+
+    assert processed[0] is second
+    assert processed[1] is other
+    assert metrics.counter("test_queue_coalesce.coalesced") == 1
+
+
+@pytest.mark.asyncio
+async def test_job_queue_never_coalesces_review_chat_jobs():
+    queue = JobQueue(max_size=10, concurrency=1, name="test_queue_chat")
+    queue.enqueue(ReviewChatJob(repo_name="org/repo", pr_number=1, installation_id=42, comment={"id": 1}))
+    queue.enqueue(ReviewChatJob(repo_name="org/repo", pr_number=1, installation_id=42, comment={"id": 2}))
+    assert queue.depth == 2
+
+
+@pytest.mark.asyncio
+async def test_job_queue_cancels_running_review_on_new_head():
+    queue = JobQueue(max_size=10, concurrency=2, name="test_queue_cancel")
+    started = asyncio.Event()
+    release = asyncio.Event()
+    claims = {}
+
+    async def handler(job):
+        claims[job.head_sha] = queue.claim_head_sha(job, job.head_sha)
+        if job.head_sha == "sha-1":
+            started.set()
+            await release.wait()
+
+    old = CodeReviewJob(repo_name="org/repo", pr_number=1, installation_id=42, head_sha="sha-1")
+    await queue.start(handler)
+    queue.enqueue(old)
+    await started.wait()
+
+    new = CodeReviewJob(repo_name="org/repo", pr_number=1, installation_id=42, head_sha="sha-2")
+    queue.enqueue(new)
+    assert old.cancel_token.cancelled
+    assert not new.cancel_token.cancelled
+
+    release.set()
+    await queue.join()
+    await queue.stop()
+
+    assert claims == {"sha-1": True, "sha-2": True}
+
+
+@pytest.mark.asyncio
+async def test_job_queue_skips_review_of_head_already_under_review():
+    queue = JobQueue(max_size=10, concurrency=2, name="test_queue_skip")
+    started = asyncio.Event()
+    release = asyncio.Event()
+    claims = []
+
+    async def handler(job):
+        claims.append(queue.claim_head_sha(job, "sha-1"))
+        if not started.is_set():
+            started.set()
+            await release.wait()
+
+    await queue.start(handler)
+    queue.enqueue(_job(1))
+    await started.wait()
+    # A comment triggered review doesn't know its head until it starts
+    queue.enqueue(_job(1))
+    while len(claims) < 2:
+        await asyncio.sleep(0)
+
+    release.set()
+    await queue.join()
+    await queue.stop()
+
+    assert claims == [True, False]
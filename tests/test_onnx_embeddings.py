@@ -0,0 +1,68 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+from utils.onnx_embeddings import OnnxEmbeddingModel, cosine_similarity, mean_pooling
+
+# How far the similarities of the int8 model may be from the torch ones
+SIMILARITY_TOLERANCE = 0.05
+
+COMMENTS = [
+    "The S3 bucket `logs` has no server side encryption, enable it with a KMS key.",
+    "Enable encryption at rest on the `logs` bucket.",
+    "The security group `web` allows 0.0.0.0/0 on port 22, restrict the ingress CIDR.",
+    "Pin the AWS provider version, the module accepts any version.",
+    "`instance_type` is hard-coded, move it to a variable.",
+]
+
+
+def test_mean_pooling_leaves_the_padding_out():
+    token_embeddings = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]], dtype=np.float32)
+
+    assert mean_pooling(token_embeddings, np.array([[1, 1, 0]])).tolist() == [[2.0, 3.0]]
+
+
+def test_cosine_similarity():
+    similarity = cosine_similarity(np.array([[1.0, 0.0], [3.0, 3.0]]), np.array([[2.0, 0.0], [0.0, 1.0]]))
+
+    np.testing.assert_allclose(similarity, [[1.0, 0.0], [np.sqrt(0.5), np.sqrt(0.5)]], atol=1e-6)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("onnxruntime") is not None, reason="onnxruntime is installed")
+def test_onnxruntime_is_required(tmp_path):
+    with pytest.raises(ImportError, match="onnxruntime"):
+        OnnxEmbeddingModel(str(tmp_path))
+
+
+@pytest.mark.skipif(importlib.util.find_spec("onnxruntime") is None or not os.getenv("EMBEDDING_ONNX_MODEL_DIR"),
+                    reason="needs onnxruntime and a model exported to EMBEDDING_ONNX_MODEL_DIR")
+def test_similarity_matches_the_torch_backend():
+    from sentence_transformers import SentenceTransformer
+
+    model_dir = os.environ["EMBEDDING_ONNX_MODEL_DIR"]
+    torch_model = SentenceTransformer(model_dir, device="cpu")
+    onnx_model = OnnxEmbeddingModel(model_dir)
+
+    expected = torch_model.similarity(*[torch_model.encode(COMMENTS)] * 2).numpy()
+    actual = onnx_model.similarity(*[onnx_model.encode(COMMENTS)] * 2)
+
+    np.testing.assert_allclose(actual, expected, atol=SIMILARITY_TOLERANCE)
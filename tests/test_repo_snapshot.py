@@ -0,0 +1,114 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import io
+import os
+import zipfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from utils.repo_snapshot import SPOOL_MAX_MEMORY_BYTES, is_analyzer_file, snapshot_repo
+
+_FILES = {
+    "main.tf": b'resource "null_resource" "a" {}\n',
+    "modules/vpc/variables.tofu": b'variable "cidr" {}\n',
+    ".tflint.hcl": b'plugin "terraform" {}\n',
+    ".terraform.lock.hcl": b"# lock\n",
+    "docs/diagram.png": b"\x89PNG" + b"0" * 1024,
+    "README.md": b"# repo\n",
+}
+
+
+def _zipball(files: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        zip_file.writestr("owner-repo-abc123/", b"")
+        for path, content in files.items():
+            zip_file.writestr(f"owner-repo-abc123/{path}", content)
+    return buffer.getvalue()
+
+
+def _response(body: bytes, status_code: int = 200) -> MagicMock:
+    response = MagicMock(status_code=status_code)
+    response.__enter__.return_value = response
+    response.iter_content.side_effect = lambda chunk_size: (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    return response
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("main.tf", True),
+        ("env/prod.tfvars", True),
+        ("modules/a/main.tofu", True),
+        ("stack.tf.json", True),
+        (".tflint.hcl", True),
+        ("modules/a/.terraform.lock.hcl", True),
+        ("README.md", False),
+        ("scripts/tf", False),
+    ],
+)
+def test_is_analyzer_file(path, expected):
+    assert is_analyzer_file(path) is expected
+
+
+@patch("utils.repo_snapshot.requests.get")
+def test_snapshot_repo_extracts_only_filtered_files(mock_get, tmp_path):
+    body = _zipball(_FILES)
+    mock_get.return_value = _response(body)
+
+    repo_path, stats = snapshot_repo("https://zip", {}, str(tmp_path), is_analyzer_file)
+
+    assert repo_path == os.path.join(str(tmp_path), "owner-repo-abc123")
+    extracted = sorted(os.path.relpath(os.path.join(root, name), repo_path) for root, _, names in os.walk(repo_path) for name in names)
+    assert extracted == [".terraform.lock.hcl", ".tflint.hcl", "main.tf", "modules/vpc/variables.tofu"]
+    assert stats.bytes_downloaded == len(body)
+    assert stats.bytes_extracted == sum(len(_FILES[path]) for path in extracted)
+    assert stats.files_extracted == 4
+    assert stats.files_skipped == 2
+    assert mock_get.call_args.kwargs["stream"] is True
+
+
+@patch("utils.repo_snapshot.requests.get")
+def test_snapshot_repo_without_filter_extracts_everything(mock_get, tmp_path):
+    # Big enough to be spilled from memory to disk while it's downloaded
+    files = dict(_FILES, **{"assets/blob.bin": os.urandom(SPOOL_MAX_MEMORY_BYTES + 1)})
+    mock_get.return_value = _response(_zipball(files))
+
+    repo_path, stats = snapshot_repo("https://zip", {}, str(tmp_path))
+
+    assert stats.files_extracted == len(files)
+    assert stats.files_skipped == 0
+    with open(os.path.join(repo_path, "assets/blob.bin"), "rb") as f:
+        assert f.read() == files["assets/blob.bin"]
+
+
+@patch("utils.repo_snapshot.requests.get")
+def test_snapshot_repo_fails_on_http_error(mock_get, tmp_path):
+    mock_get.return_value = _response(b"", status_code=404)
+
+    with pytest.raises(ValueError, match="status code: 404"):
+        snapshot_repo("https://zip", {}, str(tmp_path))
+
+
+@patch("utils.repo_snapshot.requests.get")
+def test_snapshot_repo_fails_on_corrupted_zip(mock_get, tmp_path):
+    mock_get.return_value = _response(b"not a zip")
+
+    with pytest.raises(ValueError, match="corrupted"):
+        snapshot_repo("https://zip", {}, str(tmp_path))
@@ -0,0 +1,158 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from utils.snapshot_manager import SnapshotManager
+
+_FILES = {
+    "main.tf": 'resource "null_resource" "a" {}\n',
+    "modules/vpc/main.tf": 'variable "cidr" {}\n',
+    "modules/vpc/README.md": "# vpc\n",
+}
+
+
+def _loader(files: dict[str, str] = _FILES) -> MagicMock:
+    def load(destination_folder: str) -> str:
+        repo_path = os.path.join(destination_folder, "owner-repo-abc123")
+        for path, content in files.items():
+            os.makedirs(os.path.dirname(os.path.join(repo_path, path)), exist_ok=True)
+            with open(os.path.join(repo_path, path), "w") as f:
+                f.write(content)
+        return repo_path
+
+    return MagicMock(side_effect=load)
+
+
+def test_snapshot_manager_materialises_a_commit_once(tmp_path):
+    manager = SnapshotManager(str(tmp_path))
+    loader = _loader()
+
+    with manager.open("owner/repo", "abc123", loader) as snapshot:
+        assert snapshot.list_files() == ["main.tf", "modules/vpc/README.md", "modules/vpc/main.tf"]
+        assert snapshot.list_files("modules", extensions=(".tf",)) == ["modules/vpc/main.tf"]
+        assert snapshot.list_files("", recursive=False) == ["main.tf"]
+        assert snapshot.read_file("modules/vpc/main.tf") == _FILES["modules/vpc/main.tf"]
+    with manager.open("owner/repo", "abc123", loader) as snapshot:
+        assert snapshot.read_file("main.tf") == _FILES["main.tf"]
+
+    loader.assert_called_once()
+    assert manager.total_bytes == sum(len(content) for content in _FILES.values())
+
+
+def test_snapshot_manager_loads_concurrent_requests_once(tmp_path):
+    manager = SnapshotManager(str(tmp_path))
+    loader = _loader()
+    barrier = threading.Barrier(4)
+
+    def review():
+        barrier.wait()
+        with manager.open("owner/repo", "abc123", loader) as snapshot:
+            assert snapshot.read_file("main.tf") == _FILES["main.tf"]
+
+    threads = [threading.Thread(target=review) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    loader.assert_called_once()
+
+
+def test_snapshot_manager_does_not_evict_leased_snapshots(tmp_path):
+    manager = SnapshotManager(str(tmp_path), max_entries=1)
+
+    with manager.open("owner/repo", "first", _loader()) as first:
+        with manager.open("owner/repo", "second", _loader()) as second:
+            # Over the limit, but both snapshots are still being read
+            assert len(manager) == 2
+            assert os.path.isdir(first.path)
+        # Released, so it's the only one which can make room
+        assert not os.path.exists(second.path)
+        assert os.path.isdir(first.path)
+
+    with manager.open("owner/repo", "third", _loader()):
+        pass
+
+    assert ("owner/repo", "first") not in manager
+    assert ("owner/repo", "third") in manager
+    assert not os.path.exists(first.path)
+
+
+def test_snapshot_manager_evicts_by_size(tmp_path):
+    size = sum(len(content) for content in _FILES.values())
+    manager = SnapshotManager(str(tmp_path), max_bytes=size)
+
+    with manager.open("owner/repo", "first", _loader()):
+        pass
+    with manager.open("owner/repo", "second", _loader()):
+        pass
+
+    assert ("owner/repo", "first") not in manager
+    assert manager.total_bytes == size
+
+
+def test_snapshot_manager_failed_load_leaves_nothing_behind(tmp_path):
+    manager = SnapshotManager(str(tmp_path))
+
+    try:
+        with manager.open("owner/repo", "abc123", MagicMock(side_effect=ValueError("status code: 404"))):
+            pass
+    except ValueError:
+        pass
+
+    assert len(manager) == 0
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("repo_full_name", ["owner/repo", "owner/infra__live", "my__org/repo"])
+def test_snapshot_manager_survives_restart(tmp_path, repo_full_name):
+    with SnapshotManager(str(tmp_path)).open(repo_full_name, "abc123", _loader()):
+        pass
+
+    loader = _loader()
+    with SnapshotManager(str(tmp_path)).open(repo_full_name, "abc123", loader) as snapshot:
+        assert snapshot.read_file("main.tf") == _FILES["main.tf"]
+    loader.assert_not_called()
+
+
+def test_snapshot_manager_restores_repositories_apart(tmp_path):
+    # Both names were stored in the same a__b__c folder before
+    manager = SnapshotManager(str(tmp_path))
+    for repo_full_name in ("a__b/c", "a/b__c"):
+        with manager.open(repo_full_name, "abc123", _loader()):
+            pass
+
+    restarted = SnapshotManager(str(tmp_path))
+    assert ("a__b/c", "abc123") in restarted
+    assert ("a/b__c", "abc123") in restarted
+    assert len(restarted) == 2
+
+
+def test_snapshot_copy_is_filtered_and_private(tmp_path):
+    manager = SnapshotManager(str(tmp_path / "snapshots"))
+
+    with manager.open("owner/repo", "abc123", _loader()) as snapshot:
+        copy = snapshot.copy_to(str(tmp_path / "workspace"), lambda path: path.endswith(".tf"))
+        os.remove(os.path.join(copy, "main.tf"))
+
+        assert snapshot.read_file("main.tf") == _FILES["main.tf"]
+    assert sorted(os.listdir(os.path.join(copy, "modules", "vpc"))) == ["main.tf"]
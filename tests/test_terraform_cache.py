@@ -0,0 +1,195 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import threading
+from subprocess import CompletedProcess
+from unittest.mock import patch
+
+import pytest
+
+from utils.terraform_cache import LOCKFILE_NAME, TerraformCache, lockfile_key, parse_lockfile
+
+_LOCKFILE = """\
+# This file is maintained automatically by "terraform init".
+# Manual edits may be lost in future updates.
+
+provider "registry.terraform.io/hashicorp/aws" {
+  version     = "5.31.0"
+  constraints = "~> 5.0"
+  hashes = [
+    "h1:abc=",
+  ]
+}
+
+provider "registry.terraform.io/hashicorp/random" {
+  version = "3.6.0"
+  hashes = [
+    "h1:def=",
+  ]
+}
+"""
+
+
+def _write_lockfile(folder, content: str = _LOCKFILE) -> None:
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, LOCKFILE_NAME), "w") as f:
+        f.write(content)
+
+
+def test_parse_lockfile():
+    assert parse_lockfile(_LOCKFILE) == {
+        "registry.terraform.io/hashicorp/aws": ("5.31.0", "~> 5.0"),
+        "registry.terraform.io/hashicorp/random": ("3.6.0", ""),
+    }
+
+
+def test_lockfile_key_only_depends_on_the_locked_versions():
+    other_platform = _LOCKFILE.replace("h1:abc=", "h1:xyz=")
+    upgraded = _LOCKFILE.replace("5.31.0", "5.32.0")
+
+    assert lockfile_key(_LOCKFILE) == lockfile_key(other_platform)
+    assert lockfile_key(_LOCKFILE) != lockfile_key(upgraded)
+
+
+def test_terraform_cache_environment(tmp_path):
+    cache = TerraformCache(str(tmp_path / "plugin-cache"))
+
+    env = cache.environment()
+
+    assert env["TF_PLUGIN_CACHE_DIR"] == cache.plugin_cache_dir
+    with open(env["TF_CLI_CONFIG_FILE"]) as f:
+        assert f.read() == f'plugin_cache_dir = "{cache.plugin_cache_dir}"\n'
+
+
+def test_terraform_cache_rewrites_a_stale_cli_config(tmp_path):
+    TerraformCache(str(tmp_path / "plugin-cache")).environment()
+    config_file = tmp_path / "terraform.rc"
+
+    # Restarted with other settings on the same volume
+    TerraformCache(str(tmp_path / "plugin-cache"), str(tmp_path / "mirror"), offline=True).environment()
+    assert "filesystem_mirror" in config_file.read_text()
+
+    # An unchanged config is left in place
+    written = (config_file.stat().st_ino, config_file.stat().st_mtime_ns)
+    cache = TerraformCache(str(tmp_path / "plugin-cache"), str(tmp_path / "mirror"), offline=True)
+    cache.environment()
+    cache.environment()
+    assert (config_file.stat().st_ino, config_file.stat().st_mtime_ns) == written
+
+
+def test_terraform_cache_install_lock_is_shared_through_the_cache_folder(tmp_path):
+    # Two processes sharing the cache volume, the file lock serializes them even without a common threading lock
+    holder = TerraformCache(str(tmp_path / "plugin-cache"))
+    waiter = TerraformCache(str(tmp_path / "plugin-cache"))
+    acquired = threading.Event()
+
+    def install():
+        with waiter.install_lock():
+            acquired.set()
+
+    with holder.install_lock():
+        thread = threading.Thread(target=install)
+        thread.start()
+        assert not acquired.wait(0.2)
+    assert acquired.wait(5)
+    thread.join()
+
+
+def test_terraform_cache_install_lock_wait_is_bounded(tmp_path):
+    holder = TerraformCache(str(tmp_path / "plugin-cache"))
+    waiter = TerraformCache(str(tmp_path / "plugin-cache"))
+
+    with holder.install_lock():
+        with pytest.raises(TimeoutError):
+            with waiter.install_lock(timeout=0.1):
+                pass
+    with waiter.install_lock(timeout=0.1):
+        pass
+
+
+def test_terraform_cache_needs_install_lock_only_for_a_cold_cache(tmp_path):
+    cache = TerraformCache(str(tmp_path / "plugin-cache"))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    assert cache.needs_install_lock(str(repo))
+
+    (repo / LOCKFILE_NAME).write_text(_LOCKFILE)
+    assert cache.needs_install_lock(str(repo))
+    cache.record(str(repo))
+    assert not cache.needs_install_lock(str(repo))
+
+    # The inits only read a filesystem mirror
+    mirrored = TerraformCache(str(tmp_path / "other-cache"), str(tmp_path / "mirror"))
+    assert not mirrored.needs_install_lock(str(tmp_path / "no-lockfile"))
+
+
+def test_terraform_cache_mirror_falls_back_to_the_registry(tmp_path):
+    mirror = tmp_path / "mirror"
+    (mirror / "registry.terraform.io" / "hashicorp" / "aws").mkdir(parents=True)
+    cache = TerraformCache(str(tmp_path / "plugin-cache"), str(mirror))
+
+    with open(cache.environment()["TF_CLI_CONFIG_FILE"]) as f:
+        config = f.read()
+
+    assert f'path = "{mirror}"' in config
+    assert 'include = ["registry.terraform.io/hashicorp/aws"]' in config
+    assert 'exclude = ["registry.terraform.io/hashicorp/aws"]' in config
+
+
+def test_terraform_cache_offline_only_uses_the_mirror(tmp_path):
+    cache = TerraformCache(str(tmp_path / "plugin-cache"), str(tmp_path / "mirror"), offline=True)
+
+    with open(cache.environment()["TF_CLI_CONFIG_FILE"]) as f:
+        config = f.read()
+
+    assert "filesystem_mirror" in config
+    assert "direct" not in config
+
+
+def test_terraform_cache_records_lockfiles(tmp_path):
+    cache = TerraformCache(str(tmp_path / "plugin-cache"))
+    _write_lockfile(tmp_path / "repo")
+
+    assert cache.record(str(tmp_path / "repo")) is False
+    assert cache.record(str(tmp_path / "repo")) is True
+    assert cache.is_cached(_LOCKFILE)
+    assert cache.record(str(tmp_path / "no-lockfile")) is False
+
+
+@patch("utils.terraform_cache.run")
+def test_terraform_cache_seeds_mirror_from_lockfiles(mock_run, tmp_path):
+    configs = []
+
+    def mirror(args, cwd, **kwargs):
+        with open(os.path.join(cwd, "main.tf")) as f:
+            configs.append(f.read())
+        return CompletedProcess(args=args, returncode=0, stdout="", stderr="")
+
+    mock_run.side_effect = mirror
+    _write_lockfile(tmp_path / "lockfiles" / "network")
+    _write_lockfile(tmp_path / "lockfiles" / "compute")
+    cache = TerraformCache(str(tmp_path / "plugin-cache"), str(tmp_path / "mirror"))
+
+    # Both lockfiles lock the same versions, they are mirrored once
+    assert cache.seed(str(tmp_path / "lockfiles")) == 1
+    assert cache.seed(str(tmp_path / "lockfiles")) == 0
+
+    assert mock_run.call_count == 1
+    assert mock_run.call_args.args[0] == ["terraform", "providers", "mirror", str(tmp_path / "mirror")]
+    assert 'aws = { source = "registry.terraform.io/hashicorp/aws", version = "5.31.0" }' in configs[0]
+    assert cache.is_cached(_LOCKFILE)
@@ -0,0 +1,93 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import json
+
+import pytest
+
+from utils.terraform_diagnostics import DiagnosticsParseError, parse_tflint_json, parse_validate_json, rename_files
+
+
+def test_parse_validate_json_keeps_errors_only():
+    output = json.dumps({
+        "valid": False,
+        "diagnostics": [
+            {
+                "severity": "error",
+                "summary": "Invalid CIDR block",
+                "detail": "\"10.0.2.0.12/24\" is not a valid CIDR block.",
+                "range": {"filename": "../../modules/network/main.tf", "start": {"line": 3, "column": 1}},
+                "snippet": {"context": "resource \"aws_subnet\" \"private\""},
+            },
+            {"severity": "warning", "summary": "Deprecated attribute", "range": {"filename": "main.tf", "start": {"line": 1}}},
+            {"severity": "error", "summary": "Missing required provider"},
+        ],
+    })
+
+    issues = parse_validate_json(output, "envs/prod")
+
+    assert [(issue.file_name, issue.line_number) for issue in issues] == [("modules/network/main.tf", 3), ("envs/prod", None)]
+    assert issues[0].full_issue_description == (
+        "Invalid CIDR block: \"10.0.2.0.12/24\" is not a valid CIDR block. (in resource \"aws_subnet\" \"private\")"
+    )
+    assert issues[1].full_issue_description == "Missing required provider"
+
+
+def test_parse_validate_json_of_valid_module():
+    assert parse_validate_json(json.dumps({"valid": True, "diagnostics": []})) == []
+
+
+def test_parse_tflint_json():
+    output = json.dumps({
+        "issues": [
+            {"rule": {"name": "terraform_required_version", "severity": "warning"}, "message": "required_version is required",
+             "range": {"filename": "main.tf", "start": {"line": 1}}},
+            {"rule": {"name": "aws_instance_invalid_type", "severity": "error"}, "message": "\"t1.2xlarge\" is an invalid value",
+             "range": {"filename": "main.tf", "start": {"line": 20}}},
+        ],
+        "errors": [{"message": "Failed to load configurations", "severity": "error", "range": {"filename": "vars.tf", "start": {"line": 2}}}],
+    })
+
+    issues = parse_tflint_json(output)
+
+    assert [(issue.file_name, issue.line_number, issue.rule, issue.full_issue_description) for issue in issues] == [
+        ("main.tf", 20, "aws_instance_invalid_type", "\"t1.2xlarge\" is an invalid value"),
+        ("vars.tf", 2, None, "Failed to load configurations"),
+    ]
+    # The prompts get the issues in this form
+    assert [str(issue) for issue in issues] == [
+        'main.tf:20 [aws_instance_invalid_type]: "t1.2xlarge" is an invalid value',
+        "vars.tf:2: Failed to load configurations",
+    ]
+
+
+@pytest.mark.parametrize("parse", [parse_validate_json, parse_tflint_json])
+@pytest.mark.parametrize("output", ["", "Error: Failed to load plugin", "[]", "{}"])
+def test_parse_unparseable_output(parse, output):
+    with pytest.raises(DiagnosticsParseError):
+        parse(output)
+
+
+def test_rename_files():
+    issues = parse_tflint_json(json.dumps({"issues": [], "errors": [
+        {"message": "Failed to parse modified_main.tf", "range": {"filename": "modified_main.tf", "start": {"line": 1}}},
+    ]}))
+
+    renamed = rename_files(issues, {"main.tofu": "modified_main.tf"})
+
+    assert renamed[0].file_name == "main.tofu"
+    assert renamed[0].full_issue_description == "Failed to parse main.tofu"
@@ -0,0 +1,95 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+
+from utils.terraform_modules import content_hash, find_modules, find_root_modules, module_closure
+
+
+def _write(root, path: str, content: str = "") -> None:
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w") as f:
+        f.write(content)
+
+
+def _repo(tmp_path) -> str:
+    _write(tmp_path, "main.tf", 'module "network" {\n  source = "./modules/network"\n}\n')
+    _write(tmp_path, "modules/network/main.tf", 'module "subnets" {\n  source = "../subnets"\n}\n')
+    _write(tmp_path, "modules/subnets/main.tf")
+    _write(tmp_path, "envs/prod/main.tf", 'module "network" {\n  source = "../../modules/network"\n}\n'
+                                          'module "vpc" {\n  source = "terraform-aws-modules/vpc/aws"\n}\n')
+    _write(tmp_path, "envs/prod/prod.tfvars")
+    _write(tmp_path, "standalone/main.tofu")
+    _write(tmp_path, "standalone/.terraform/modules/x/main.tf")
+    _write(tmp_path, "docs/README.md")
+    return str(tmp_path)
+
+
+def test_find_modules(tmp_path):
+    assert find_modules(_repo(tmp_path)) == {
+        "": {"modules/network"},
+        "modules/network": {"modules/subnets"},
+        "modules/subnets": set(),
+        "envs/prod": {"modules/network"},
+        "standalone": set(),
+    }
+
+
+def test_find_root_modules_of_changed_root_modules(tmp_path):
+    repo = _repo(tmp_path)
+
+    assert find_root_modules(repo, ["envs/prod/prod.tfvars", "standalone/main.tofu"]) == ["envs/prod", "standalone"]
+    assert find_root_modules(repo, ["main.tf"]) == [""]
+
+
+def test_find_root_modules_of_changed_child_module(tmp_path):
+    # The child module is called by both roots, transitively
+    assert find_root_modules(_repo(tmp_path), ["modules/subnets/main.tf"]) == ["", "envs/prod"]
+
+
+def test_find_root_modules_ignores_other_files(tmp_path):
+    assert find_root_modules(_repo(tmp_path), ["docs/README.md", "deleted/main.tf"]) == []
+
+
+def test_find_root_modules_of_module_cycle(tmp_path):
+    _write(tmp_path, "a/main.tf", 'module "b" {\n  source = "../b"\n}\n')
+    _write(tmp_path, "b/main.tf", 'module "a" {\n  source = "../a"\n}\n')
+
+    assert find_root_modules(str(tmp_path), ["a/main.tf"]) == ["a"]
+
+
+def test_content_hash_of_module_closure(tmp_path):
+    repo = _repo(tmp_path)
+    closure = module_closure(find_modules(repo), "envs/prod")
+    before = content_hash(repo, closure)
+
+    assert closure == {"envs/prod", "modules/network", "modules/subnets"}
+
+    # Unrelated files don't change the hash, the files of a called module do
+    _write(tmp_path, "standalone/variables.tf", "variable \"x\" {}")
+    _write(tmp_path, "envs/prod/notes.md", "notes")
+    assert content_hash(repo, closure) == before
+
+    _write(tmp_path, "modules/subnets/variables.tf", "variable \"x\" {}")
+    assert content_hash(repo, closure) != before
+
+
+def test_content_hash_of_repo_without_terraform(tmp_path):
+    _write(tmp_path, "README.md", "# repo")
+
+    assert content_hash(str(tmp_path)) is None
@@ -0,0 +1,100 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import sys
+import time
+
+import pytest
+
+from utils.tool_runner import ToolRunner, tool_name
+
+
+@pytest.fixture
+def pooled_runner():
+    runner = ToolRunner(workers=1)
+    runner.start()
+    yield runner
+    runner.stop()
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        (["terraform", "init", "-backend=false"], "terraform init"),
+        (["/usr/local/bin/terraform", "validate", "-json"], "terraform validate"),
+        (["tflint", "--format=json"], "tflint"),
+    ],
+)
+def test_tool_name(args, expected):
+    assert tool_name(args) == expected
+
+
+def test_tool_runner_captures_output(tmp_path):
+    result = ToolRunner().run(["sh", "-c", "pwd; echo oops >&2; exit 3"], cwd=str(tmp_path))
+
+    assert result.returncode == 3
+    assert result.stdout.strip() == str(tmp_path)
+    assert result.stderr.strip() == "oops"
+    assert not result.timed_out
+
+
+def test_tool_runner_runs_a_version_command_once():
+    runner = ToolRunner()
+    version = runner.version([sys.executable, "-c", "import time; print(time.time_ns())"])
+
+    assert version
+    assert runner.version([sys.executable, "-c", "import time; print(time.time_ns())"]) == version
+    assert runner.version(["not-an-installed-tool", "--version"]) == ""
+
+
+def test_tool_runner_kills_the_process_group_on_timeout(tmp_path):
+    marker = tmp_path / "survived"
+    start = time.monotonic()
+
+    # The background child would outlive a plain kill of the shell
+    result = ToolRunner().run(["sh", "-c", f"(sleep 2; touch {marker}) & sleep 30"], timeout=0.5)
+
+    assert result.timed_out
+    assert result.returncode != 0
+    assert "timed out after 0.5 seconds" in result.stderr
+    assert time.monotonic() - start < 5
+    time.sleep(2.5)
+    assert not marker.exists()
+
+
+def test_tool_runner_applies_resource_limits():
+    result = ToolRunner(memory_bytes=512 * 1024 * 1024).run(["sh", "-c", "ulimit -v; ulimit -t"], timeout=10)
+
+    assert result.stdout.split() == [str(512 * 1024), "40"]
+
+
+def test_tool_runner_workers_see_the_current_environment(pooled_runner, monkeypatch):
+    # Set after the workers were started
+    monkeypatch.setenv("TF_PLUGIN_CACHE_DIR", "/cache/plugins")
+
+    result = pooled_runner.run(["sh", "-c", "echo $TF_PLUGIN_CACHE_DIR; echo $$"])
+
+    assert result.returncode == 0
+    plugin_cache_dir, pid = result.stdout.split()
+    assert plugin_cache_dir == "/cache/plugins"
+    assert int(pid) != os.getpid()
+
+
+def test_tool_runner_rejects_uncaptured_output():
+    with pytest.raises(ValueError):
+        ToolRunner().run(["true"], stdout=None)
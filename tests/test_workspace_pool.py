@@ -0,0 +1,79 @@
+# Copyright 2025 Cisco Systems, Inc. and its affiliates
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+import os
+import queue
+import threading
+
+import pytest
+
+from utils.workspace_pool import WorkspacePool
+
+
+def test_workspace_pool_hands_out_private_workspaces(tmp_path):
+    pool = WorkspacePool(str(tmp_path), size=2)
+
+    with pool.acquire() as first, pool.acquire() as second:
+        assert first != second
+        assert os.path.isdir(first) and os.path.isdir(second)
+        assert pool.in_use == 2
+
+    assert pool.in_use == 0
+
+
+def test_workspace_pool_empties_the_workspace_on_error(tmp_path):
+    pool = WorkspacePool(str(tmp_path), size=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.acquire() as workspace:
+            os.makedirs(os.path.join(workspace, "repo", ".terraform"))
+            with open(os.path.join(workspace, "repo", "main.tf"), "w") as f:
+                f.write("")
+            raise RuntimeError("terraform crashed")
+
+    assert os.listdir(workspace) == []
+    with pool.acquire() as reused:
+        assert reused == workspace
+
+
+def test_workspace_pool_blocks_when_exhausted(tmp_path):
+    pool = WorkspacePool(str(tmp_path), size=1)
+    released = threading.Event()
+
+    with pool.acquire():
+        with pytest.raises(queue.Empty):
+            with pool.acquire(timeout=0.01):
+                pass
+
+        def wait_for_workspace():
+            with pool.acquire(timeout=5):
+                released.set()
+
+        waiter = threading.Thread(target=wait_for_workspace)
+        waiter.start()
+        assert not released.wait(0.05)
+
+    waiter.join()
+    assert released.is_set()
+
+
+def test_workspace_pool_removes_leftovers_of_previous_process(tmp_path):
+    stale = tmp_path / "workspace-0" / "repo"
+    stale.mkdir(parents=True)
+
+    with WorkspacePool(str(tmp_path), size=1).acquire() as workspace:
+        assert os.listdir(workspace) == []